@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+import numpy as np
+import analytics
+from analytics import RECORD_DTYPE, DEADBAND, GAP_SECONDS
+from telemetry_store import MAGIC, STATE_CODES, MAX_FILE_BYTES
+from simulator import VirtualBoard, LOOP_SECONDS
+from helpers import check
+
+# --- CONFIGURATION ---
+UNITS = 8
+TOTAL_MB = 512           # Size of the generated log set
+HOURS = 2                # Simulated board history that is tiled to fill the files
+SETPOINT_MINUTES = 6     # A random setpoint change about this often
+SEED = 7
+MIN_MB_PER_S = 100       # Throughput asked for on all cores ("gigabytes in seconds")
+
+def simulate(hours, seed):
+    """Records of a VirtualBoard with random setpoint changes and one logging gap"""
+    rng = random.Random(seed)
+    board = VirtualBoard(inside=30, outside=rng.choice((18, 22, 34)))
+    n = int(hours * 3600 / LOOP_SECONDS)
+    rec = np.zeros(n, RECORD_DTYPE)
+    t = 1.7e9
+    for i in range(n):
+        if rng.random() < LOOP_SECONDS / (SETPOINT_MINUTES * 60):
+            board.receive(b'%-3d' % rng.randint(17, 30))
+        if i == n // 2:
+            t += 60      # The host was away for a minute
+        board.step()
+        rec[i] = (t, STATE_CODES[board.motor], board.target, int(board.inside), int(board.outside), board.speed)
+        t += LOOP_SECONDS
+    return rec
+
+def reference(rec):
+    """The same figures with a plain loop, one sample at a time"""
+    seconds = forward = band = 0.0
+    starts = crossings = 0
+    settle, runs = [], []
+    change = run = None
+    for i in range(len(rec)):
+        ts, state, target, inside = float(rec['ts'][i]), int(rec['state'][i]), int(rec['target'][i]), int(rec['inside'][i])
+        inband = abs(inside - target) <= DEADBAND
+        if i:
+            prev = rec[i - 1]
+            dt = ts - float(prev['ts'])
+            if 0 <= dt <= GAP_SECONDS:
+                seconds += dt
+                forward += dt if prev['state'] == STATE_CODES['F'] else 0.0
+                band += dt if abs(int(prev['inside']) - int(prev['target'])) <= DEADBAND else 0.0
+            if (state != 0) != (prev['state'] != 0):
+                if state != 0:
+                    starts += 1
+                    run = ts
+                elif run is not None:
+                    runs.append(ts - run)
+                    run = None
+            if inband != (abs(int(prev['inside']) - int(prev['target'])) <= DEADBAND):
+                crossings += 1
+            if target != prev['target']:
+                change = ts
+        if change is not None and inband:
+            settle.append(ts - change)
+            change = None
+    return {'seconds': seconds, 'forward': forward, 'band': band, 'starts': starts,
+            'crossings': crossings, 'settle': sorted(settle), 'runs': runs}
+
+def write_logs(folder, hour, total_mb):
+    """UNITS units of rotated logs, each file a tiled copy of hour shifted in time"""
+    per_file = (MAX_FILE_BYTES - len(MAGIC)) // RECORD_DTYPE.itemsize
+    files = max(UNITS, total_mb * 2**20 // MAX_FILE_BYTES)
+    span = float(hour['ts'][-1] - hour['ts'][0]) + LOOP_SECONDS
+    tiles = -(-per_file // len(hour))
+    for f in range(files):
+        unit, index = f % UNITS, f // UNITS
+        block = np.tile(hour, tiles)[:per_file]
+        block['ts'] += np.repeat(np.arange(tiles) * span, len(hour))[:per_file] + f * tiles * span
+        name = f"hvac.unit{unit + 1}.tlm" + (f".{index}" if index else '')
+        with open(os.path.join(folder, name), 'wb') as out:
+            out.write(MAGIC)
+            out.write(block.tobytes())
+    return files
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Correctness and throughput of analytics.py")
+    ap.add_argument('--mb', type=int, default=TOTAL_MB, help="size of the generated log set")
+    ap.add_argument('--keep', action='store_true', help="leave the generated logs in place")
+    args = ap.parse_args()
+    results = []
+    folder = tempfile.mkdtemp(prefix='hvac_analytics_')
+
+    print(f"--- Correctness: {HOURS} h of a simulated board ---")
+    rec = simulate(HOURS, SEED)
+    path = os.path.join(folder, 'check.tlm')
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(rec.tobytes())
+    want = reference(rec)
+    for chunk in (analytics.CHUNK_RECORDS, 1000, 7):
+        got = analytics.analyse_file(path, chunk)
+        same = (abs(got['seconds'] - want['seconds']) < 1e-3 and abs(got['forward'] - want['forward']) < 1e-3
+                and abs(got['band'] - want['band']) < 1e-3 and got['starts'] == want['starts']
+                and got['crossings'] == want['crossings'] and np.allclose(np.sort(got['settle']), want['settle'])
+                and np.allclose(got['runs'], want['runs']))
+        results.append(check(same, f"chunks of {chunk} records match the sample by sample reference"))
+    os.remove(path)
+    print(analytics.format_report([analytics.report_row('check.tlm', [got])]))
+
+    print(f"--- Throughput: {args.mb} MB in {UNITS} units of rotated logs ---")
+    files = write_logs(folder, rec, args.mb)
+    size = sum(os.path.getsize(os.path.join(folder, n)) for n in os.listdir(folder)) / 2**20
+    rows = {}
+    for processes in (1, None):
+        start = time.perf_counter()
+        rows[processes] = analytics.analyse([folder], processes)
+        seconds = time.perf_counter() - start
+        label = '1 process' if processes == 1 else f"{os.cpu_count()} processes"
+        print(f"{label:14} {files} files, {size:.0f} MB in {seconds:.2f} s = {size / seconds:7.0f} MB/s")
+    print(analytics.format_report(rows[None]))
+    results.append(check(rows[1] == rows[None], "the same report from one process and from many"))
+    results.append(check(size / seconds >= MIN_MB_PER_S, f"at least {MIN_MB_PER_S} MB/s on all cores"))
+
+    if args.keep:
+        print(f"Logs left in {folder}")
+    else:
+        shutil.rmtree(folder)
+    if not all(results):
+        sys.exit(1)
@@ -0,0 +1,68 @@
+import os
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'Voice_Controlled_AC'))
+from command_parser import CommandParser
+
+# --- CONFIGURATION ---
+CORPUS = os.path.join(HERE, 'command_corpus.tsv')
+ROUNDS = 2000  # Passes over the corpus for the throughput figure
+
+def load_corpus(path):
+    """(transcript, current target, expected target or None) per corpus line"""
+    cases = []
+    for line in open(path, encoding='utf-8'):
+        if line.startswith('#') or not line.strip():
+            continue
+        text, current, expected = line.rstrip('\n').split('\t')
+        cases.append((text, int(current), None if expected == '-' else int(expected)))
+    return cases
+
+def legacy_resolve(text, current):
+    """The previous process_command_locally parsing, for comparison"""
+    from word2number import w2n
+    new_temp = None
+    text = text.replace("to", "two").replace("too", "two").replace("for", "four")
+    try:
+        number_found = w2n.word_to_num(text)
+        if number_found:
+            new_temp = int(number_found)
+    except ValueError:
+        digits = re.findall(r'\d+', text)
+        if digits:
+            new_temp = int("".join(digits))
+    return new_temp
+
+def run(name, resolve, cases):
+    failures = [(t, c, e, resolve(t, c)) for t, c, e in cases]
+    failures = [f for f in failures if f[2] != f[3]]
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for text, current, _ in cases:
+            resolve(text, current)
+    elapsed = time.perf_counter() - start
+    rate = ROUNDS * len(cases) / elapsed
+
+    print(f"{name:8} corpus: {len(cases) - len(failures)}/{len(cases)} correct   "
+          f"throughput: {rate:10.0f} utterances/s   ({elapsed / (ROUNDS * len(cases)) * 1e6:.2f} us each)")
+    return failures
+
+if __name__ == "__main__":
+    cases = load_corpus(CORPUS)
+    parser = CommandParser()
+    print(f"--- Command parser benchmark ({len(cases)} transcripts) ---")
+    failures = run("parser", parser.resolve, cases)
+    try:
+        run("legacy", legacy_resolve, cases)
+    except ImportError:
+        print("legacy   skipped (word2number is not installed)")
+
+    for text, current, expected, got in failures:
+        print(f"❌ FAIL: {text!r} (target {current}): expected {expected}, got {got}")
+    if failures:
+        sys.exit(1)
+    print("✅ PASS: every transcript in the corpus parsed as expected")
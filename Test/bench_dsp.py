@@ -0,0 +1,144 @@
+import os
+import sys
+import glob
+import time
+import wave
+import array
+import argparse
+import warnings
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+import numpy as np
+import dsp
+from capture import CHUNK, SAMPLE_RATE
+from helpers import check
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import audioop  # The path being replaced, gone from Python 3.13
+except ImportError:
+    audioop = None
+
+# --- CONFIGURATION ---
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'e2e')
+ROUNDS = 20000           # Chunks timed per implementation
+MIC_RATE = 44100         # A microphone that only offers CD rate
+SILENCE = (1.5, 1.2)     # Seconds of room noise before and after the speech
+SPEECH_SECONDS = 2.0
+DC_OFFSET = 900
+MAX_LEVEL_SHARE = 0.01   # Level metering may use this share of each chunk's real time
+MAX_PREPROCESS_MS = 50   # For a 5 s recording
+
+def python_levels(chunk):
+    """(peak, rms) with a loop over the samples, what is left without audioop or NumPy"""
+    x = array.array('h', chunk)
+    return max(max(x), -min(x)), int((sum(v * v for v in x) / len(x)) ** 0.5)
+
+def audioop_levels(chunk):
+    return audioop.max(chunk, 2), audioop.rms(chunk, 2)
+
+def per_chunk_us(levels, chunks):
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        levels(chunks[i % len(chunks)])
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+def recording(rate, seed=5):
+    """Quiet voiced sound between stretches of room noise, with a DC offset and an 11 kHz whine"""
+    rng = np.random.default_rng(seed)
+    before, after = (int(s * rate) for s in SILENCE)
+    t = np.arange(int(SPEECH_SECONDS * rate)) / rate
+    voice = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 12))
+    voice *= 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2          # Syllables
+    x = np.concatenate((np.zeros(before), voice * 1500, np.zeros(after)))
+    x += rng.normal(0, 60, len(x)) + DC_OFFSET
+    if rate > 22000:
+        x += 200 * np.sin(2 * np.pi * 11000 * np.arange(len(x)) / rate)
+    return dsp.to_pcm(x)
+
+def band_db(x, rate, hz, width=50):
+    spectrum = np.abs(np.fft.rfft(x))
+    freqs = np.fft.rfftfreq(len(x), 1 / rate)
+    return 20 * np.log10(spectrum[np.abs(freqs - hz) < width].max() + 1e-9)
+
+def timed(fn, *args, repeat=10):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times) * 1000
+
+def decode_times(name, folder):
+    """(seconds raw, seconds preprocessed) summed over the fixtures for engine name"""
+    import speech_recognition as sr
+    from recognition import create_engine
+    engine = create_engine(name)
+    engine.load()
+    raw = done = 0.0
+    for path in sorted(glob.glob(os.path.join(folder, '*.wav'))):
+        with wave.open(path, 'rb') as w:
+            pcm = dsp.to_mono16(w.readframes(w.getnframes()), w.getsampwidth(), w.getnchannels())
+            rate = w.getframerate()
+        start = time.perf_counter()
+        engine.recognize(sr.AudioData(pcm, rate, 2))
+        raw += time.perf_counter() - start
+        start = time.perf_counter()
+        engine.recognize(sr.AudioData(*dsp.preprocess(pcm, rate), 2))
+        done += time.perf_counter() - start
+    return raw, done
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="dsp.py against audioop: level metering and preprocessing")
+    ap.add_argument('--engine', help="also time decoding of the e2e fixtures raw and preprocessed with this engine")
+    args = ap.parse_args()
+    results = []
+
+    print(f"--- Levels of a {CHUNK}-sample chunk ({CHUNK / SAMPLE_RATE * 1000:.0f} ms of audio) ---")
+    rng = np.random.default_rng(1)
+    chunks = [dsp.to_pcm(rng.normal(0, 10 ** rng.uniform(1, 4), CHUNK)) for _ in range(64)]
+    chunks.append(np.full(CHUNK, -32768, '<i2').tobytes())
+    impls = [('dsp (NumPy)', dsp.levels), ('Python loop', python_levels)]
+    if audioop is not None:
+        impls.insert(0, ('audioop', audioop_levels))
+        results.append(check(all(dsp.levels(c) == audioop_levels(c) for c in chunks),
+                             "dsp.levels gives exactly audioop's peak and rms"))
+    for label, levels in impls:
+        us = per_chunk_us(levels, chunks)
+        print(f"{label:12} {us:8.2f} us per chunk   {us / (CHUNK / SAMPLE_RATE * 1e6):7.3%} of real time")
+    share = per_chunk_us(dsp.levels, chunks) / (CHUNK / SAMPLE_RATE * 1e6)
+    results.append(check(share < MAX_LEVEL_SHARE, f"metering takes under {MAX_LEVEL_SHARE:.0%} of the audio's duration"))
+
+    for rate in (MIC_RATE, SAMPLE_RATE):
+        pcm = recording(rate)
+        seconds = len(pcm) / 2 / rate
+        print(f"--- Preprocessing {seconds:.1f} s at {rate} Hz ({SPEECH_SECONDS:g} s of it voiced) ---")
+        (out, out_rate), ms = timed(dsp.preprocess, pcm, rate)
+        print(f"dsp.preprocess        {ms:7.2f} ms   {len(pcm) / 1024:6.0f} KiB -> {len(out) / 1024:4.0f} KiB"
+              f"   {seconds:.2f} s -> {len(out) / 2 / out_rate:.2f} s of audio to decode")
+        if audioop is not None and rate != SAMPLE_RATE:
+            _, ms = timed(audioop.ratecv, pcm, 2, 1, rate, SAMPLE_RATE, None)
+            print(f"audioop.ratecv alone  {ms:7.2f} ms   (resampling only, no DC, gain or trimming)")
+        x = dsp.samples(out).astype(float)
+        kept = len(x) / out_rate
+        results.append(check(out_rate == dsp.TARGET_RATE and ms < MAX_PREPROCESS_MS,
+                             f"{dsp.TARGET_RATE} Hz out in under {MAX_PREPROCESS_MS} ms"))
+        results.append(check(abs(x.mean()) < 20, f"DC offset {DC_OFFSET} removed (mean now {x.mean():.1f})"))
+        results.append(check(abs(np.abs(x).max() / dsp.FULL_SCALE - dsp.TARGET_PEAK) < 0.01,
+                             f"peak normalised to {dsp.TARGET_PEAK:.0%} of full scale"))
+        results.append(check(SPEECH_SECONDS <= kept <= SPEECH_SECONDS + 2 * dsp.TRIM_PADDING_SECONDS + 0.05,
+                             f"silence trimmed to the voiced {SPEECH_SECONDS:g} s plus padding ({kept:.2f} s kept)"))
+        if rate == MIC_RATE:
+            # 11 kHz is above the new Nyquist frequency and would fold to 5 kHz without the filter
+            leak = band_db(x, out_rate, dsp.TARGET_RATE - 11000) - band_db(x, out_rate, 150)
+            results.append(check(leak < -40, f"the 11 kHz whine did not alias into the speech band ({leak:.0f} dB)"))
+
+    if args.engine:
+        print(f"--- Decoding the e2e fixtures with {args.engine} ---")
+        raw, done = decode_times(args.engine, FIXTURES)
+        print(f"raw {raw:.2f} s   preprocessed {done:.2f} s   ({1 - done / raw:.0%} less)" if raw else "no fixtures")
+
+    if not all(results):
+        sys.exit(1)
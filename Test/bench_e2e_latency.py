@@ -0,0 +1,239 @@
+import os
+import sys
+import glob
+import json
+import math
+import time
+import wave
+import queue
+import argparse
+import statistics
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'Voice_Controlled_AC'))
+import dsp
+from controller import HVACController
+from capture import CaptureService, SAMPLE_RATE, CHUNK
+from recognition import create_engine
+from simulator import Simulator
+from vad import EnergyVAD
+from helpers import ScriptedEngine, Events, TIMEOUT
+
+# --- CONFIGURATION ---
+FIXTURES = os.path.join(HERE, 'fixtures', 'e2e')    # <name>.wav (16 kHz mono) + <name>.txt transcript
+BASELINE = os.path.join(HERE, 'baselines', 'e2e_latency.json')
+REPEATS = 3           # Plays of every fixture
+BOARD_HZ = 10         # The firmware's loop rate, it bounds the echo stage
+# A stage regresses when its p50 or p95 is this much slower than the baseline
+TOLERANCE = 0.25      # ...relative
+SLACK_MS = 5.0        # ...and absolute, so sub-millisecond stages do not flap
+STAGES = ('capture_end', 'decode', 'parse', 'write', 'echo', 'total')
+
+# Used by --synthesize: tone bursts shaped like the words of each transcript
+SYNTHETIC = {
+    'set_eighteen': "set it to eighteen",
+    'twenty_two': "twenty two",
+    'warmer': "two degrees warmer",
+    'cooler_by_three': "lower by three",
+}
+
+class FixtureMic(CaptureService):
+    """The microphone, played from WAV fixtures in real time; silence in between"""
+
+    def __init__(self):
+        super().__init__()
+        self.clips = queue.Queue()
+        self.speech_end = None      # perf_counter() when the last speech chunk of a clip was written
+
+    def play(self, pcm, speech_end_chunk):
+        self.clips.put((pcm, speech_end_chunk))
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self.ready.set()
+
+    def _run(self):
+        silence = bytes(self.chunk_bytes)
+        period = self.chunk / self.rate
+        next_chunk = time.perf_counter()
+        pcm, end_chunk, pos = None, 0, 0
+        while True:
+            if pcm is None:
+                try:
+                    pcm, end_chunk = self.clips.get_nowait()
+                    pos = 0
+                except queue.Empty:
+                    pass
+            if pcm is not None:
+                data = pcm[pos * self.chunk_bytes:(pos + 1) * self.chunk_bytes].ljust(self.chunk_bytes, b'\0')
+                pos += 1
+                if pos == end_chunk:
+                    self.speech_end = time.perf_counter()
+                if pos * self.chunk_bytes >= len(pcm):
+                    pcm = None
+            else:
+                data = silence
+            self.write(data)
+            next_chunk += period
+            time.sleep(max(0.0, next_chunk - time.perf_counter()))
+
+    def close(self):
+        pass
+
+def load_wav(path):
+    """16-bit mono PCM at SAMPLE_RATE, converted when the file is not"""
+    with wave.open(path, 'rb') as w:
+        pcm = w.readframes(w.getnframes())
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+    pcm = dsp.to_mono16(pcm, width, channels)
+    if rate != SAMPLE_RATE:
+        pcm = dsp.to_pcm(dsp.resample(dsp.samples(pcm).astype(float), rate, SAMPLE_RATE))
+    return pcm
+
+def speech_end_chunk(pcm):
+    """Chunk index right after the speech, as the VAD sees it"""
+    step = CHUNK * 2
+    vad = EnergyVAD(CHUNK / SAMPLE_RATE)
+    chunks = [pcm[i:i + step] for i in range(0, len(pcm), step)]
+    for c in chunks + [bytes(step)] * 100:
+        if vad.feed(dsp.levels(c)[1]):
+            break
+    return min(len(chunks), vad.speech_end or len(chunks))
+
+def load_fixtures(folder):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(folder, '*.wav'))):
+        txt = os.path.splitext(path)[0] + '.txt'
+        if not os.path.exists(txt):
+            continue
+        pcm = load_wav(path)
+        fixtures.append((os.path.basename(path), pcm, speech_end_chunk(pcm), open(txt).read().strip().lower()))
+    return fixtures
+
+def synthesize(folder):
+    """Writes SYNTHETIC as WAV fixtures: 0.4 s of silence, 0.25 s of voiced tone per word, 0.2 s of silence"""
+    os.makedirs(folder, exist_ok=True)
+    for name, text in SYNTHETIC.items():
+        samples = [0] * int(0.4 * SAMPLE_RATE)
+        for w, _ in enumerate(text.split()):
+            n = int(0.25 * SAMPLE_RATE)
+            f0 = 140 + 15 * (w % 3)
+            for i in range(n):
+                t = i / SAMPLE_RATE
+                env = math.sin(math.pi * i / n)
+                samples.append(int(7000 * env * (math.sin(2 * math.pi * f0 * t) + 0.5 * math.sin(4 * math.pi * f0 * t)) / 1.5))
+        samples += [0] * int(0.2 * SAMPLE_RATE)
+        with wave.open(os.path.join(folder, name + '.wav'), 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(b''.join(s.to_bytes(2, 'little', signed=True) for s in samples))
+        with open(os.path.join(folder, name + '.txt'), 'w') as f:
+            f.write(text + '\n')
+
+def run_once(core, mic, engine, timeline, pcm, end_chunk, text):
+    engine.next_text = text
+    core.press()
+    timeline.wait(lambda k, v: k == 'recording' and v)
+    mic.speech_end = None
+    mic.play(pcm, end_chunk)
+    t_capture, _ = timeline.wait(lambda k, v: k == 'recording' and not v)
+    t_decode, _ = timeline.wait(lambda k, v: k == 'transcript')
+    t_parse, (_, target) = timeline.wait(lambda k, v: k == 'target')
+    t_write, _ = timeline.wait(lambda k, v: k == 'setpoint')
+    t_echo, _ = timeline.wait(lambda k, v: k == 'frames' and v[1][-1].target == target)
+    spoken = mic.speech_end
+    return {
+        'capture_end': t_capture - spoken,
+        'decode': t_decode - t_capture,
+        'parse': t_parse - t_decode,
+        'write': t_write - t_parse,
+        'echo': t_echo - t_write,
+        'total': t_echo - spoken,
+    }
+
+def percentiles(values):
+    q = statistics.quantiles(values, n=20) if len(values) > 1 else values * 19
+    return {'p50': round(q[9] * 1000, 2), 'p95': round(q[18] * 1000, 2)}
+
+def compare(report, baseline):
+    """Stages whose p50 or p95 got slower than baseline allows"""
+    regressions = []
+    for stage, now in report.items():
+        before = baseline.get(stage)
+        if before is None:
+            continue
+        for p in ('p50', 'p95'):
+            if now[p] > before[p] * (1 + TOLERANCE) + SLACK_MS:
+                regressions.append(f"{stage} {p}: {now[p]:.1f} ms (baseline {before[p]:.1f} ms)")
+    return regressions
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Voice to setpoint latency, stage by stage")
+    ap.add_argument('--fixtures', default=FIXTURES)
+    ap.add_argument('--engine', default='scripted', help="scripted (returns each fixture's transcript), or a recognition engine such as vosk")
+    ap.add_argument('--model', default=os.path.join(HERE, '..', 'Voice_Controlled_AC', 'model'))
+    ap.add_argument('--repeats', type=int, default=REPEATS)
+    ap.add_argument('--save', action='store_true', help="store this run as the baseline")
+    ap.add_argument('--synthesize', action='store_true', help="(re)write the synthetic fixtures first")
+    args = ap.parse_args()
+
+    if args.synthesize:
+        synthesize(args.fixtures)
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures in {args.fixtures} (run with --synthesize)")
+        sys.exit(1)
+
+    sim = Simulator(1, BOARD_HZ)
+    threading.Thread(target=sim.run, daemon=True).start()
+    mic = FixtureMic()
+    if args.engine == 'scripted':
+        engine = ScriptedEngine()
+    else:
+        engine = create_engine(args.engine, **({'model_path': args.model} if args.engine == 'vosk' else {}))
+    core = HVACController(sim.ports[0], engine=engine, capture=mic)
+    timeline = Events(core)
+    core.start()
+    timeline.wait(lambda k, v: k == 'frames')
+    engine.wait_ready(TIMEOUT)
+
+    print(f"--- End to end latency: {len(fixtures)} fixtures x {args.repeats}, engine {engine.name}, board at {BOARD_HZ} Hz ---")
+    samples = {stage: [] for stage in STAGES}
+    failures = 0
+    for _ in range(args.repeats):
+        for name, pcm, end_chunk, text in fixtures:
+            try:
+                for stage, value in run_once(core, mic, engine, timeline, pcm, end_chunk, text).items():
+                    samples[stage].append(value)
+            except TimeoutError:
+                print(f"❌ FAIL: {name} did not reach the board")
+                failures += 1
+    core.stop()
+    sim.stop()
+    sim.close()
+
+    report = {stage: percentiles(values) for stage, values in samples.items() if values}
+    for stage, p in report.items():
+        print(f"{stage:12} p50 {p['p50']:8.1f} ms   p95 {p['p95']:8.1f} ms")
+
+    key = f"{engine.name}@{BOARD_HZ}Hz"
+    baselines = json.load(open(BASELINE)) if os.path.exists(BASELINE) else {}
+    if args.save:
+        baselines[key] = report
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baseline '{key}' saved to {BASELINE}")
+    elif key in baselines:
+        regressions = compare(report, baselines[key])
+        for r in regressions:
+            print(f"❌ FAIL: regression in {r}")
+        failures += len(regressions)
+    else:
+        print(f"No baseline for '{key}' yet (run with --save)")
+
+    if failures:
+        sys.exit(1)
+    print("✅ PASS: every fixture reached the board within its baseline")
@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from recognition import RecognizerEngine, RecognitionError, RaceEngine
+
+# --- CONFIGURATION ---
+UTTERANCES = 150
+SEED = 3
+SCALE = 0.2             # Engines sleep this fraction of their simulated latency, to keep the run short
+COMMANDS = ["set it to twenty two", "twenty four", "two degrees warmer", "lower by three", "eighteen"]
+# name: (median ms, lognormal spread, error rate, empty rate, mishear rate)
+PROFILES = {
+    'local':  (180, 0.35, 0.00, 0.08, 0.10),   # Small offline model: quick, misses some words
+    'cloud':  (650, 0.60, 0.05, 0.02, 0.02),   # Web API: accurate, slow tail, network errors
+    'cloud2': (450, 0.80, 0.08, 0.03, 0.03),   # A second provider with a different tail
+}
+MISHEARD = ["set it to", "the temperature", "ninety nine"]
+
+class SimulatedEngine(RecognizerEngine):
+    """Sleeps a random latency, then returns the command, a mishearing, nothing or an error"""
+
+    def __init__(self, name, profile, rng):
+        super().__init__()
+        self.name = name
+        self.median, self.spread, self.errors, self.empty, self.mishear = profile
+        self.rng = rng
+        self.ready.set()
+
+    def recognize(self, audio):
+        r = self.rng.random()
+        time.sleep(self.rng.lognormvariate(0, self.spread) * self.median / 1000 * SCALE)
+        if r < self.errors:
+            raise RecognitionError(f"{self.name}: request failed")
+        r -= self.errors
+        if r < self.empty:
+            return ''
+        r -= self.empty
+        if r < self.mishear:
+            return self.rng.choice(MISHEARD)
+        return audio
+
+def run(engine, commands, usable):
+    """(latencies in simulated ms, share of usable transcripts)"""
+    latencies, good = [], 0
+    for text in commands:
+        start = time.perf_counter()
+        try:
+            got = engine.recognize(text)
+        except RecognitionError:
+            got = ''
+        latencies.append((time.perf_counter() - start) / SCALE * 1000)
+        good += bool(got) and usable(got)
+        time.sleep(0.02)
+    return latencies, good / len(commands)
+
+def row(label, latencies, success):
+    q = statistics.quantiles(latencies, n=100)
+    print(f"{label:22} p50 {q[49]:6.0f} ms   p95 {q[94]:6.0f} ms   p99 {q[98]:6.0f} ms   usable {success:6.1%}")
+    return q[94], success
+
+if __name__ == "__main__":
+    rng = random.Random(SEED)
+    commands = [rng.choice(COMMANDS) for _ in range(UTTERANCES)]
+    race = RaceEngine([SimulatedEngine(n, p, random.Random(SEED + i)) for i, (n, p) in enumerate(PROFILES.items())])
+    race.load()
+
+    print(f"--- {UTTERANCES} utterances, simulated engines (times in simulated ms) ---")
+    single = {}
+    for i, (name, profile) in enumerate(PROFILES.items()):
+        single[name] = row(name, *run(SimulatedEngine(name, profile, random.Random(SEED + i)), commands, race.usable))
+    p95, success = row("race " + '+'.join(PROFILES), *run(race, commands, race.usable))
+
+    print(f"{'engine':8} {'races':>6} {'wins':>6} {'win rate':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, s in race.stats().items():
+        print(f"{name:8} {s['races']:6} {s['wins']:6} {s['win_rate']:9.1%} {s['p50_ms'] / SCALE:8.0f} {s['p95_ms'] / SCALE:8.0f}")
+
+    # A single engine beats the race only if it is both as fast at the tail and as often usable
+    dominated = [name for name, (p, s) in single.items() if p <= p95 and s >= success]
+    if dominated:
+        print(f"❌ FAIL: {', '.join(dominated)} alone is as fast and as usable as the race")
+        sys.exit(1)
+    print("✅ PASS: no single engine matches the race on both tail latency and usable transcripts")
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import math
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from widgets import FanWidget, FAN_FPS
+
+# --- CONFIGURATION ---
+SECONDS = 5  # Measurement window per case
+
+class LegacyFanWidget(tk.Canvas):
+    """The previous FanWidget: deletes and recreates the blades every 50 ms, even when stopped"""
+    def __init__(self, master, width=180, height=180, **kwargs):
+        super().__init__(master, width=width, height=height, highlightthickness=0, **kwargs)
+        self.cx = width // 2
+        self.cy = height // 2
+        self.angle = 0
+        self.direction = 'S'
+        self.speed = 0
+        self.frames_drawn = 0
+        self.animate()
+
+    def set_state(self, direction, speed):
+        self.direction = direction
+        self.speed = speed
+
+    def animate(self):
+        self.delete("blade")
+        step = 0
+        if self.direction == 'F':
+            step = (self.speed / 255.0) * 30 + 2
+        elif self.direction == 'B':
+            step = -((self.speed / 255.0) * 30 + 2)
+        self.angle = (self.angle + step) % 360
+        for i in range(3):
+            a = math.radians(self.angle + (i * 120))
+            self.create_polygon(self.cx, self.cy,
+                                self.cx + math.cos(a - 0.3) * 20, self.cy + math.sin(a - 0.3) * 20,
+                                self.cx + math.cos(a) * 70, self.cy + math.sin(a) * 70,
+                                self.cx + math.cos(a + 0.3) * 20, self.cy + math.sin(a + 0.3) * 20,
+                                fill="#95a5a6", tags="blade", outline="black")
+        self.frames_drawn += 1
+        self.after(50, self.animate)
+
+def measure(root, fan, name, direction, speed):
+    """Runs the Tk loop for SECONDS and reports frames per second and CPU use of the process"""
+    fan.set_state(direction, speed)
+    root.update()
+    frames0 = fan.frames_drawn
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    root.after(SECONDS * 1000, root.quit)
+    root.mainloop()
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    frames = fan.frames_drawn - frames0
+    print(f"{name:22} state {direction}: {frames / wall:6.1f} fps   CPU: {cpu / wall * 100:5.2f}%   "
+          f"CPU/frame: {cpu / max(1, frames) * 1e3:6.3f} ms")
+
+if __name__ == "__main__":
+    fps = float(sys.argv[1]) if len(sys.argv) > 1 else FAN_FPS
+    print(f"--- FanWidget benchmark ({SECONDS} s per case) ---")
+    for name, factory in (("legacy (20 fps)", lambda r: LegacyFanWidget(r, bg="#2c3e50")),
+                          (f"retained ({fps:g} fps)", lambda r: FanWidget(r, bg="#2c3e50", fps=fps))):
+        root = tk.Tk()
+        fan = factory(root)
+        fan.pack()
+        measure(root, fan, name, 'F', 255)
+        measure(root, fan, name, 'S', 0)
+        root.destroy()
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import resource
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from controller import HVACController, format_summary
+from recognition import RecognizerEngine
+from simulator import Simulator
+from helpers import IdleMic
+
+# --- CONFIGURATION ---
+UNIT_COUNTS = (1, 8, 32, 64)
+HZ = 10             # Per board, like the real firmware
+SECONDS = 5         # Measured run per fleet size, after a second of warm up
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_simulator(units, conn):
+    sim = Simulator(units, HZ)
+    conn.send(sim.ports)
+    threading.Thread(target=sim.run, daemon=True).start()
+    conn.recv()
+    sim.stop()
+    sim.close()
+
+def run_host(ports, conn):
+    """One controller for every port; reports CPU, memory and frames"""
+    base = rss_mb()
+    core = HVACController({f"unit{i}": p for i, p in enumerate(ports, 1)},
+                          engine=RecognizerEngine(), capture=IdleMic())
+    core.start()
+    time.sleep(1)
+    frames0 = sum(u.frames for u in core.units.values())
+    cpu0 = time.process_time()
+    time.sleep(SECONDS)
+    cpu = time.process_time() - cpu0
+    frames = sum(u.frames for u in core.units.values()) - frames0
+    online = sum(u.connected for u in core.units.values())
+    last_row = format_summary(core.summary()[-1:]).splitlines()[-1]
+    core.stop()
+    conn.send((cpu / SECONDS * 100, rss_mb() - base, rss_mb(), frames, online, last_row))
+
+def measure(units):
+    sim_end, sim_conn = multiprocessing.Pipe()
+    sim = multiprocessing.Process(target=run_simulator, args=(units, sim_conn))
+    sim.start()
+    ports = sim_end.recv()
+
+    host_end, host_conn = multiprocessing.Pipe()
+    host = multiprocessing.Process(target=run_host, args=(ports, host_conn))
+    host.start()
+    result = host_end.recv()
+    host.join()
+    sim_end.send(None)
+    sim.join()
+    return result
+
+if __name__ == "__main__":
+    print(f"--- Fleet scaling benchmark ({HZ} Hz per unit, {SECONDS}s per size) ---")
+    print(f"{'units':>5} {'online':>6} {'CPU %':>7} {'CPU %/unit':>10} {'RSS MB':>7} {'+MB/unit':>8} {'frames/s':>9}")
+    rows = []
+    for units in UNIT_COUNTS:
+        cpu, grown, rss, frames, online, last_row = measure(units)
+        rows.append((units, cpu, rss))
+        print(f"{units:5} {online:6} {cpu:7.2f} {cpu / units:10.3f} {rss:7.1f} {grown / units:8.3f} {frames / SECONDS:9.0f}")
+    print(f"last unit: {last_row}")
+
+    (n0, cpu0, rss0), (n1, cpu1, rss1) = rows[0], rows[-1]
+    print(f"marginal cost per extra unit: {(cpu1 - cpu0) / (n1 - n0):.3f}% CPU, "
+          f"{(rss1 - rss0) / (n1 - n0) * 1024:.0f} KB")
+    print(f"{n1} units as {n1} processes would need about {rss0 * n1:.0f} MB, one fleet process uses {rss1:.0f} MB")
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+import metrics
+from serial_ingest import SerialReader
+
+# --- CONFIGURATION ---
+CALLS = 1000000        # Metric updates timed per mode
+FEEDS = 20000          # SerialReader.feed() calls per mode
+BURST = b"F,25,31,22,174\n" * 8 + b"garbage\n"
+MAX_DISABLED_NS = 300  # An update with metrics off should cost about a function call
+
+def per_call_ns(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+def update_costs():
+    c = metrics.counter('bench_updates', "Benchmark counter")
+    h = metrics.histogram('bench_seconds', "Benchmark histogram")
+    return (per_call_ns(c.inc, CALLS),
+            per_call_ns(lambda: h.observe(0.003), CALLS),
+            per_call_ns(lambda: h.observe_since(metrics.clock()), CALLS))
+
+def feed_cost():
+    reader = SerialReader(None, lambda frames: None, lambda msg: None)
+    start = time.perf_counter()
+    for _ in range(FEEDS):
+        reader.feed(BURST)
+    return (time.perf_counter() - start) / FEEDS * 1e6
+
+if __name__ == "__main__":
+    print("--- Metrics overhead ---")
+    metrics.enable(False)
+    off = update_costs() + (feed_cost(),)
+    metrics.enable()
+    on = update_costs() + (feed_cost(),)
+    for name, a, b in zip(("counter.inc", "histogram.observe", "observe_since(clock())"), off, on):
+        print(f"{name:24} off {a:7.1f} ns   on {b:7.1f} ns")
+    print(f"{'SerialReader.feed':24} off {off[3]:7.2f} us   on {on[3]:7.2f} us   (8 frames + 1 bad line per call)")
+
+    text = metrics.render()
+    ok = 'hvac_frames_received_total' in text and 'hvac_frames_dropped_total{reason="parse"}' in text
+    print(text[:text.index('# HELP', 1)])
+    if not ok:
+        print("❌ FAIL: serial counters missing from the exposition")
+        sys.exit(1)
+    if max(off[:3]) > MAX_DISABLED_NS:
+        print(f"❌ FAIL: disabled updates cost more than {MAX_DISABLED_NS} ns")
+        sys.exit(1)
+    print("✅ PASS: metrics exported and negligible when disabled")
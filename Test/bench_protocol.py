@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import random
+import threading
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from protocol import (SOF, MSG_ACK, MSG_BUTTON, MSG_HELLO, MSG_SETPOINT, ACK, HELLO, SETPOINT, VERSION,
+                      Frame, ProtocolLink, StreamDecoder, encode_frame, encode_status)
+from simulator import Simulator, VirtualBoard
+from helpers import check
+
+# --- CONFIGURATION ---
+HZ = 10                  # Like the real firmware
+BAUD_RATE = 9600         # What every board boots on
+MESSAGES = 5000          # Messages in the corrupted stream
+CORRUPT = 0.05           # Share of them with a flipped byte
+THROUGHPUT_FRAMES = 50000
+SEED = 1
+V1 = b"F,25,31,22,174\n"
+
+def status(target=25, seq=1, extra=b''):
+    return encode_status(Frame('F', target, 31, 22, 174, seq, extra), seq)
+
+def decode(data, chunk=None):
+    """Messages and decoder after feeding data, in chunks of random size up to chunk"""
+    decoder = StreamDecoder()
+    out = []
+    pos = 0
+    while pos < len(data):
+        n = random.randint(1, chunk) if chunk else len(data)
+        out += decoder.feed(data[pos:pos + n])
+        pos += n
+    return out, decoder
+
+def flip(data, i):
+    return data[:i] + bytes((data[i] ^ (1 << random.randrange(8)),)) + data[i + 1:]
+
+class LossySerial:
+    """Stands in for the port in send_setpoint: loses the first writes, ACKs the rest from another thread"""
+
+    def __init__(self, link, lost, result=0):
+        self.link = link
+        self.lost = lost
+        self.result = result
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if self.writes > self.lost:
+            seq = data[3]
+            threading.Timer(0.01, self.link.on_ack, (seq, self.result)).start()
+
+def pump(ser, link, frames, stop):
+    """The reader side of a negotiated link: hands ACKs to the link, keeps status frames"""
+    decoder = StreamDecoder()
+    while not stop.is_set():
+        for kind, value in decoder.feed(ser.read(ser.in_waiting or 1)):
+            if kind == 'ack':
+                link.on_ack(*value)
+            elif kind == 'status':
+                frames.append(value)
+
+if __name__ == "__main__":
+    random.seed(SEED)
+    results = []
+
+    print("--- Codec round trip ---")
+    messages = [
+        (status(extra=b'\x07'), ('status', Frame('F', 25, 31, 22, 174, 1, b'\x07'))),
+        (encode_frame(MSG_SETPOINT, 2, SETPOINT.pack(-5)), ('setpoint', (2, -5))),
+        (encode_frame(MSG_ACK, 3, ACK.pack(2, 0)), ('ack', (2, 0))),
+        (encode_frame(MSG_BUTTON, 4, b'S'), ('button', 'Start')),
+        (encode_frame(MSG_BUTTON, 5, b'T'), ('button', 'Stop')),
+        (encode_frame(MSG_HELLO, 6, HELLO.pack(VERSION, 115200)), ('hello', (6, 115200))),
+        (V1, ('status', Frame('F', 25, 31, 22, 174))),
+        (b"Start\n", ('button', 'Start')),
+    ]
+    out, decoder = decode(b''.join(data for data, _ in messages), chunk=3)
+    results.append(check(out == [msg for _, msg in messages] and decoder.crc_errors == decoder.bad_lines == 0,
+                         "every message type decodes to what was encoded, fed three bytes at a time"))
+
+    print("--- Corrupt frames ---")
+    bad = flip(status(), 7)
+    out, decoder = decode(V1 + bad + V1 + V1)
+    results.append(check(len(out) == 3 and (decoder.crc_errors, decoder.bad_lines) == (1, 0),
+                         "a v1 frame right after a bad CRC is kept and the damage counted once"))
+    out, decoder = decode(bad + status(21, 2))
+    results.append(check([f.target for _, f in out] == [21] and decoder.crc_errors == 1,
+                         "a v2 frame right after a bad CRC is kept"))
+    stray = bytes((SOF, VERSION, MSG_SETPOINT, 9, 60))
+    out, decoder = decode(V1 + stray + V1 * 3)
+    results.append(check(len(out) == 4 and decoder.bad_lines == 0,
+                         "a stray SOF with a plausible length does not hold back the v1 lines after it"))
+
+    print(f"--- {MESSAGES} mixed messages, {CORRUPT:.0%} with a flipped byte, random chunks ---")
+    stream, damaged = [], 0
+    for i in range(MESSAGES):
+        data = V1 if random.random() < 0.5 else status(18 + i % 10, i)
+        if random.random() < CORRUPT:
+            data = flip(data, random.randrange(len(data)))
+            damaged += 1
+        stream.append(data)
+    out, decoder = decode(b''.join(stream), chunk=64)
+    statuses = sum(kind == 'status' for kind, _ in out)
+    print(f"{statuses} status frames decoded from {MESSAGES} messages ({damaged} damaged), "
+          f"{decoder.crc_errors} CRC errors, {decoder.bad_lines} bad lines")
+    results.append(check(statuses >= MESSAGES - 2 * damaged, "each corruption costs at most one intact message"))
+
+    print("--- Lost ACKs ---")
+    link = ProtocolLink()
+    link.version = 2
+    ser = LossySerial(link, lost=2)
+    ok = link.send_setpoint(ser, 22, retries=3, timeout=0.1)
+    results.append(check(ok and ser.writes == 3, "a setpoint whose ACKs were lost twice is resent until ACKed"))
+    ser = LossySerial(link, lost=3)
+    ok = link.send_setpoint(ser, 22, retries=3, timeout=0.1)
+    results.append(check(not ok and ser.writes == 3 and not link._acks, "after the last retry it gives up"))
+    ser = LossySerial(link, lost=0, result=1)
+    results.append(check(not link.send_setpoint(ser, 22, retries=3, timeout=0.1), "a refused setpoint fails"))
+
+    print("--- Negotiation with the simulator ---")
+    sim = Simulator(3, HZ)
+    sim.boards[0].board = VirtualBoard(protocol=2)
+    sim.boards[1].board = VirtualBoard(protocol=2, max_baud=57600)
+    threading.Thread(target=sim.run, daemon=True).start()
+    for i, (version, baud) in enumerate([(2, 115200), (2, 57600), (1, BAUD_RATE)]):
+        ser = serial.Serial(sim.ports[i], BAUD_RATE, timeout=0.1)
+        link = ProtocolLink()
+        t0 = time.perf_counter()
+        got = link.negotiate(ser)
+        print(f"  board {i}: v{got} at {ser.baudrate} baud after {time.perf_counter() - t0:.2f} s")
+        results.append(check((got, ser.baudrate) == (version, baud),
+                             f"{'a v1 board falls back to' if version == 1 else 'a v2 board agrees on'} "
+                             f"v{version} at {baud} baud"))
+        frames, stop = [], threading.Event()
+        reader = threading.Thread(target=pump, args=(ser, link, frames, stop), daemon=True)
+        reader.start()
+        if version == 2:
+            ok = link.send_setpoint(ser, 21)
+            time.sleep(3 / HZ)
+            results.append(check(ok and frames and frames[-1].target == 21 and frames[-1].seq is not None,
+                                 "setpoints are ACKed and the board reports them in v2 status frames"))
+        else:
+            time.sleep(1.5)
+            results.append(check(frames and frames[-1].target == 25 and sim.boards[i].board.target == 25,
+                                 "the HELLOs a v1 board took for setpoints were undone"))
+        stop.set()
+        reader.join()
+        ser.close()
+    sim.stop()
+    sim.close()
+
+    print(f"--- Decoder throughput, {THROUGHPUT_FRAMES} status frames ---")
+    for name, frame in (("v1", V1), ("v2", status())):
+        data = frame * THROUGHPUT_FRAMES
+        t0 = time.perf_counter()
+        out, _ = decode(data, chunk=4096)
+        dt = time.perf_counter() - t0
+        print(f"{name}: {len(out) / dt:9.0f} frames/s   {len(data) / dt / 1e6:6.2f} MB/s")
+    if not all(results):
+        sys.exit(1)
@@ -0,0 +1,79 @@
+import os
+import sys
+import glob
+import time
+import statistics
+import speech_recognition as sr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from recognition import create_engine, ENGINES
+
+# --- CONFIGURATION ---
+# Each <name>.wav may have a <name>.txt next to it with the expected transcript
+ENGINE_OPTIONS = {
+    "vosk": {"model_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC', 'model')},
+}
+
+def word_errors(expected, got):
+    """Word-level edit distance between two transcripts"""
+    a, b = expected.split(), got.split()
+    prev = list(range(len(b) + 1))
+    for i, wa in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, wb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (wa != wb))
+        prev = cur
+    return prev[-1]
+
+def load_fixtures(folder):
+    fixtures = []
+    for wav in sorted(glob.glob(os.path.join(folder, '*.wav'))):
+        with sr.AudioFile(wav) as source:
+            audio = sr.Recognizer().record(source)
+        txt = os.path.splitext(wav)[0] + '.txt'
+        expected = open(txt).read().strip().lower() if os.path.exists(txt) else None
+        duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        fixtures.append((os.path.basename(wav), audio, expected, duration))
+    return fixtures
+
+def bench(name, fixtures):
+    engine = create_engine(name, **ENGINE_OPTIONS.get(name, {}))
+    t0 = time.perf_counter()
+    engine.load()
+    load_time = time.perf_counter() - t0
+
+    latencies = []
+    exact = errors = words = scored = failures = 0
+    audio_seconds = 0.0
+    for fname, audio, expected, duration in fixtures:
+        t0 = time.perf_counter()
+        try:
+            text = engine.recognize(audio)
+        except Exception as e:
+            print(f"   {fname}: {e}")
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - t0)
+        audio_seconds += duration
+        if expected is not None:
+            scored += 1
+            exact += text == expected
+            errors += word_errors(expected, text)
+            words += len(expected.split())
+
+    print(f"\n{name} (load {load_time:.2f} s, {len(latencies)} decoded, {failures} failed)")
+    if latencies:
+        q = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+        print(f"   latency  mean {statistics.mean(latencies) * 1000:7.1f} ms   p50 {q[9] * 1000:7.1f} ms   "
+              f"p95 {q[18] * 1000:7.1f} ms   RTF {sum(latencies) / audio_seconds:.3f}")
+    if scored:
+        print(f"   accuracy exact {exact / scored * 100:5.1f}%   WER {errors / max(1, words) * 100:5.1f}%")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <folder of .wav commands> [engine ...]  (engines: {', '.join(ENGINES)})")
+        sys.exit(1)
+    fixtures = load_fixtures(sys.argv[1])
+    print(f"--- Recognizer benchmark: {len(fixtures)} recordings ---")
+    for name in sys.argv[2:] or list(ENGINES):
+        bench(name, fixtures)
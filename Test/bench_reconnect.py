@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+import tempfile
+import statistics
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+import metrics
+from controller import HVACController, BAUD_RATE
+from discovery import probe
+from recognition import RecognizerEngine
+from simulator import Simulator, BOOT_SECONDS
+from helpers import IdleMic, Events, set_target, board_target, check
+
+# --- CONFIGURATION ---
+HZ = 10                  # Like the real firmware
+UNPLUGS = 5              # Unplug / replug cycles measured
+OUTAGE_SECONDS = 2.0     # Cable out for this long
+MAX_RECOVERY = 6.0       # Replug (or reset) to first frame / restored target, seconds
+TIMEOUT = 15
+
+def v2_frames(kind, value):
+    return kind == 'frames' and value[1][-1].seq is not None
+
+def open_port(core, port, errors):
+    try:
+        core._open(core.unit(), port).close()
+    except OSError as e:  # serial.SerialException included
+        errors.append(e)
+
+def open_fds(path):
+    """This process's file descriptors open on path"""
+    fds = []
+    for fd in os.listdir('/proc/self/fd'):
+        try:
+            if os.readlink(f'/proc/self/fd/{fd}').removesuffix(' (deleted)') == path:
+                fds.append(fd)
+        except OSError:
+            pass
+    return fds
+
+def relink(link, port):
+    """Points the stable name at the board's current pty, like a /dev/serial/by-id link"""
+    tmp = link + '.new'
+    os.symlink(port, tmp)
+    os.replace(tmp, link)
+
+if __name__ == "__main__":
+    metrics.enable()
+    sim = Simulator(1, HZ)
+    threading.Thread(target=sim.run, daemon=True).start()
+    results = []
+
+    print("--- Discovery ---")
+    master, slave = os.openpty()
+    results.append(check(probe(sim.ports[0], BAUD_RATE, 1.0), "the simulated board answers the status frame probe"))
+    results.append(check(not probe(os.ttyname(slave), BAUD_RATE, 1.0), "a silent port is not taken for a board"))
+    os.close(master)
+    os.close(slave)
+
+    folder = tempfile.mkdtemp()
+    link = os.path.join(folder, 'usb-Arduino_Uno-if00')
+    relink(link, sim.ports[0])
+    core = HVACController(link, engine=RecognizerEngine(), capture=IdleMic())
+    events = Events(core)
+    core.start()
+    events.wait(lambda k, v: k == 'frames', TIMEOUT)
+    set_target(core, 20)
+    events.wait(board_target(20), TIMEOUT)
+
+    print(f"--- Unplug for {OUTAGE_SECONDS:g} s and replug, {UNPLUGS} times ---")
+    outages, replugs = [], []
+    target = 20
+    try:
+        for i in range(UNPLUGS):
+            sim.unplug(0)
+            os.unlink(link)
+            lost, _ = events.wait(lambda k, v: k == 'disconnected', TIMEOUT)
+            target = 18 + i
+            set_target(core, target)    # Said while the board is away
+            time.sleep(OUTAGE_SECONDS)
+            relink(link, sim.plug(0))
+            plugged = time.perf_counter()
+            back, _ = events.wait(lambda k, v: k == 'frames', TIMEOUT)
+            restored, _ = events.wait(board_target(target), TIMEOUT)
+            outages.append(back - lost)
+            replugs.append(back - plugged)
+            print(f"  lost -> first frame {back - lost:5.2f} s   replug -> first frame {back - plugged:5.2f} s"
+                  f"   replug -> target {target} restored {restored - plugged:5.2f} s")
+        ok = True
+    except TimeoutError:
+        ok = False
+    results.append(check(ok and max(replugs) < MAX_RECOVERY,
+                         f"every replug recovered within {MAX_RECOVERY:g} s and got the setpoint given while offline"))
+    if replugs:
+        print(f"  replug -> first frame  p50 {statistics.median(replugs):.2f} s   max {max(replugs):.2f} s")
+
+    print("--- Board reset (target back to 25, port stays) ---")
+    try:
+        sim.reboot(0)
+        reset = time.perf_counter()
+        events.wait(board_target(25), TIMEOUT)
+        restored, _ = events.wait(board_target(target), TIMEOUT)
+        print(f"  reset -> target {target} restored {restored - reset:5.2f} s")
+        ok = restored - reset < MAX_RECOVERY
+    except TimeoutError:
+        ok = False
+    results.append(check(ok, "the setpoint lost in the reset was sent again"))
+
+    text = metrics.render()
+    print('\n'.join(line for line in text.splitlines()
+                    if line.startswith(('hvac_serial_reconnects', 'hvac_setpoint_resends', 'hvac_serial_recovery_seconds_count',
+                                        'hvac_serial_recovery_seconds_sum'))))
+    core.stop()
+    sim.stop()
+    sim.close()
+
+    print("--- v2 firmware, negotiated on every connection ---")
+    sim = Simulator(2, HZ, protocol=2)
+    threading.Thread(target=sim.run, daemon=True).start()
+    relink(link, sim.ports[0])
+    core = HVACController(link, engine=RecognizerEngine(), capture=IdleMic(), negotiate=True)
+    events = Events(core)
+    core.start()
+    try:
+        events.wait(v2_frames, TIMEOUT)
+        set_target(core, 20)
+        events.wait(board_target(20), TIMEOUT)
+        sim.unplug(0)
+        os.unlink(link)
+        events.wait(lambda k, v: k == 'disconnected', TIMEOUT)
+        set_target(core, 21)
+        relink(link, sim.plug(0))       # Negotiation has to wait out the boot
+        plugged = time.perf_counter()
+        back, _ = events.wait(v2_frames, TIMEOUT)
+        restored, _ = events.wait(board_target(21), TIMEOUT)
+        print(f"  replug -> first v2 frame {back - plugged:5.2f} s   replug -> target 21 restored {restored - plugged:5.2f} s")
+        ok = restored - plugged < MAX_RECOVERY
+    except TimeoutError:
+        ok = False
+    results.append(check(ok, "a replugged v2 board is renegotiated after its boot and gets the setpoint back"))
+
+    # Unplugged while negotiate() waits for the boot: the port it opened must not leak
+    port = sim.ports[1]
+    sim.reboot(1)
+    errors = []
+    opener = threading.Thread(target=lambda: open_port(core, port, errors))
+    opener.start()
+    time.sleep(BOOT_SECONDS / 3)
+    sim.unplug(1)
+    opener.join(TIMEOUT)
+    results.append(check(errors and not open_fds(port), "a failed negotiation closes the port it opened"))
+
+    core.stop()
+    sim.stop()
+    sim.close()
+    os.unlink(link)
+    os.rmdir(folder)
+    if not all(results):
+        sys.exit(1)
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import threading
+import multiprocessing
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from serial_ingest import SerialReader
+
+# --- CONFIGURATION ---
+BAUD_RATE = 9600
+FRAMES = 20000      # Frames pushed through the pty per run
+IDLE_SECONDS = 3    # How long to watch an idle port
+FRAME = b"F,25,31,22,174\n"
+
+def fake_board(master_fd, frames, rate):
+    """Stands in for the Arduino: writes status frames (and a button press) to the pty master"""
+    burst = FRAME * 64
+    sent = 0
+    os.write(master_fd, b"Start\n")
+    while sent < frames:
+        n = min(64, frames - sent)
+        os.write(master_fd, burst[:n * len(FRAME)])
+        sent += n
+        if rate:
+            time.sleep(n / rate)
+    os.write(master_fd, b"Stop\n")
+
+def legacy_loop(ser, counts, done):
+    """The old listen_to_arduino loop: busy-polls in_waiting, one readline per frame"""
+    while not done.is_set():
+        if ser.in_waiting > 0:
+            line = ser.readline().decode('utf-8').strip()
+            if line == "Stop":
+                done.set()
+            elif line != "Start":
+                parts = line.split(',')
+                if len(parts) == 5:
+                    counts[0] += 1
+
+def run_reader(ser, counts, done):
+    def on_frames(frames):
+        counts[0] += len(frames)
+
+    def on_button(msg):
+        if msg == "Stop":
+            done.set()
+            reader.stop()
+
+    reader = SerialReader(ser, on_frames, on_button)
+    reader.run()
+
+def measure(name, target, frames, rate):
+    master, slave = os.openpty()
+    ser = serial.Serial(os.ttyname(slave), BAUD_RATE, timeout=1)
+    counts = [0]
+    done = threading.Event()
+
+    # Idle CPU: nothing is written, the reader should just sleep in read()
+    t = threading.Thread(target=target, args=(ser, counts, done), daemon=True)
+    cpu0 = time.process_time()
+    t.start()
+    time.sleep(IDLE_SECONDS)
+    idle_cpu = (time.process_time() - cpu0) / IDLE_SECONDS * 100
+
+    # Loaded CPU: the board runs in another process so only the reader is measured
+    board = multiprocessing.Process(target=fake_board, args=(master, frames, rate))
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    board.start()
+    done.wait()
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    board.join()
+    ser.close()
+    os.close(master)
+    os.close(slave)
+
+    print(f"{name:8} idle CPU: {idle_cpu:6.1f}%   frames: {counts[0]:6}   "
+          f"CPU/frame: {cpu / max(1, counts[0]) * 1e6:7.2f} us   throughput: {counts[0] / wall:9.0f} frames/s")
+
+if __name__ == "__main__":
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 0
+    print(f"--- Serial ingest benchmark ({FRAMES} frames, rate: {rate or 'unthrottled'}) ---")
+    measure("legacy", legacy_loop, FRAMES, rate)
+    measure("reader", run_reader, FRAMES, rate)
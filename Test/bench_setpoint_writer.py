@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import random
+import statistics
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+import metrics
+from controller import HVACController, SETPOINT_ATTEMPTS
+from recognition import RecognizerEngine
+from simulator import Simulator, VirtualBoard
+from helpers import IdleMic, Events, set_target, check, TIMEOUT
+
+# --- CONFIGURATION ---
+HZ = 10                 # Like the real firmware
+SEQUENTIAL = 20         # Setpoints sent one at a time, for the round trip
+BURSTS = 10             # Bursts of rapid commands...
+BURST_SIZE = 8          # ...of this many setpoints...
+BURST_GAP = 0.01        # ...this far apart, like a user correcting themselves
+LOSS = 0.3              # Share of writes a noisy link loses, for the retry test
+SEED = 1
+
+class LossyBoard(VirtualBoard):
+    """Loses a share of the setpoints written to it, as a noisy cable would"""
+
+    def receive(self, data):
+        if random.random() >= LOSS:
+            super().receive(data)
+
+def applied(target):
+    return lambda kind, value: kind == 'applied' and value[1][0] == target
+
+def start(sim):
+    threading.Thread(target=sim.run, daemon=True).start()
+    core = HVACController(sim.ports[0], engine=RecognizerEngine(), capture=IdleMic())
+    events = Events(core)
+    core.start()
+    events.wait(lambda k, v: k == 'frames')
+    return core, events
+
+def stop(core, sim):
+    core.stop()
+    sim.stop()
+    sim.close()
+
+if __name__ == "__main__":
+    metrics.enable()
+    random.seed(SEED)
+    results = []
+    sim = Simulator(1, HZ)
+    core, events = start(sim)
+
+    print(f"--- Round trip: {SEQUENTIAL} setpoints, board at {HZ} Hz ---")
+    rtts = []
+    for i in range(SEQUENTIAL):
+        target = 18 + i % 10
+        if target == core.unit().board_target:
+            target += 10
+        set_target(core, target)
+        _, (_, (_, rtt)) = events.wait(applied(target))
+        rtts.append(rtt * 1000)
+    q = statistics.quantiles(rtts, n=20)
+    print(f"write -> status frame showing it   p50 {q[9]:6.1f} ms   p95 {q[18]:6.1f} ms   max {max(rtts):6.1f} ms")
+    results.append(check(all(r is not None for r in rtts), "every setpoint was confirmed by a status frame"))
+
+    print(f"--- Bursts: {BURSTS} x {BURST_SIZE} setpoints {BURST_GAP * 1000:g} ms apart ---")
+    writes = commands = 0
+    final_ok = True
+    for b in range(BURSTS):
+        events.drain()
+        # Distinct values, the last one always differing from what the board has now
+        targets = random.sample(range(16, 31), BURST_SIZE - 1) + [31 + b % 5]
+        for t in targets:
+            set_target(core, t)
+            time.sleep(BURST_GAP)
+        commands += len(targets)
+        deadline = time.monotonic() + TIMEOUT
+        while core.unit().board_target != targets[-1] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(2 / HZ)                  # Let any stray write show up
+        items = events.drain()
+        sent = [v[1][0] for _, k, v in items if k == 'setpoint']
+        writes += len(sent)
+        final_ok &= core.unit().board_target == targets[-1]
+        final_ok &= len(sent) == len(set(sent))
+    print(f"{commands} commands -> {writes} writes ({writes / commands:.2f} per command)")
+    results.append(check(final_ok, "every burst ended on its last setpoint, nothing written twice"))
+    results.append(check(writes < commands / 2, "bursts were coalesced"))
+    stop(core, sim)
+
+    print(f"--- Noisy link: {LOSS:.0%} of writes lost ---")
+    sim = Simulator(1, HZ)
+    sim.boards[0].board = LossyBoard()
+    core, events = start(sim)
+    confirmed = 0
+    for i in range(SEQUENTIAL):
+        target = 18 + i % 10
+        if target == core.unit().board_target:
+            target += 10
+        set_target(core, target)
+        try:
+            _, (_, (_, rtt)) = events.wait(applied(target))
+        except TimeoutError:
+            rtt = None
+        confirmed += rtt is not None
+    stop(core, sim)
+    text = metrics.render()
+    print('\n'.join(line for line in text.splitlines()
+                    if line.startswith(('hvac_setpoint_retries', 'hvac_setpoint_failures', 'hvac_setpoint_coalesced',
+                                        'hvac_setpoint_writes_total'))))
+    print(f"{confirmed} of {SEQUENTIAL} confirmed (after {SETPOINT_ATTEMPTS} attempts {LOSS ** SETPOINT_ATTEMPTS:.1%} are expected to fail)")
+    results.append(check(confirmed >= SEQUENTIAL * (1 - 3 * LOSS ** SETPOINT_ATTEMPTS) - 1,
+                         "lost writes were retried until the board took them"))
+    if not all(results):
+        sys.exit(1)
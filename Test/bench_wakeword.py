@@ -0,0 +1,204 @@
+import os
+import sys
+import glob
+import time
+import queue
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+import numpy as np
+import dsp
+import wakeword
+from wakeword import WakeWordSpotter
+from capture import CaptureService, CHUNK, SAMPLE_RATE
+from controller import HVACController
+from recognition import RecognizerEngine
+from simulator import Simulator
+from helpers import check
+
+# --- CONFIGURATION ---
+RATE = SAMPLE_RATE
+MINUTES = 10             # Of each synthetic background
+SEED = 11
+MAX_CPU = 0.03           # Share of one core continuous listening may use
+MAX_FALSE_PER_HOUR = 2
+MIN_DETECTION = 0.9
+MIN_DETECTION_OVER_TALK = 0.8   # Babble: some wake words land on top of another talker's words
+TRIALS = 40              # Wake words said over each background...
+WORD_RMS = 2000          # ...at this level, someone talking to the PC from across the desk
+# The wake word, as (consonant, (F1, F2) at the start, (F1, F2) at the end, seconds) per syllable
+WAKE_WORD = [('h', (700, 1800), (400, 2300), 0.24), ('th', (520, 1350), (480, 1250), 0.16),
+             ('m', (550, 900), (450, 800), 0.26)]
+VOWELS = [(730, 1090), (270, 2290), (300, 870), (530, 1840), (570, 840), (660, 1720), (490, 1350), (400, 2000)]
+
+def syllable(consonant, start, end, seconds, f0, rng):
+    """Additive synthesis of a voiced syllable whose two formants glide from start to end"""
+    n = int(seconds * RATE)
+    t = np.arange(n) / RATE
+    glide = np.linspace(0, 1, n)
+    f1 = start[0] + (end[0] - start[0]) * glide
+    f2 = start[1] + (end[1] - start[1]) * glide
+    pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 3 * t + rng.uniform(0, 6)))
+    phase = 2 * np.pi * np.cumsum(pitch) / RATE
+    x = np.zeros(n)
+    for k in range(1, int(4000 / f0)):
+        hz = k * pitch
+        gain = np.exp(-((hz - f1) / 120) ** 2) + 0.6 * np.exp(-((hz - f2) / 180) ** 2) + 0.02
+        x += gain * np.sin(k * phase)
+    x *= np.minimum(1, np.minimum(glide, 1 - glide) * 12)        # Soft on and off
+    noise = {'h': 0.06, 'th': 0.05, 's': 0.12}.get(consonant)
+    if noise:
+        # A breathy or fricative onset, high-passed by differencing
+        burst = np.diff(rng.normal(0, noise, int(0.06 * RATE) + 1))
+        x = np.concatenate((burst * 3, x))
+    return x
+
+def say(syllables, f0, speed, formants, rng):
+    parts = [syllable(c, (a[0] * formants, a[1] * formants), (b[0] * formants, b[1] * formants), s / speed, f0, rng)
+             for c, a, b, s in syllables]
+    return np.concatenate(parts)
+
+def wake_word(rng, spread=1.0):
+    """The wake word said by the user, a bit differently each time"""
+    return say(WAKE_WORD, 130 * rng.uniform(1 - 0.12 * spread, 1 + 0.12 * spread),
+               rng.uniform(1 - 0.12 * spread, 1 + 0.12 * spread), rng.uniform(1 - 0.04 * spread, 1 + 0.04 * spread), rng)
+
+def babble(seconds, rng):
+    """People talking a few metres away: random syllables in runs with pauses, several voices"""
+    out = np.zeros(int(seconds * RATE))
+    pos = 0
+    while pos < len(out):
+        f0 = rng.uniform(90, 230)
+        words = [(rng.choice(['', 'h', 's', 'th']), VOWELS[rng.integers(len(VOWELS))], VOWELS[rng.integers(len(VOWELS))],
+                  rng.uniform(0.1, 0.3)) for _ in range(rng.integers(1, 6))]
+        x = say(words, f0, 1.0, 1.0, rng) * 10 ** rng.uniform(-0.5, 0.3)
+        x = x[:len(out) - pos]
+        out[pos:pos + len(x)] += x * 1500
+        pos += len(x) + int(rng.uniform(0.05, 1.5) * RATE)
+    return out
+
+def hvac(seconds, rng):
+    """Air handler: mains hum and its harmonics over a broadband fan"""
+    t = np.arange(int(seconds * RATE)) / RATE
+    hum = sum(np.sin(2 * np.pi * 50 * k * t) / k for k in range(1, 6))
+    fan = np.convolve(rng.normal(0, 1, len(t)), np.ones(8) / 8, 'same')
+    return hum * 250 + fan * 600
+
+def plant(seconds, rng):
+    """Machinery: a wandering whine and irregular clanks"""
+    t = np.arange(int(seconds * RATE)) / RATE
+    whine = np.sin(2 * np.pi * np.cumsum(1800 + 300 * np.sin(2 * np.pi * 0.1 * t)) / RATE) * 300
+    x = whine + rng.normal(0, 150, len(t))
+    for at in np.cumsum(rng.exponential(1.5, int(seconds))) * RATE:
+        at = int(at)
+        if at < len(x) - 4000:
+            x[at:at + 4000] += rng.normal(0, 6000, 4000) * np.exp(-np.arange(4000) / 400)
+    return x
+
+BACKGROUNDS = {'babble': babble, 'hvac': hvac, 'plant': plant}
+
+def pcm(x):
+    return dsp.to_pcm(x)
+
+def run(spotter, audio):
+    """(trigger times, CPU seconds) for audio fed CHUNK by CHUNK like the capture thread does"""
+    step = CHUNK * 2
+    triggers = []
+    start = time.process_time()
+    for i in range(0, len(audio) - step + 1, step):
+        if spotter.feed(audio[i:i + step]):
+            triggers.append(i / 2 / RATE)
+    return triggers, time.process_time() - start
+
+def templates(rng):
+    return wakeword.enroll([pcm(np.concatenate((np.zeros(3000), wake_word(rng) * 8000, np.zeros(3000))))
+                            for _ in range(5)], RATE)
+
+class FedMic(CaptureService):
+    """A microphone that plays audio given to play() in real time"""
+
+    def start(self):
+        self.ready.set()
+
+    def play(self, audio):
+        step = self.chunk_bytes
+        for i in range(0, len(audio) - step + 1, step):
+            self.write(audio[i:i + step])
+            time.sleep(self.chunk / self.rate)
+
+    def close(self):
+        pass
+
+def controller_check(enrolled, rng):
+    """The wake word, played into a controller's microphone, starts a recording"""
+    sim = Simulator(1)
+    threading.Thread(target=sim.run, daemon=True).start()
+    mic = FedMic(RATE, CHUNK)
+    core = HVACController(sim.ports[0], engine=RecognizerEngine(), capture=mic, wake=WakeWordSpotter(enrolled, RATE))
+    events = queue.Queue()
+    core.subscribe(lambda kind, value: events.put((kind, value)), 'wake', 'recording')
+    core.start()
+    word = wake_word(rng)
+    noise = hvac(len(word) / RATE + 2.0, rng)
+    noise[RATE:RATE + len(word)] += word * WORD_RMS / np.sqrt(np.mean(word ** 2))
+    mic.play(pcm(noise))
+    time.sleep(0.3)
+    got = []
+    while not events.empty():
+        got.append(events.get())
+    core.stop()
+    sim.stop()
+    sim.close()
+    return got[:2] == [('wake', None), ('recording', True)]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="CPU use, false triggers and detection of the wake word spotter")
+    ap.add_argument('--minutes', type=float, default=MINUTES, help="of each synthetic background")
+    ap.add_argument('--noise', default=None, help="folder of recorded background noise (.wav) to test as well")
+    ap.add_argument('--threshold', type=float, default=wakeword.THRESHOLD)
+    args = ap.parse_args()
+    rng = np.random.default_rng(SEED)
+    enrolled = templates(rng)
+    seconds = args.minutes * 60
+    results = []
+
+    backgrounds = {name: make(seconds, rng) for name, make in BACKGROUNDS.items()}
+    if args.noise:
+        for path in sorted(glob.glob(os.path.join(args.noise, '*.wav'))):
+            backgrounds[os.path.basename(path)] = dsp.samples(wakeword.read_wav(path, RATE)).astype(float)
+
+    print(f"--- {len(enrolled)} templates, threshold {args.threshold:g}, {CHUNK}-sample chunks at {RATE} Hz ---")
+    print(f"{'background':14} {'minutes':>8} {'CPU':>7} {'analysed':>9} {'false/h':>8} {'SNR':>6} {'detected':>9}")
+    for name, noise in backgrounds.items():
+        minutes = len(noise) / RATE / 60
+        spotter = WakeWordSpotter(enrolled, RATE, args.threshold)
+        triggers, cpu = run(spotter, pcm(noise))
+        false_per_hour = len(triggers) / (minutes / 60)
+        share = spotter.analysed / max(1, spotter.chunks)
+
+        # The same background with the wake word said over it every few seconds
+        spaced = int(len(noise) / TRIALS)
+        said = noise.copy()
+        ends = []
+        snr = 20 * np.log10(WORD_RMS / np.sqrt(np.mean(noise ** 2)))
+        for k in range(TRIALS):
+            word = wake_word(rng)
+            word *= WORD_RMS / np.sqrt(np.mean(word ** 2))
+            at = k * spaced + spaced // 3
+            said[at:at + len(word)] += word
+            ends.append((at + len(word)) / RATE)
+        hits, _ = run(WakeWordSpotter(enrolled, RATE, args.threshold), pcm(said))
+        detected = sum(any(end - 1.0 <= h <= end + 0.5 for h in hits) for end in ends) / TRIALS
+
+        wanted = MIN_DETECTION_OVER_TALK if name == 'babble' else MIN_DETECTION
+        print(f"{name:14} {minutes:8.1f} {cpu / (minutes * 60):7.2%} {share:9.1%} {false_per_hour:8.1f} {snr:4.0f}dB {detected:9.0%}")
+        results.append(check(cpu / (minutes * 60) < MAX_CPU and false_per_hour <= MAX_FALSE_PER_HOUR
+                             and detected >= wanted,
+                             f"{name}: under {MAX_CPU:.0%} of a core, at most {MAX_FALSE_PER_HOUR} false triggers an hour, "
+                             f"{wanted:.0%} of wake words heard"))
+
+    print("--- Controller ---")
+    results.append(check(controller_check(enrolled, rng), "the wake word starts a recording like the button's \"Start\""))
+    if not all(results):
+        sys.exit(1)
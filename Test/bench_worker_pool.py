@@ -0,0 +1,194 @@
+import os
+import sys
+import time
+import queue
+import asyncio
+import tempfile
+import threading
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+import numpy as np
+import dsp
+from controller import HVACController
+from capture import SAMPLE_RATE
+from recognition import RecognizerEngine, PoolEngine
+from simulator import Simulator
+from helpers import IdleMic, check
+
+# --- CONFIGURATION ---
+HZ = 50                  # Board frame rate for the ingest measurement (the real one sends 10)
+UI_HZ = 60               # The window's frame rate...
+UI_WORK_MS = 2.0         # ...and the Python work drawing one frame takes
+DECODE_CPU = 0.8         # CPU seconds of pure Python one decode takes, holding the GIL
+UTTERANCES = 5
+UTTERANCE_SECONDS = 2.0
+WORKERS = 2
+TIMEOUT = 30
+MAX_UI_P95_MS = 1.5 * 1000 / UI_HZ       # With the pool, 95% of UI frames on time within half a frame
+MAX_SERIAL_GAP_MS = 3 * 1000 / HZ        # ...and no status frame held back more than two periods
+
+try:
+    from speech_recognition import AudioData
+    Core = HVACController
+except ImportError:
+    class AudioData:
+        """The fields of speech_recognition.AudioData that an engine and the pool use"""
+
+        def __init__(self, frame_data, sample_rate, sample_width):
+            self.frame_data = frame_data
+            self.sample_rate = sample_rate
+            self.sample_width = sample_width
+
+    class Core(HVACController):
+        def _audio_data(self, frames):
+            return AudioData(*dsp.preprocess(b''.join(frames), self.capture.rate), 2)
+
+class BusyEngine(RecognizerEngine):
+    """A decoder written in Python: keeps the GIL for DECODE_CPU seconds per utterance"""
+
+    name = 'busy'
+    offline = True
+
+    def __init__(self, cpu=DECODE_CPU, crash_file=None):
+        super().__init__()
+        self.cpu = cpu
+        self.crash_file = crash_file
+
+    def recognize(self, audio):
+        if self.crash_file and os.path.exists(self.crash_file):
+            os.remove(self.crash_file)
+            os._exit(3)
+        start = time.thread_time()
+        x = 0
+        while time.thread_time() - start < self.cpu:
+            for i in range(2000):
+                x += i * i
+        return "twenty two"
+
+def run_simulator(hz, conn):
+    sim = Simulator(1, hz)
+    conn.send(sim.ports)
+    threading.Thread(target=sim.run, daemon=True).start()
+    conn.recv()
+    sim.stop()
+    sim.close()
+
+def utterance(seed):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(UTTERANCE_SECONDS * SAMPLE_RATE)) / SAMPLE_RATE
+    return dsp.to_pcm(3000 * np.sin(2 * np.pi * 150 * t) * np.sin(np.pi * t / UTTERANCE_SECONDS) + rng.normal(0, 100, len(t)))
+
+def decode(core, audio):
+    """Runs the controller's decode path on one recording, from another thread"""
+    return asyncio.run_coroutine_threadsafe(core.process_audio([audio], None), core.loop)
+
+def ui_loop(until):
+    """Stand-in for Tk's mainloop: a frame every 1 / UI_HZ s on this thread; returns the frame intervals in ms"""
+    period = 1.0 / UI_HZ
+    intervals = []
+    last = next_frame = time.perf_counter()
+    while not until():
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+        now = time.perf_counter()
+        intervals.append((now - last) * 1000)
+        last = now
+        spin = now + UI_WORK_MS / 1000
+        while time.perf_counter() < spin:
+            pass
+        next_frame = max(next_frame + period, time.perf_counter())
+    return intervals
+
+def measure(label, core, arrivals):
+    """UI frame intervals and serial frame gaps while UTTERANCES are decoded one after another"""
+    done = threading.Event()
+
+    def speak():
+        for i in range(UTTERANCES):
+            decode(core, utterance(i)).result(TIMEOUT)
+        done.set()
+
+    arrivals.clear()
+    started = time.perf_counter()
+    threading.Thread(target=speak, daemon=True).start()
+    ui = ui_loop(done.is_set)
+    seconds = time.perf_counter() - started
+    gaps = np.diff(list(arrivals)) * 1000
+    q = statistics.quantiles(ui, n=100)
+    print(f"{label:12} UI frame p50 {q[49]:5.1f} ms  p95 {q[94]:6.1f} ms  max {max(ui):6.1f} ms   "
+          f"serial gap p99 {np.percentile(gaps, 99):6.1f} ms  max {gaps.max():6.1f} ms   "
+          f"{UTTERANCES} decodes in {seconds:4.1f} s")
+    return q[94], gaps.max()
+
+def start(engine, port):
+    core = Core(port, engine=engine, capture=IdleMic())
+    arrivals = []
+    events = queue.Queue()
+    core.subscribe(lambda kind, value: arrivals.append(time.perf_counter()), 'frames')
+    core.subscribe(lambda kind, value: events.put((kind, value)), 'transcript', 'error')
+    core.start()
+    engine.wait_ready(TIMEOUT)
+    deadline = time.monotonic() + TIMEOUT
+    while not arrivals and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return core, arrivals, events
+
+if __name__ == "__main__":
+    # The board runs in its own process, as the real one is on the other end of a cable
+    parent, child = multiprocessing.Pipe()
+    board = multiprocessing.Process(target=run_simulator, args=(HZ, child), daemon=True)
+    board.start()
+    port = parent.recv()[0]
+    results = []
+    crash_file = os.path.join(tempfile.gettempdir(), f"hvac_pool_crash_{os.getpid()}")
+
+    print(f"--- {UTTERANCES} decodes of {DECODE_CPU:g} CPU s, UI at {UI_HZ} Hz, board at {HZ} Hz, {os.cpu_count()} CPU ---")
+    core, arrivals, _ = start(BusyEngine(), port)
+    arrivals.clear()
+    idle = threading.Event()
+    threading.Timer(3.0, idle.set).start()
+    ui = ui_loop(idle.is_set)
+    print(f"{'idle':12} UI frame p50 {statistics.median(ui):5.1f} ms  p95 {statistics.quantiles(ui, n=100)[94]:6.1f} ms")
+    before = measure('in process', core, arrivals)
+    core.stop()
+
+    pool = PoolEngine(BusyEngine, {'crash_file': crash_file}, workers=WORKERS)
+    core, arrivals, events = start(pool, port)
+    after = measure(f"{WORKERS} workers", core, arrivals)
+    results.append(check(after[0] <= MAX_UI_P95_MS and after[1] <= MAX_SERIAL_GAP_MS,
+                         f"UI p95 under {MAX_UI_P95_MS:.0f} ms and serial gaps under {MAX_SERIAL_GAP_MS:.0f} ms while decoding"))
+    results.append(check(after[0] < before[0] and after[1] < before[1], "better than decoding in process on both counts"))
+
+    print("--- A worker crashes mid-decode ---")
+    while not events.empty():
+        events.get()
+    open(crash_file, 'w').close()
+    decode(core, utterance(0)).result(TIMEOUT)
+    decode(core, utterance(1)).result(TIMEOUT)
+    got = [events.get(timeout=TIMEOUT) for _ in range(2)]
+    print(f"events: {got}   restarts: {pool.restarts}")
+    results.append(check(got == [('error', "Recognition failed"), ('transcript', "twenty two")] and pool.restarts == 1,
+                         "only the utterance being decoded failed, the worker was restarted"))
+
+    print(f"--- {UTTERANCES + 3} utterances at once, {WORKERS} workers, queue of {pool.queue_size} ---")
+    while not events.empty():
+        events.get()
+    dropped = pool.dropped
+    started = time.perf_counter()
+    futures = [decode(core, utterance(i)) for i in range(UTTERANCES + 3)]
+    for f in futures:
+        f.result(TIMEOUT)
+    seconds = time.perf_counter() - started
+    got = [events.get(timeout=TIMEOUT)[0] for _ in futures]
+    dropped = pool.dropped - dropped
+    print(f"{got.count('transcript')} decoded, {dropped} dropped, all settled in {seconds:.1f} s")
+    results.append(check(dropped >= len(futures) - WORKERS - pool.queue_size and got.count('transcript') == len(futures) - dropped,
+                         "the backlog stayed bounded: the oldest waiting utterances were dropped, the rest decoded"))
+
+    core.stop()
+    pool.close()
+    parent.send(None)
+    board.join(5)
+    if not all(results):
+        sys.exit(1)
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import threading
+import random
+import struct
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from controller import HVACController, LATE_STOP_SECONDS
+from capture import CaptureService
+from simulator import Simulator
+from helpers import ScriptedEngine, Events, board_target, check, TIMEOUT
+
+# --- CONFIGURATION ---
+HZ = 50               # Simulated board frame rate
+NOISE_LEVEL = 60      # Background hiss of the simulated microphone
+SPEECH_LEVEL = 6000   # "Speech" is a loud square wave
+
+class SimulatedMic(CaptureService):
+    """CaptureService fed in real time by a thread instead of PyAudio"""
+
+    def __init__(self):
+        super().__init__()
+        self.speaking_until = 0.0
+
+    def speak(self, seconds):
+        self.speaking_until = time.monotonic() + seconds
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self.ready.set()
+
+    def _run(self):
+        period = self.chunk / self.rate
+        next_chunk = time.monotonic()
+        while True:
+            loud = time.monotonic() < self.speaking_until
+            level = SPEECH_LEVEL if loud else NOISE_LEVEL
+            samples = [(level if (i // 20) % 2 else -level) if loud else random.randint(-level, level)
+                       for i in range(self.chunk)]
+            self.write(struct.pack(f'<{self.chunk}h', *samples))
+            next_chunk += period
+            time.sleep(max(0.0, next_chunk - time.monotonic()))
+
+    def close(self):
+        pass
+
+if __name__ == "__main__":
+    sim = Simulator(1, HZ)
+    board = sim.boards[0].board
+    threading.Thread(target=sim.run, daemon=True).start()
+
+    mic = SimulatedMic()
+    engine = ScriptedEngine()
+    core = HVACController(sim.ports[0], engine=engine, capture=mic)
+    events = Events(core)
+    core.start()
+    print(f"--- Headless controller harness (board on {sim.ports[0]}) ---")
+    results = []
+
+    results.append(check(events.seen(lambda k, v: k == 'frames') is not None, "connects and streams frames"))
+
+    # 1. Board button, speech, silence: the VAD ends the recording and the board gets the setpoint
+    engine.next_text = "set it to eighteen"
+    board.press()
+    results.append(check(events.seen(lambda k, v: k == 'recording' and v) is not None, "board button starts a recording"))
+    time.sleep(0.4)
+    mic.speak(0.6)
+    spoken = time.perf_counter() + 0.6
+    stopped = events.seen(lambda k, v: k == 'recording' and not v)
+    results.append(check(stopped is not None, "silence ends the recording"))
+    echoed = events.seen(board_target(18))
+    results.append(check(echoed is not None, "voice setpoint reaches the board"
+                         + (f" ({(echoed - spoken) * 1000:.0f} ms after speech ended)" if echoed else "")))
+
+    # 2. Text command through the thread-safe API, relative to the board's target
+    results.append(check(core.command("two degrees warmer").result(TIMEOUT) == 20, "text command resolves"))
+    results.append(check(events.seen(board_target(20)) is not None, "text setpoint reaches the board"))
+
+    # 3. Stopped by the button instead of silence
+    engine.next_text = "twenty four"
+    core.press()
+    events.seen(lambda k, v: k == 'recording' and v)
+    mic.speak(5)
+    time.sleep(0.5)
+    board.press()
+    results.append(check(events.seen(lambda k, v: k == 'transcript' and v == "twenty four") is not None, "button stops a recording"))
+    results.append(check(events.seen(board_target(24)) is not None, "second setpoint reaches the board"))
+
+    # 4. The board's own flag: a recording that ended on silence leaves it on "recording"
+    engine.next_text = ""
+    for late in (True, False):
+        board.press()                       # "Start"
+        events.seen(lambda k, v: k == 'recording' and v)
+        time.sleep(0.4)
+        mic.speak(0.6)
+        events.seen(lambda k, v: k == 'recording' and not v)
+        if not late:
+            time.sleep(LATE_STOP_SECONDS)
+        board.press()                       # "Stop", with nothing recording
+        started = events.seen(lambda k, v: k == 'recording' and v, 1.0)
+        if late:
+            results.append(check(started is None, "a Stop right after the recording ended on silence is ignored"))
+        else:
+            results.append(check(started is not None, "a later Stop while idle starts a recording"))
+            board.press()                   # "Start", while recording
+            results.append(check(events.seen(lambda k, v: k == 'recording' and not v) is not None,
+                                 "the next press stops it"))
+        events.seen(lambda k, v: k == 'idle', 2.0)
+
+    results.append(check(len(core.unit().telemetry.ring) > 0, f"telemetry recorded ({len(core.unit().telemetry.ring)} samples)"))
+    core.stop()
+    sim.stop()
+    sim.close()
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,91 @@
+# Pieces shared by the scripts that drive an HVACController against the simulator
+import os
+import sys
+import time
+import queue
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from capture import CaptureService
+from recognition import RecognizerEngine
+
+# --- CONFIGURATION ---
+TIMEOUT = 10          # Default wait for a controller event
+
+class IdleMic(CaptureService):
+    """No microphone: for benchmarks about the serial side"""
+
+    def start(self):
+        self.ready.set()
+
+    def close(self):
+        pass
+
+class ScriptedSession:
+    def __init__(self, text):
+        self.text = text
+        self.chunks = 0
+
+    def feed(self, chunk):
+        self.chunks += 1
+
+    def finish(self, timeout=5):
+        return self.text
+
+class ScriptedEngine(RecognizerEngine):
+    """Recognizes whatever the test says the user will say next"""
+
+    name = 'scripted'
+    offline = True
+
+    def __init__(self):
+        super().__init__()
+        self.next_text = ''
+
+    def recognize(self, audio):
+        return self.next_text
+
+    def stream(self, rate, on_partial=None):
+        return ScriptedSession(self.next_text)
+
+class Events:
+    """Controller events in arrival order, each with the perf_counter() it was emitted at"""
+
+    def __init__(self, core):
+        self.queue = queue.Queue()
+        core.subscribe(lambda kind, value: self.queue.put((time.perf_counter(), kind, value)))
+
+    def wait(self, match, timeout=TIMEOUT):
+        """(time, value) of the next event match(kind, value) accepts; TimeoutError if none comes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                t, kind, value = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError
+            if match(kind, value):
+                return t, value
+
+    def seen(self, match, timeout=TIMEOUT):
+        """Time of the next matching event, None if none comes"""
+        try:
+            return self.wait(match, timeout)[0]
+        except TimeoutError:
+            return None
+
+    def drain(self):
+        """Every (time, kind, value) received and not consumed yet"""
+        items = []
+        while not self.queue.empty():
+            items.append(self.queue.get())
+        return items
+
+def set_target(core, target):
+    asyncio.run_coroutine_threadsafe(core.set_target(target), core.loop).result(TIMEOUT)
+
+def board_target(target):
+    return lambda kind, value: kind == 'frames' and value[1][-1].target == target
+
+def check(ok, text):
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: {text}")
+    return ok
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import threading
+import multiprocessing
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Voice_Controlled_AC'))
+from serial_ingest import SerialReader
+from protocol import encode_ascii_setpoint
+from simulator import Simulator
+
+# --- CONFIGURATION ---
+BAUD_RATE = 9600
+UNITS = 8           # Virtual boards, each on its own pty
+HZ = 200            # Frames per second per board (the real one sends 10)
+SECONDS = 5
+SETPOINT = 18       # Sent to every board halfway through, must come back in the target field
+
+def run_simulator(units, hz, seconds, conn):
+    sim = Simulator(units, hz)
+    conn.send(sim.ports)
+    cpu0 = time.process_time()
+    sim.run(seconds)
+    conn.send((sim.ticks, sum(b.dropped for b in sim.boards), time.process_time() - cpu0))
+    conn.recv()     # Keep the ptys open until the host has closed its side
+    sim.close()
+
+class Unit:
+    """Host side of one board: the same SerialReader listen_to_arduino uses"""
+
+    def __init__(self, port):
+        self.ser = serial.Serial(port, BAUD_RATE, timeout=1)
+        self.frames = 0
+        self.targets = set()
+        self.reader = SerialReader(self.ser, self.on_frames, lambda msg: None)
+        self.thread = threading.Thread(target=self.reader.run, daemon=True)
+
+    def on_frames(self, frames):
+        self.frames += len(frames)
+        self.targets.add(frames[-1].target)
+
+if __name__ == "__main__":
+    print(f"--- Simulator load test ({UNITS} units x {HZ} Hz for {SECONDS}s) ---")
+    parent, child = multiprocessing.Pipe()
+    sim = multiprocessing.Process(target=run_simulator, args=(UNITS, HZ, SECONDS, child))
+    sim.start()
+    units = [Unit(port) for port in parent.recv()]
+
+    cpu0 = time.process_time()
+    for u in units:
+        u.thread.start()
+    time.sleep(SECONDS / 2)
+    for u in units:
+        u.ser.write(encode_ascii_setpoint(SETPOINT))
+    ticks, dropped, sim_cpu = parent.recv()
+    time.sleep(0.2)
+    host_cpu = time.process_time() - cpu0
+    for u in units:
+        u.reader.stop()
+        u.thread.join(2)
+        u.ser.close()
+    parent.send(None)
+    sim.join()
+
+    sent = ticks * UNITS
+    received = sum(u.frames for u in units)
+    print(f"simulator: {ticks / SECONDS:7.1f} ticks/s   {sent} frames sent   {dropped} bytes dropped   "
+          f"CPU/frame: {sim_cpu / max(1, sent) * 1e6:6.2f} us")
+    print(f"host:      {received} frames parsed   CPU/frame: {host_cpu / max(1, received) * 1e6:6.2f} us")
+
+    failed = False
+    if received < sent * 0.99:
+        print(f"❌ FAIL: host lost {sent - received} of {sent} frames")
+        failed = True
+    for i, u in enumerate(units):
+        if SETPOINT not in u.targets:
+            print(f"❌ FAIL: unit {i} never reported target {SETPOINT} (saw {sorted(u.targets)})")
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ PASS: every frame parsed and every unit took the new setpoint")
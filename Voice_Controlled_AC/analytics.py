@@ -0,0 +1,222 @@
+import os
+import re
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from telemetry_store import MAGIC, RECORD, STATE_CODES
+
+# One log record as NumPy sees it, same layout as telemetry_store.RECORD
+RECORD_DTYPE = np.dtype([('ts', '<f8'), ('state', 'u1'), ('target', 'i1'),
+                         ('inside', 'i1'), ('outside', 'i1'), ('speed', 'u1')])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+# --- Firmware behaviour (Voice_Controlled_AC.ino) ---
+DEADBAND = 2                 # The motor runs while |in - target| > 2
+FORWARD = STATE_CODES['F']
+BACKWARD = STATE_CODES['B']
+
+CHUNK_RECORDS = 1 << 22      # Records analysed at a time (54 MB), bounds memory for any file size
+GAP_SECONDS = 5.0            # Longer silences are logging outages, not time spent in a state
+SHORT_RUN_SECONDS = 30.0     # Motor runs shorter than this count as short cycles
+REPORT_FIELDS = ('unit', 'files', 'samples', 'hours', 'forward_pct', 'backward_pct', 'deadband_pct',
+                 'settle_p50_s', 'settle_p90_s', 'unsettled', 'starts_per_h', 'short_run_pct', 'crossings_per_h')
+
+
+def load(path):
+    """Memory map of a telemetry log's records (whole records only); None if it is not one"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+    n = (os.path.getsize(path) - len(MAGIC)) // RECORD_DTYPE.itemsize
+    if n == 0:
+        return np.zeros(0, RECORD_DTYPE)
+    return np.memmap(path, RECORD_DTYPE, mode='r', offset=len(MAGIC), shape=(n,))
+
+
+def _new_totals():
+    return {'samples': 0, 'seconds': 0.0, 'forward': 0.0, 'backward': 0.0, 'band': 0.0, 'starts': 0,
+            'crossings': 0, 'unsettled': 0, 'settle': [], 'runs': []}
+
+def _analyse_chunk(rec, totals, carry):
+    """Adds one chunk to totals. rec starts with the last record of the previous chunk, if any.
+
+    carry holds what is still open at the end of a chunk: the time of a
+    setpoint change not settled yet and the start of a motor run.
+    """
+    ts = rec['ts']
+    state = rec['state']
+    target = rec['target'].astype(np.int16)
+    diff = np.abs(rec['inside'].astype(np.int16) - target)
+    n = len(rec)
+
+    # Time weighted shares: every sample holds until the next one
+    dt = np.diff(ts)
+    dt[(dt < 0) | (dt > GAP_SECONDS)] = 0.0
+    held = state[:-1]
+    inband = diff <= DEADBAND
+    totals['seconds'] += float(dt.sum())
+    totals['forward'] += float(dt[held == FORWARD].sum())
+    totals['backward'] += float(dt[held == BACKWARD].sum())
+    totals['band'] += float(dt[inband[:-1]].sum())
+
+    # Motor runs, from each start to the next stop
+    running = state != STATE_CODES['S']
+    edges = np.flatnonzero(running[1:] != running[:-1]) + 1
+    on = edges[running[edges]]
+    off = edges[~running[edges]]
+    totals['starts'] += len(on)
+    starts = ts[on]
+    if carry['run'] is not None:
+        starts = np.concatenate(([carry['run']], starts))
+    stops = ts[off]
+    if len(stops) and (not len(starts) or stops[0] < starts[0]):
+        stops = stops[1:]   # Started before the log began, length unknown
+    paired = min(len(starts), len(stops))
+    totals['runs'].append(stops[:paired] - starts[:paired])
+    carry['run'] = float(starts[paired]) if len(starts) > paired else None
+
+    # Oscillation around the hysteresis: crossings of the |in - target| > 2 edge
+    outside = ~inband
+    totals['crossings'] += int(np.count_nonzero(outside[1:] != outside[:-1]))
+
+    # Settling: from a setpoint change to the first sample within the deadband
+    changes = np.flatnonzero(target[1:] != target[:-1]) + 1
+    change_ts = ts[changes]
+    if carry['change'] is not None:
+        changes = np.concatenate(([0], changes))
+        change_ts = np.concatenate(([carry['change']], change_ts))
+    if len(changes):
+        index = np.where(inband, np.arange(n), n)
+        next_inband = np.minimum.accumulate(index[::-1])[::-1]
+        settled_at = next_inband[changes]
+        ends = np.append(changes[1:], n)
+        ok = settled_at < ends
+        totals['settle'].append(ts[settled_at[ok]] - change_ts[ok])
+        superseded = ~ok
+        superseded[-1] = False
+        totals['unsettled'] += int(np.count_nonzero(superseded))
+        carry['change'] = None if ok[-1] else float(change_ts[-1])
+    totals['samples'] += n - (0 if carry['first'] else 1)
+    carry['first'] = False
+
+def analyse_file(path, chunk=CHUNK_RECORDS):
+    """Totals for one log file, read chunk by chunk from a memory map; None if path is not a log"""
+    rec = load(path)
+    if rec is None:
+        return None
+    totals = _new_totals()
+    carry = {'run': None, 'change': None, 'first': True}
+    for start in range(0, len(rec), chunk):
+        # Overlap by one record so nothing at a chunk edge is missed or counted twice
+        _analyse_chunk(np.asarray(rec[max(0, start - 1):start + chunk]), totals, carry)
+    totals['unsettled'] += carry['change'] is not None
+    if len(rec):
+        totals['first'] = float(rec['ts'][0])
+        totals['last'] = float(rec['ts'][-1])
+    totals['settle'] = np.concatenate(totals['settle']) if totals['settle'] else np.zeros(0)
+    totals['runs'] = np.concatenate(totals['runs']) if totals['runs'] else np.zeros(0)
+    return totals
+
+
+def unit_of(path, root=None):
+    """Unit a log belongs to: its path under root without the rotation suffix (site1/kitchen.tlm.3 -> site1/kitchen.tlm).
+
+    Logs of the same name in different folders (every site's telemetry.log)
+    stay different units; with no root only the file name is used.
+    """
+    name = os.path.basename(path) if root is None else os.path.relpath(os.path.abspath(path), root)
+    return re.sub(r'\.\d+$', '', name.replace(os.sep, '/'))
+
+def common_root(logs):
+    """Deepest folder holding every one of logs"""
+    return os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in logs]) if logs else None
+
+def find_logs(paths):
+    """Telemetry logs among paths, directories searched recursively"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found += [os.path.join(root, name) for name in sorted(names)]
+        else:
+            found.append(path)
+    logs = []
+    for path in found:
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) == MAGIC:
+                    logs.append(path)
+        except OSError:
+            pass
+    return logs
+
+def report_row(unit, parts):
+    """One REPORT_FIELDS row from the per-file totals of a unit.
+
+    Files are analysed independently, so a run or setpoint change spanning
+    a rotation boundary is cut there: at 10 Hz that is one in 33 hours.
+    """
+    seconds = sum(p['seconds'] for p in parts) or float('nan')
+    hours = seconds / 3600
+    settle = np.concatenate([p['settle'] for p in parts])
+    runs = np.concatenate([p['runs'] for p in parts])
+    p50, p90 = np.percentile(settle, [50, 90]) if len(settle) else (float('nan'),) * 2
+    return {
+        'unit': unit,
+        'files': len(parts),
+        'samples': sum(p['samples'] for p in parts),
+        'hours': round(hours, 2),
+        'forward_pct': round(100 * sum(p['forward'] for p in parts) / seconds, 1),
+        'backward_pct': round(100 * sum(p['backward'] for p in parts) / seconds, 1),
+        'deadband_pct': round(100 * sum(p['band'] for p in parts) / seconds, 1),
+        'settle_p50_s': round(float(p50), 1),
+        'settle_p90_s': round(float(p90), 1),
+        'unsettled': sum(p['unsettled'] for p in parts),
+        'starts_per_h': round(sum(p['starts'] for p in parts) / hours, 1),
+        'short_run_pct': round(100 * int(np.count_nonzero(runs < SHORT_RUN_SECONDS)) / len(runs), 1) if len(runs) else 0.0,
+        'crossings_per_h': round(sum(p['crossings'] for p in parts) / hours, 1),
+    }
+
+def analyse(paths, processes=None):
+    """Per-unit report rows for every log under paths, files spread over processes"""
+    logs = find_logs(paths)
+    if processes == 1:
+        results = map(analyse_file, logs)
+    else:
+        pool = ProcessPoolExecutor(processes)
+        results = pool.map(analyse_file, logs, chunksize=1)
+    units = {}
+    root = common_root(logs)
+    try:
+        for path, totals in zip(logs, results):
+            if totals is not None and totals['samples']:
+                units.setdefault(unit_of(path, root), []).append(totals)
+    finally:
+        if processes != 1:
+            pool.shutdown()
+    return [report_row(unit, parts) for unit, parts in sorted(units.items())]
+
+def format_report(rows):
+    """Report rows as a console table"""
+    header = ('UNIT', 'FILES', 'SAMPLES', 'HOURS', 'FWD %', 'BACK %', 'BAND %', 'SETTLE p50', 'p90',
+              'UNSETTLED', 'STARTS/h', 'SHORT %', 'CROSS/h')
+    table = [header] + [tuple(str(row[f]) for f in REPORT_FIELDS) for row in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+    return '\n'.join('  '.join(v.ljust(w) for v, w in zip(row, widths)) for row in table)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Settling, duty cycle, deadband and oscillation figures from telemetry logs")
+    ap.add_argument('paths', nargs='+', help="log files or directories holding them (rotated files included)")
+    ap.add_argument('--processes', type=int, default=None, help="worker processes (default: one per CPU)")
+    ap.add_argument('--json', action='store_true', help="print the rows as JSON instead of a table")
+    args = ap.parse_args()
+
+    rows = analyse(args.paths, args.processes)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    elif rows:
+        print(format_report(rows))
+    else:
+        print("No telemetry logs found")
@@ -0,0 +1,126 @@
+import threading
+import metrics
+
+SAMPLE_RATE = 16000       # Plenty for speech
+CHUNK = 512               # Frames per read (32 ms at 16 kHz)
+SAMPLE_WIDTH = 2          # 16-bit mono
+PREROLL_SECONDS = 0.3     # Audio from before "Start" handed to each utterance
+MAX_UTTERANCE_SECONDS = 15
+
+AUDIO_OVERRUNS = metrics.counter('hvac_audio_overruns',
+                                 "Times audio was skipped: the device overflowed or a recording fell too far behind")
+
+class CaptureService:
+    """Keeps the microphone open for the life of the app.
+
+    The PyAudio stream is opened once and its callback writes into a fixed
+    bytearray used as a ring buffer, sized for PREROLL_SECONDS plus
+    MAX_UTTERANCE_SECONDS. utterance() hands out a reader that starts
+    PREROLL_SECONDS in the past, so the first syllable said right as the
+    button is pressed is not lost, and that stops at MAX_UTTERANCE_SECONDS.
+    """
+
+    def __init__(self, rate=SAMPLE_RATE, chunk=CHUNK, preroll=PREROLL_SECONDS, max_utterance=MAX_UTTERANCE_SECONDS):
+        self.rate = rate
+        self.chunk = chunk
+        self.chunk_bytes = chunk * SAMPLE_WIDTH
+        self.preroll_bytes = int(preroll * rate) * SAMPLE_WIDTH
+        self.max_bytes = int(max_utterance * rate) * SAMPLE_WIDTH
+        self.capacity = self.preroll_bytes + self.max_bytes + self.chunk_bytes
+        self.ring = bytearray(self.capacity)
+        self.written = 0          # Total bytes ever written, the ring index is written % capacity
+        self.error = None
+        self.ready = threading.Event()
+        self._cond = threading.Condition()
+        self._pa = None
+        self._stream = None
+
+    def start(self):
+        """Opens the device in the background, it can take a while on some machines"""
+        threading.Thread(target=self._open, daemon=True).start()
+
+    def _open(self):
+        try:
+            import pyaudio
+            self._pa = pyaudio.PyAudio()
+            self._continue = pyaudio.paContinue
+            self._overflow = pyaudio.paInputOverflow
+            self._stream = self._pa.open(format=pyaudio.paInt16, channels=1, rate=self.rate, input=True,
+                                         frames_per_buffer=self.chunk, stream_callback=self._callback)
+        except Exception as e:
+            self.error = e
+            print(f"Audio Error: {e}")
+        self.ready.set()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._pa is not None:
+            self._pa.terminate()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & self._overflow:
+            # PortAudio dropped input before this buffer: the callback ran too late
+            AUDIO_OVERRUNS.inc()
+        self.write(in_data)
+        return (None, self._continue)
+
+    def write(self, data):
+        n = len(data)
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        self.ring[pos:pos + first] = data[:first]
+        if first < n:
+            self.ring[:n - first] = data[first:]
+        with self._cond:
+            self.written += n
+            self._cond.notify_all()
+
+    def utterance(self):
+        return Utterance(self, max(0, self.written - self.preroll_bytes))
+
+    def listen(self):
+        """A reader of everything captured from now on, with no length limit"""
+        return Utterance(self, self.written, endless=True)
+
+    def copy(self, start, end):
+        """Bytes [start, end) of the stream, as long as they are still in the ring"""
+        a = start % self.capacity
+        b = a + (end - start)
+        if b <= self.capacity:
+            return bytes(self.ring[a:b])
+        return bytes(self.ring[a:]) + bytes(self.ring[:b - self.capacity])
+
+
+class Utterance:
+    """Reads one recording out of the CaptureService ring, chunk by chunk"""
+
+    def __init__(self, service, start, endless=False):
+        self.service = service
+        self.start = start
+        self.cursor = start
+        self.endless = endless
+        self.overruns = 0
+
+    @property
+    def full(self):
+        return not self.endless and self.cursor - self.start >= self.service.preroll_bytes + self.service.max_bytes
+
+    def read(self, timeout=0.5):
+        """Next chunk of audio, b'' on timeout, None once the utterance is at its maximum length"""
+        s = self.service
+        if self.full:
+            return None
+        with s._cond:
+            if not s._cond.wait_for(lambda: s.written - self.cursor >= s.chunk_bytes, timeout):
+                return b''
+            written = s.written
+        if written - self.cursor > s.capacity - s.chunk_bytes:
+            # We fell so far behind that the writer lapped us, skip to the oldest safe data
+            self.overruns += 1
+            AUDIO_OVERRUNS.inc()
+            self.cursor = written - s.capacity + s.chunk_bytes
+        data = s.copy(self.cursor, self.cursor + s.chunk_bytes)
+        self.cursor += s.chunk_bytes
+        return data
@@ -0,0 +1,158 @@
+import re
+from collections import namedtuple
+
+# Targets the board is allowed to receive (it reads exactly two digits)
+MIN_TARGET = 10
+MAX_TARGET = 40
+# "warmer" / "cooler" without a number moves the target by this much
+DEFAULT_STEP = 1
+
+Command = namedtuple('Command', ['kind', 'value'])  # kind: 'set' or 'change'
+
+# --- Token classes ---
+UNIT, TENS, HUNDRED, HOMOPHONE, ARTICLE, UP, DOWN, ABOVE, BELOW, TO, BY, DEGREE, POINT = range(13)
+
+_UNITS = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+          "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+          "seventeen", "eighteen", "nineteen"]
+_TENS = ["twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+
+def _build_vocabulary():
+    vocab = {}
+    for value, word in enumerate(_UNITS):
+        vocab[word] = (UNIT, value)
+    for i, word in enumerate(_TENS):
+        vocab[word] = (TENS, (i + 2) * 10)
+    vocab["hundred"] = (HUNDRED, 100)
+    # What speech engines write for "two" and "four". They only count as
+    # numbers after a tens word ("twenty to") or when nothing else was a number.
+    vocab["to"] = (HOMOPHONE, 2)
+    vocab["too"] = (HOMOPHONE, 2)
+    vocab["for"] = (HOMOPHONE, 4)
+    vocab["a"] = (ARTICLE, 1)
+    vocab["an"] = (ARTICLE, 1)
+    for word in ("warmer", "hotter", "up", "increase", "raise", "higher", "more", "heat"):
+        vocab[word] = (UP, 1)
+    for word in ("cooler", "colder", "down", "decrease", "lower", "reduce", "less", "cool"):
+        vocab[word] = (DOWN, -1)
+    for word in ("above", "over", "plus"):
+        vocab[word] = (ABOVE, 1)
+    for word in ("below", "under", "minus"):
+        vocab[word] = (BELOW, -1)
+    for word in ("at", "set"):
+        vocab[word] = (TO, 0)
+    vocab["by"] = (BY, 0)
+    for word in ("degree", "degrees"):
+        vocab[word] = (DEGREE, 0)
+    vocab["point"] = (POINT, 0)
+    return vocab
+
+_TOKEN = re.compile(r'\d+|[a-z]+')
+
+
+class CommandParser:
+    """Turns a transcript into a target temperature in one pass over its words.
+
+    The vocabulary is compiled once into a word -> (class, value) table and
+    the transcript is read left to right by a small state machine that
+    assembles numbers ("twenty two", "22") and notes direction words. It
+    understands absolute setpoints ("set it to twenty two"), relative
+    changes ("two degrees warmer", "to 2 degrees higher", "warmer") and offsets
+    ("two degrees above twenty"). What it cannot act on as said is not
+    understood rather than guessed at: a setpoint outside the range, half
+    degrees ("twenty two point five") and an amount with no direction
+    ("drop it by two"). Only relative changes are clamped to the range.
+    """
+
+    def __init__(self, min_target=MIN_TARGET, max_target=MAX_TARGET, step=DEFAULT_STEP):
+        self.min_target = min_target
+        self.max_target = max_target
+        self.step = step
+        self.vocab = _build_vocabulary()
+
+    def parse(self, text):
+        """Command('set', 22) / Command('change', -2), or None if the text has no command"""
+        vocab = self.vocab
+        numbers = []        # (value, absolute) for every complete number
+        current = None      # Number being assembled
+        absolute = False    # The current number follows "to"/"at"/"set"
+        after_to = False    # Previous word was "to"/"at"/"set"
+        after_a = False     # Previous word was "a"/"an"
+        after_by = False    # Previous word was "by"
+        by_amount = False   # A number followed "by": only meaningful with a direction
+        fraction = False    # "point" after a number: the board only takes whole degrees
+        fallback = None     # Homophone value to use when there is no real number
+        sign = 0            # Direction of the last up/down/above/below word
+        offset = False      # Saw above/below: "<n> above <m>"
+        amount = None       # Index of the number just before, if only "degrees" came after it
+
+        for token in _TOKEN.findall(text.lower()):
+            if token[0].isdigit():
+                kind, value = UNIT, int(token)
+            else:
+                kind, value = vocab.get(token, (None, 0))
+
+            # "twenty two", "twenty 2" and "twenty to" continue the current number
+            if current is not None and current >= 20 and current % 10 == 0 and current < 100 \
+                    and (kind == UNIT and value < 10 or kind == HOMOPHONE):
+                current += value
+                continue
+            if kind == HUNDRED:
+                current = (current or 1) * 100
+                continue
+            if kind == POINT and current is not None:
+                fraction = True
+            # Anything else ends the number being assembled
+            if current is not None:
+                numbers.append((current, absolute))
+                current = None
+                amount = len(numbers) - 1
+            if kind == UNIT or kind == TENS:
+                current, absolute = value, after_to
+                by_amount = by_amount or after_by
+            elif kind == DEGREE and after_a:
+                numbers.append((1, False))
+            elif kind == HOMOPHONE and fallback is None:
+                fallback = value
+            elif kind == UP or kind == DOWN:
+                sign = value
+                if amount is not None:
+                    # "to two degrees higher": the number is the size of the change
+                    numbers[amount] = (numbers[amount][0], False)
+            elif kind == ABOVE or kind == BELOW:
+                sign = value
+                offset = True
+            # "to" is the usual word in front of an absolute target
+            after_to = kind == TO or token == "to"
+            after_a = kind == ARTICLE
+            after_by = kind == BY
+            if kind != DEGREE:
+                amount = None
+
+        if current is not None:
+            numbers.append((current, absolute))
+        if fraction or by_amount and not sign:
+            return None
+        if not numbers and fallback is not None and not sign:
+            numbers.append((fallback, True))
+
+        if offset and len(numbers) >= 2:
+            return Command('set', numbers[-1][0] + sign * numbers[0][0])
+        for value, is_absolute in numbers:
+            if is_absolute:
+                return Command('set', value)
+        if sign:
+            return Command('change', sign * (numbers[0][0] if numbers else self.step))
+        if numbers:
+            return Command('set', numbers[-1][0])
+        return None
+
+    def resolve(self, text, current_target):
+        """New target for the transcript given the current one, or None if it was not understood"""
+        command = self.parse(text)
+        if command is None:
+            return None
+        if command.kind == 'set':
+            return command.value if self.min_target <= command.value <= self.max_target else None
+        # "warmer" near the top of the range goes as far as it can
+        return max(self.min_target, min(self.max_target, current_target + command.value))
@@ -0,0 +1,744 @@
+import os
+import asyncio
+import threading
+import time
+import random
+import metrics
+import dsp
+from discovery import discover
+from serial_ingest import SerialReader
+from protocol import ProtocolLink
+from recognition import create_engine, RecognitionError, HVAC_VOCABULARY
+from vad import EnergyVAD
+from capture import CaptureService
+from command_parser import CommandParser
+from telemetry_store import TelemetryStore, RING_CAPACITY
+
+BAUD_RATE = 9600
+ENGINE_READY_TIMEOUT = 30   # How long a command waits for an engine that is still loading
+STOP_TAIL_SECONDS = 0.2     # Audio still taken after "Stop" when decoding happens afterwards
+LATE_STOP_SECONDS = 3.0     # A board "Stop" this soon after a recording ended by itself was meant to end it
+DEFAULT_UNIT = 'main'       # Name of the unit when only one port is given
+FLEET_RING_CAPACITY = 3000  # In-memory history per unit in a fleet (5 minutes at 10 Hz)
+SUMMARY_SECONDS = 2.0       # Refresh period of the fleet summary on the console
+RECONNECT_MIN_SECONDS = 0.5 # First retry after a port is lost, doubled on every failure...
+RECONNECT_MAX_SECONDS = 30  # ...up to this
+STALE_SECONDS = 3.0         # A connected board silent for this long is treated as lost
+SETPOINT_CONFIRM_SECONDS = 1.0  # Wait for a status frame showing a written setpoint...
+SETPOINT_ATTEMPTS = 3           # ...and write it again this many times in all before giving up
+
+RECOGNITIONS = metrics.counter('hvac_recognitions', "Utterances decoded, by outcome (text, empty, error)", ['outcome'])
+RECOGNITION_SECONDS = metrics.histogram('hvac_recognition_seconds', "Decode time after the recording ended", ['engine'])
+COMMANDS = metrics.counter('hvac_commands', "Transcripts by what the parser made of them (set, none)", ['outcome'])
+SETPOINT_WRITES = metrics.counter('hvac_setpoint_writes', "Setpoint writes by outcome (ok, nack, error)", ['outcome'])
+SETPOINT_WRITE_SECONDS = metrics.histogram('hvac_setpoint_write_seconds', "Setpoint write time, including the v2 ACK wait")
+SETPOINT_ECHO_SECONDS = metrics.histogram('hvac_setpoint_echo_seconds', "Round trip from the first write of a setpoint to a status frame showing it")
+SETPOINT_RETRIES = metrics.counter('hvac_setpoint_retries', "Setpoints written again because no status frame showed them in time")
+SETPOINT_COALESCED = metrics.counter('hvac_setpoint_coalesced', "Setpoints replaced by a newer one before the board showed them")
+SETPOINT_FAILURES = metrics.counter('hvac_setpoint_failures', "Setpoints the board never showed after every attempt")
+SERIAL_ERRORS = metrics.counter('hvac_serial_errors', "Serial ports lost or failing to open")
+AUDIO_ERRORS = metrics.counter('hvac_audio_errors', "Recordings cut short by an audio error")
+SERIAL_RECONNECTS = metrics.counter('hvac_serial_reconnects', "Ports opened again after being lost")
+SERIAL_RECOVERY_SECONDS = metrics.histogram('hvac_serial_recovery_seconds', "From losing a board to its first frame after reconnecting",
+                                            buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+SETPOINT_RESENDS = metrics.counter('hvac_setpoint_resends', "Setpoints sent again because the board lost them")
+
+
+class Unit:
+    """One serial-attached board: its port, decoder and newest state"""
+
+    __slots__ = ('name', 'port', 'device', 'ser', 'link', 'reader', 'telemetry', 'frame', 'target_temp',
+                 'wanted', 'board_target', 'applied', 'wake', 'opened', 'frames', 'updated', 'error', 'lost_at',
+                 'closed', '_fd')
+
+    def __init__(self, name, port, telemetry):
+        self.name = name
+        self.port = port           # As configured, None to discover it
+        self.device = None         # Port opened last
+        self.ser = None
+        self.link = ProtocolLink()
+        self.reader = None
+        self.telemetry = telemetry
+        self.frame = None          # Newest status frame
+        self.target_temp = 25      # What commands are relative to: the newest wanted target, else the board's
+        self.wanted = None         # Last target commanded from here, kept for the board across resets
+        self.board_target = None   # Target in the newest frame since the port was opened
+        self.applied = None        # Last target the board was seen to take
+        self.wake = asyncio.Event()  # Wakes the setpoint writer: new target, new frames or port change
+        self.opened = 0            # Times the port was opened
+        self.frames = 0            # Status frames received
+        self.updated = 0.0         # time.monotonic() of the newest frame (or of connecting)
+        self.error = None          # Why the port is closed, if it is
+        self.lost_at = None        # time.monotonic() the port was lost, until frames flow again
+        self.closed = asyncio.Event()
+        self._fd = None            # Port descriptor watched by the loop, if any
+
+    @property
+    def connected(self):
+        return self.ser is not None
+
+
+class HVACController:
+    """Everything the app does, without the window.
+
+    Owns the serial links, the microphone, the recognizer and the current
+    state, and runs them on an asyncio loop: serial reads are dispatched by
+    the loop, and the blocking parts (recording, decoding, ACK waits) run in
+    its executor. Nothing here knows about Tk.
+
+    ports is one port name, or {unit name: port} to run a fleet of boards
+    from this one loop. A voice command goes to the unit it names ("kitchen
+    twenty two"), otherwise to the unit whose button started the recording,
+    otherwise to the one picked last. A port of None is found by probing
+    the USB serial ports (see discovery.py).
+
+    Lost ports are reopened with exponential backoff. Setpoints go through
+    one writer task per unit, which only ever sends the newest target
+    (rapid commands coalesce), confirms it from the status frames, retries
+    when no frame shows it, and sends it again to a board that comes back
+    without it (reset, replugged, or a command given while it was away).
+
+    Listeners register with subscribe(callback, *kinds) and are called on
+    the loop thread as callback(kind, value) with:
+      'connected'  (unit, port)          'disconnected'  (unit, error message)
+      'frames'     (unit, [Frame, ...])  'button'        (unit, 'Start' / 'Stop')
+      'target'     (unit, new target set by a command)
+      'setpoint'   (unit, (target, True if written/ACKed))
+      'applied'    (unit, (target, round trip seconds, None if the board never showed it))
+      'recording'  True / False          'partial'       text so far
+      'wake'       None, the wake word was heard and a recording starts
+      'transcript' final text, '' if nothing was understood
+      'idle'       None, the voice pipeline is done with an utterance
+      'error'      message
+      'ready'      ('engine' / 'audio', None or the error it failed with)
+
+    Use await run() inside an event loop, or start() to run one in a
+    background thread. press(), command() and stop() may be called from
+    any thread.
+    """
+
+    def __init__(self, ports, baud=BAUD_RATE, engine=None, capture=None, parser=None, telemetry_log=None,
+                 ring_capacity=None, streaming=True, auto_stop=True, negotiate=False, on_level=None,
+                 ready_timeout=ENGINE_READY_TIMEOUT, wake=None):
+        if ports is None or isinstance(ports, str):
+            ports = {DEFAULT_UNIT: ports}
+        self.baud = baud
+        self.engine = engine or create_engine('vosk')
+        self.capture = capture or CaptureService()
+        self.parser = parser or CommandParser()
+        self.streaming = streaming
+        self.auto_stop = auto_stop
+        self.negotiate = negotiate
+        self.on_level = on_level       # Called on the capture thread as on_level(peak, rms)
+        self.ready_timeout = ready_timeout
+        self.wake = wake               # A wakeword.WakeWordSpotter: saying the wake word works like "Start"
+
+        if ring_capacity is None:
+            ring_capacity = RING_CAPACITY if len(ports) == 1 else FLEET_RING_CAPACITY
+        self.units = {}
+        for name, port in ports.items():
+            log = None
+            if telemetry_log:
+                root, ext = os.path.splitext(telemetry_log)
+                log = telemetry_log if len(ports) == 1 else f"{root}.{name}{ext}"
+            self.units[name] = Unit(name, port, TelemetryStore(log, ring_capacity))
+        self.selected = next(iter(self.units))   # Unit that commands go to when they name none
+        self._names = {name.lower(): name for name in self.units}
+
+        self.is_recording = False
+        self.session = None
+        self._auto_stopped = None      # monotonic() when the last recording ended on silence or length
+        self.loop = None
+        self._subscribers = []
+        self._tasks = set()
+        self._stopped = None
+        self._discovering = None
+        self._thread = None
+        self._started = threading.Event()
+        self._closing = threading.Event()
+
+    def unit(self, name=None):
+        return self.units[name or self.selected]
+
+    # --- Subscriptions ---
+    def subscribe(self, callback, *kinds):
+        """Calls callback(kind, value) for the given event kinds (all when none); returns an unsubscribe function"""
+        entry = (callback, frozenset(kinds))
+        self._subscribers.append(entry)
+        return lambda: self._subscribers.remove(entry)
+
+    def _emit(self, kind, value=None):
+        for callback, kinds in tuple(self._subscribers):
+            if kinds and kind not in kinds:
+                continue
+            try:
+                callback(kind, value)
+            except Exception as e:
+                print(f"Subscriber Error ({kind}): {e}")
+
+    # --- Lifecycle ---
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._started.set()
+        # Load the model and open the microphone once, in the background, instead of per command
+        self.engine.load_async()
+        self.capture.start()
+        if self.wake is not None:
+            threading.Thread(target=self.listen_for_wake, daemon=True).start()
+        self._spawn(self._announce_ready('engine', self.engine.ready, lambda: self.engine.error))
+        self._spawn(self._announce_ready('audio', self.capture.ready, lambda: self.capture.error))
+        self._discovering = asyncio.Lock()
+        for unit in self.units.values():
+            self._spawn(self._keep_connected(unit))
+            self._spawn(self._writer(unit))
+        self._spawn(self._watchdog())
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in tuple(self._tasks):
+                task.cancel()
+            for unit in self.units.values():
+                self._disconnect(unit)
+                unit.telemetry.close()
+            self._closing.set()
+            self.is_recording = False
+            self.capture.close()
+            self.engine.close()
+
+    def start(self):
+        """Runs the controller on its own event loop in a daemon thread"""
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self, timeout=2):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _spawn(self, coro):
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _announce_ready(self, name, event, error):
+        await self.loop.run_in_executor(None, event.wait)
+        self._emit('ready', (name, error()))
+
+    # --- Serial ---
+    async def _keep_connected(self, unit):
+        """Opens the unit's port and opens it again whenever it is lost"""
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                await self._connect(unit)
+            except Exception as e:
+                self._lost(unit, e)
+            else:
+                received = unit.frames
+                await unit.closed.wait()
+                if unit.frames != received:
+                    # It worked until now: try again right away
+                    delay = RECONNECT_MIN_SECONDS
+                    continue
+            # Jitter keeps a fleet behind one hub from retrying in lockstep
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    async def _connect(self, unit):
+        port = unit.port
+        if port is None:
+            async with self._discovering:
+                in_use = {u.device for u in self.units.values() if u.connected}
+                port = await self.loop.run_in_executor(None, discover, self.baud, in_use,
+                                                       (unit.device,) if unit.device else ())
+            if port is None:
+                raise OSError("no board found on any USB serial port")
+        unit.ser = await self.loop.run_in_executor(None, self._open, unit, port)
+        if unit.lost_at is not None:
+            SERIAL_RECONNECTS.inc()
+        unit.device = port
+        unit.error = None
+        unit.updated = time.monotonic()
+        unit.board_target = None
+        unit.opened += 1
+        unit.closed.clear()
+        unit.wake.set()
+        self._emit('connected', (unit.name, port))
+        on_frames = lambda frames: self._on_frames(unit, frames)
+        on_button = lambda msg: self._on_button(unit, msg)
+        try:
+            fd = unit.ser.fileno()
+        except (AttributeError, OSError):
+            fd = None
+        if fd is not None:
+            # POSIX: the loop watches the port itself, reads never block
+            unit.ser.timeout = 0
+            unit.reader = SerialReader(unit.ser, on_frames, on_button, unit.link.on_ack)
+            self.loop.add_reader(fd, self._readable, unit)
+            unit._fd = fd
+        else:
+            # Windows COM handles cannot be watched by the loop: read in a thread, handle on the loop
+            call = self.loop.call_soon_threadsafe
+            unit.reader = SerialReader(unit.ser, lambda f: call(on_frames, f),
+                                       lambda m: call(on_button, m), unit.link.on_ack)
+            threading.Thread(target=self._pump, args=(unit, unit.ser), daemon=True).start()
+
+    def _open(self, unit, port):
+        import serial
+        ser = serial.Serial(port, self.baud, timeout=1)
+        print(f"Connected to {port}")
+        if self.negotiate:
+            try:
+                version = unit.link.negotiate(ser)
+            except Exception:
+                ser.close()    # Unplugged again while booting: nobody else will close it
+                raise
+            print(f"Protocol v{version} at {ser.baudrate} baud")
+        return ser
+
+    def _pump(self, unit, ser):
+        try:
+            unit.reader.run()
+        except OSError as e:  # serial.SerialException included
+            self.loop.call_soon_threadsafe(self._lost, unit, e, ser)
+
+    def _readable(self, unit):
+        try:
+            data = unit.ser.read(unit.ser.in_waiting or 1)
+        except OSError as e:  # serial.SerialException included
+            self._lost(unit, e)
+            return
+        if data:
+            unit.reader.feed(data)
+
+    def _lost(self, unit, error, ser=None):
+        """Closes a failed port (or notes a failed open) and hands the unit back to _keep_connected()"""
+        if ser is not None and ser is not unit.ser:
+            return  # A reader thread of a port already replaced
+        was_open = unit.connected
+        first = unit.error is None
+        self._disconnect(unit)
+        SERIAL_ERRORS.inc()
+        unit.error = str(error)
+        if first:
+            # Printed once per outage, not on every retry
+            print(f"Serial Error: {error}")
+            if unit.opened and unit.lost_at is None:
+                # Recovery is timed from losing a board, not from waiting for the first one
+                unit.lost_at = time.monotonic()
+        elif not was_open:
+            return
+        self._emit('disconnected', (unit.name, unit.error))
+        unit.closed.set()
+        unit.wake.set()
+
+    async def _watchdog(self):
+        """Catches boards that hang or reset without the port reporting an error"""
+        while True:
+            await asyncio.sleep(STALE_SECONDS / 3)
+            now = time.monotonic()
+            for unit in self.units.values():
+                if unit.connected and now - unit.updated > STALE_SECONDS:
+                    self._lost(unit, f"no data from {unit.device} for {STALE_SECONDS:g} s")
+
+    def _disconnect(self, unit):
+        if unit.ser is None:
+            return
+        if unit._fd is not None:
+            self.loop.remove_reader(unit._fd)
+            unit._fd = None
+        elif unit.reader is not None:
+            unit.reader.stop()
+        unit.ser.close()
+        unit.ser = None
+
+    def _on_frames(self, unit, frames):
+        now = time.time()
+        append = unit.telemetry.append
+        for frame in frames:
+            append(now, frame)
+        unit.frame = frames[-1]
+        unit.board_target = unit.frame.target
+        if unit.wanted is None:
+            unit.target_temp = unit.board_target
+        unit.wake.set()
+        unit.frames += len(frames)
+        unit.updated = now = time.monotonic()
+        if unit.lost_at is not None:
+            print(f"{unit.name} back after {now - unit.lost_at:.1f} s")
+            SERIAL_RECOVERY_SECONDS.observe(now - unit.lost_at)
+            unit.lost_at = None
+        self._emit('frames', (unit.name, frames))
+
+    def _on_button(self, unit, msg):
+        # Whatever is said next is meant for the board whose button was pressed
+        self.selected = unit.name
+        self._emit('button', (unit.name, msg))
+        # The board only toggles its own flag, which a recording that ended by itself
+        # leaves on "recording": every press toggles the host's state instead
+        if self.is_recording:
+            self.stop_recording()
+        elif (msg == "Stop" and self._auto_stopped is not None
+              and time.monotonic() - self._auto_stopped < LATE_STOP_SECONDS):
+            # The press the user made to end the recording that just ended on silence
+            self._auto_stopped = None
+        else:
+            self.start_recording()
+
+    # --- Thread-safe entry points ---
+    def press(self, name=None):
+        """Same as a board's button: starts or stops a recording"""
+        unit = self.unit(name)
+        self.loop.call_soon_threadsafe(self._on_button, unit, "Stop" if self.is_recording else "Start")
+
+    def command(self, text, name=None):
+        """Handles text as if it had been spoken (to unit name); returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(self.process_command_locally(text, name), self.loop)
+
+    def summary(self):
+        """One (name, port, status, state, target, inside, outside, speed, frames) row per unit"""
+        now = time.monotonic()
+        rows = []
+        for unit in self.units.values():
+            f = unit.frame
+            if not unit.connected:
+                status = 'offline' if unit.port or unit.device else 'searching'
+            elif f is None:
+                status = 'waiting'
+            else:
+                status = f"{now - unit.updated:.1f}s ago"
+            rows.append((unit.name, unit.device or unit.port or 'auto', status) + ((f.state, f.target, f.inside, f.outside, f.speed) if f else ('-',) * 5)
+                        + (unit.frames,))
+        return rows
+
+    # --- Voice pipeline (loop thread) ---
+    def start_recording(self):
+        if self.is_recording:
+            return
+        self.is_recording = True
+        self.session = None
+        if self.streaming and self.engine.wait_ready(0):
+            self.session = self.engine.stream(self.capture.rate, on_partial=self._partial)
+        self._emit('recording', True)
+        self._spawn(self._utterance(self.session))
+
+    def stop_recording(self):
+        if not self.is_recording:
+            return
+        if self.session is not None:
+            # The decoder has already heard everything, no need to wait for a tail
+            self._stop_flag()
+        else:
+            self.loop.call_later(STOP_TAIL_SECONDS, self._stop_flag)
+
+    def listen_for_wake(self):
+        """Runs on its own thread: feeds the microphone to the wake word spotter between recordings"""
+        self.capture.ready.wait()
+        if self.capture.error is not None:
+            return
+        stream = self.capture.listen()
+        while not self._closing.is_set():
+            data = stream.read()
+            if not data:
+                continue
+            if self.is_recording:
+                self.wake.reset()
+            elif self.wake.feed(data):
+                self.loop.call_soon_threadsafe(self._on_wake)
+
+    def _on_wake(self):
+        if not self.is_recording:
+            self._emit('wake')
+            self.start_recording()
+
+    def _stop_flag(self, auto=False):
+        if self.is_recording:
+            self.is_recording = False
+            self._auto_stopped = time.monotonic() if auto else None
+            self._emit('recording', False)
+
+    def _partial(self, text):
+        self.loop.call_soon_threadsafe(self._emit, 'partial', text)
+
+    async def _utterance(self, session):
+        frames = await self.loop.run_in_executor(None, self.record, session)
+        await self.process_audio(frames, session)
+
+    def record(self, session):
+        """Runs in the executor: reads the microphone until the recording ends, returns the chunks"""
+        stop = lambda: self.loop.call_soon_threadsafe(self._stop_flag, True)
+        frames = []
+        vad = EnergyVAD(self.capture.chunk / self.capture.rate) if self.auto_stop else None
+
+        self.capture.ready.wait()
+        if self.capture.error is not None:
+            stop()
+            return frames
+        utterance = self.capture.utterance()
+
+        while self.is_recording:
+            try:
+                data = utterance.read()
+                if data is None:
+                    # Longest utterance we keep, stop as if the button was pressed
+                    stop()
+                    break
+                if not data:
+                    continue
+                frames.append(data)
+                if session is not None:
+                    session.feed(data)
+                peak, rms = dsp.levels(data)
+                if self.on_level is not None:
+                    self.on_level(peak, rms)
+                if vad is not None and vad.feed(rms):
+                    stop()
+                    break
+            except Exception as e:
+                print(f"Audio Error: {e}")
+                AUDIO_ERRORS.inc()
+                break
+        else:
+            # Stopped by the button: take what was captured up to this moment
+            data = utterance.read(timeout=0)
+            while data:
+                frames.append(data)
+                if session is not None:
+                    session.feed(data)
+                data = utterance.read(timeout=0)
+
+        if self.on_level is not None:
+            self.on_level(0, 0)
+        if vad is not None:
+            frames = vad.trim(frames)
+        return frames
+
+    async def process_audio(self, frames, session):
+        run = self.loop.run_in_executor
+        started = metrics.clock()
+        try:
+            if session is not None:
+                text = await run(None, session.finish)
+            elif not frames:
+                text = ''
+            elif await run(None, self.engine.wait_ready, self.ready_timeout):
+                audio = await run(None, self._audio_data, frames)
+                text = await run(None, self.engine.recognize, audio)
+            else:
+                raise RecognitionError(f"engine '{self.engine.name}' is not available: {self.engine.error}")
+            RECOGNITION_SECONDS.labels(str(self.engine.name)).observe_since(started)
+            RECOGNITIONS.labels('text' if text else 'empty').inc()
+            print(f"Recognized: {text}")
+            self._emit('transcript', text)
+            if text:
+                await self.process_command_locally(text)
+        except Exception as e:
+            print(f"Recognition Error: {e}")
+            RECOGNITIONS.labels('error').inc()
+            self._emit('error', "Recognition failed")
+        self._emit('idle')
+
+    def _audio_data(self, frames):
+        """Runs in the executor: the recording preprocessed for the engine, see dsp.preprocess"""
+        import speech_recognition as sr
+        return sr.AudioData(*dsp.preprocess(b''.join(frames), self.capture.rate), 2)
+
+    def route(self, text):
+        """Name of the unit a command is for: the first unit named in it, else the selected one"""
+        if len(self.units) > 1:
+            for word in text.lower().split():
+                if word in self._names:
+                    return self._names[word]
+        return self.selected
+
+    async def process_command_locally(self, text, name=None):
+        name = name or self.route(text)
+        self.selected = name
+        unit = self.units[name]
+        new_temp = self.parser.resolve(text, unit.target_temp)
+        COMMANDS.labels('none' if new_temp is None else 'set').inc()
+        if new_temp is not None:
+            await self.set_target(new_temp, name)
+        return new_temp
+
+    async def set_target(self, target, name=None):
+        """Makes target the unit's setpoint; the writer task delivers it (see 'setpoint' / 'applied')"""
+        unit = self.unit(name)
+        if unit.wanted is not None and unit.wanted != unit.board_target:
+            SETPOINT_COALESCED.inc()
+        unit.target_temp = target
+        unit.wanted = target
+        unit.wake.set()
+        self._emit('target', (unit.name, target))
+        if not unit.connected:
+            print(f"{unit.name} is offline, setpoint {target} will be sent when it is back")
+
+    async def _writer(self, unit):
+        """The only code writing setpoints to the unit's port: the newest target, until a frame shows it.
+
+        The firmware takes one setpoint per loop, so nothing new is written
+        while one is in flight; targets given meanwhile coalesce into the
+        newest. Nothing is written before the first frame after connecting
+        either, as bytes sent to a booting board are lost.
+        """
+        given_up = None
+        while True:
+            target = unit.wanted
+            if (target is None or not unit.connected or unit.board_target is None
+                    or unit.board_target == target or given_up == (target, unit.opened)):
+                await unit.wake.wait()
+                unit.wake.clear()
+                continue
+            if unit.applied == target:
+                # The board had it and lost it: reset or replugged
+                SETPOINT_RESENDS.inc()
+            started = time.perf_counter()
+            for attempt in range(SETPOINT_ATTEMPTS):
+                if attempt:
+                    SETPOINT_RETRIES.inc()
+                if await self._write_setpoint(unit, target) and await self._confirm(unit, target):
+                    rtt = time.perf_counter() - started
+                    SETPOINT_ECHO_SECONDS.observe(rtt)
+                    unit.applied = target
+                    self._emit('applied', (unit.name, (target, rtt)))
+                    break
+                if unit.wanted != target or not unit.connected:
+                    break  # Superseded or port lost: start over from the newest state
+            else:
+                print(f"{unit.name} did not take setpoint {target} after {SETPOINT_ATTEMPTS} attempts")
+                SETPOINT_FAILURES.inc()
+                given_up = (target, unit.opened)  # Until a new target or a new connection
+                self._emit('applied', (unit.name, (target, None)))
+
+    async def _confirm(self, unit, target):
+        """True once a status frame shows target; False on timeout or a lost port"""
+        deadline = self.loop.time() + SETPOINT_CONFIRM_SECONDS
+        while unit.board_target != target:
+            remaining = deadline - self.loop.time()
+            if not unit.connected or remaining <= 0:
+                return False
+            unit.wake.clear()
+            try:
+                await asyncio.wait_for(unit.wake.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+    async def _write_setpoint(self, unit, target):
+        ok = False
+        started = metrics.clock()
+        try:
+            # On v2 this waits for the ACK, which arrives through this loop
+            ok = await self.loop.run_in_executor(None, unit.link.send_setpoint, unit.ser, target)
+            SETPOINT_WRITES.labels('ok' if ok else 'nack').inc()
+            if not ok:
+                print(f"Setpoint {target} for {unit.name} was not acknowledged")
+        except Exception as e:
+            print(f"Serial Error: {e}")
+            SETPOINT_WRITES.labels('error').inc()
+        SETPOINT_WRITE_SECONDS.observe_since(started)
+        self._emit('setpoint', (unit.name, (target, ok)))
+        return ok
+
+
+def format_summary(rows):
+    """The rows of HVACController.summary() as a console table"""
+    header = ('UNIT', 'PORT', 'STATUS', 'MOTOR', 'TARGET', 'IN', 'OUT', 'SPEED', 'FRAMES')
+    table = [header] + [tuple(str(v) for v in row) for row in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+    return '\n'.join('  '.join(v.ljust(w) for v, w in zip(row, widths)) for row in table)
+
+
+def parse_ports(specs):
+    """['kitchen=/dev/ttyUSB0', 'hall=auto'] -> {'kitchen': '/dev/ttyUSB0', 'hall': None}; one port may go unnamed.
+
+    Commands pick a unit of a fleet by saying its name, so every unit needs
+    one that can be said: a single word that is not part of a command.
+    """
+    specs = specs or ['auto']
+    ports = {}
+    for spec in specs:
+        name, sep, port = spec.partition('=')
+        if not sep:
+            if len(specs) > 1:
+                raise ValueError(f"give the port '{spec}' a name, e.g. kitchen={spec}: units of a fleet are picked by saying their name")
+            name, port = DEFAULT_UNIT, spec
+        elif len(specs) > 1 and (not name.isalpha() or name.lower() in HVAC_VOCABULARY):
+            raise ValueError(f"'{name}' cannot be told apart in a command, use one word that is not a command word")
+        ports[name] = None if port == 'auto' else port
+    return ports
+
+async def print_summary(core, period):
+    while True:
+        await asyncio.sleep(period)
+        print(format_summary(core.summary()) + '\n')
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Run the HVAC controller without a window")
+    ap.add_argument('ports', nargs='*', help="serial ports, e.g. COM6, or name=port for each unit of a fleet; "
+                                             "'auto' (the default) finds a board on USB")
+    ap.add_argument('--baud', type=int, default=BAUD_RATE)
+    ap.add_argument('--engine', default='vosk', help="recognizer engine, or several to race, e.g. vosk,google")
+    ap.add_argument('--model', default='model', help="Vosk model directory")
+    ap.add_argument('--workers', type=int, default=0, help="decode in this many worker processes instead of in this one")
+    ap.add_argument('--log', default=None, help="telemetry log file (one per unit in a fleet)")
+    ap.add_argument('--wake', default=None, help="wake word templates (see wakeword.py) to start recordings hands-free")
+    ap.add_argument('--summary', type=float, nargs='?', const=SUMMARY_SECONDS, default=None,
+                    help="print a table of all units this often (seconds)")
+    ap.add_argument('--metrics-port', type=int, default=None, help="serve Prometheus metrics on this local port")
+    ap.add_argument('--metrics-file', default=None, help="write Prometheus metrics to this file periodically")
+    args = ap.parse_args()
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    if args.metrics_file:
+        metrics.write_periodically(args.metrics_file)
+
+    try:
+        ports = parse_ports(args.ports)
+    except ValueError as e:
+        ap.error(str(e))
+    # Unit names have to be in the grammar for the decoder to hear them
+    options = {'vosk': {'model_path': args.model, 'grammar': HVAC_VOCABULARY + [n.lower() for n in ports]}}
+    names = args.engine.split(',')
+    if len(names) > 1:
+        engine = create_engine('race', engines=names, options=options)
+    elif args.workers:
+        engine = create_engine('pool', engine=names[0], options=options.get(names[0]), workers=args.workers)
+    else:
+        engine = create_engine(names[0], **options.get(names[0], {}))
+    wake = None
+    if args.wake:
+        from wakeword import WakeWordSpotter
+        wake = WakeWordSpotter.load(args.wake)
+    core = HVACController(ports, args.baud, engine, telemetry_log=args.log, wake=wake)
+    shown = {}
+
+    def show(kind, value):
+        if kind == 'frames':
+            name, frames = value
+            frame = frames[-1][:5]
+            if args.summary is None and frame != shown.get(name):
+                shown[name] = frame
+                print("{}: State: {} Target: {} In: {} Out: {} Speed: {}".format(name, *frame))
+        else:
+            print(f"{kind}: {value}")
+
+    async def main():
+        summary = asyncio.ensure_future(print_summary(core, args.summary)) if args.summary else None
+        try:
+            await core.run()
+        finally:
+            if summary is not None:
+                summary.cancel()
+
+    core.subscribe(show)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
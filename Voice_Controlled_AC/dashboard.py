@@ -0,0 +1,86 @@
+import threading
+import time
+from functools import lru_cache
+import metrics
+
+# At most one repaint per display frame (~30 fps)
+FRAME_MS = 33
+
+UI_DELAY = metrics.histogram('hvac_ui_callback_delay_seconds',
+                             "Time from work being queued for the Tk loop to it running", ['callback'])
+_PAINT_DELAY = UI_DELAY.labels('paint')     # Its count is the number of repaints
+UI_COALESCED = metrics.counter('hvac_ui_frames_coalesced',
+                               "Status frames replaced by a newer one before the dashboard painted them")
+
+@lru_cache(maxsize=None)
+def get_temp_color(temp):
+    # Clamp temp between 0 and 50 for color calculation
+    t = max(0, min(50, temp)) / 50.0
+
+    # Cold (Blue) -> Comfortable (Greenish) -> Hot (Red)
+    if t < 0.5:
+        # Interpolate Blue to Green
+        ratio = t * 2
+        r = int(52 + (46 - 52) * ratio)
+        g = int(152 + (204 - 152) * ratio)
+        b = int(219 + (113 - 219) * ratio)
+    else:
+        # Interpolate Green to Red
+        ratio = (t - 0.5) * 2
+        r = int(46 + (231 - 46) * ratio)
+        g = int(204 + (76 - 204) * ratio)
+        b = int(113 + (60 - 113) * ratio)
+
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+class DashboardView:
+    """View-model between the telemetry stream and the Tk widgets.
+
+    submit() may be called from any thread; bursts are coalesced so that
+    paint(frame) runs on the Tk loop at most once every frame_ms with the
+    newest frame only. configure() remembers what each widget last showed
+    and only passes the options that actually changed on to Tk.
+    """
+
+    def __init__(self, root, paint, frame_ms=FRAME_MS):
+        self.root = root
+        self.paint = paint
+        self.frame_ms = frame_ms
+        self._lock = threading.Lock()
+        self._latest = None
+        self._scheduled = False
+        self._last_paint = 0.0
+        self._applied = {}
+        self._queued = 0.0
+
+    def submit(self, frame):
+        with self._lock:
+            if self._scheduled:
+                self._latest = frame
+                UI_COALESCED.inc()
+                return
+            self._latest = frame
+            self._scheduled = True
+        self._queued = metrics.clock()
+        wait = self._last_paint + self.frame_ms / 1000.0 - time.monotonic()
+        self.root.after(max(0, int(wait * 1000)), self._flush)
+
+    def _flush(self):
+        with self._lock:
+            frame = self._latest
+            self._latest = None
+            self._scheduled = False
+        # Includes the deliberate wait for the next display frame
+        _PAINT_DELAY.observe_since(self._queued)
+        self._last_paint = time.monotonic()
+        self.paint(frame)
+
+    def configure(self, widget, **options):
+        """widget.configure(**options), skipping options that already have that value"""
+        applied = self._applied.setdefault(str(widget), {})
+        changed = {k: v for k, v in options.items() if applied.get(k) != v}
+        if changed:
+            widget.configure(**changed)
+            applied.update(changed)
+        return bool(changed)
@@ -0,0 +1,56 @@
+import time
+from protocol import StreamDecoder
+
+# USB IDs of the boards (and USB-serial chips) the firmware ships on, tried first
+KNOWN_USB_IDS = {
+    (0x2341, 0x0043): "Arduino Uno",
+    (0x2341, 0x0001): "Arduino Uno",
+    (0x2341, 0x0243): "Arduino Uno R3",
+    (0x2A03, 0x0043): "Arduino Uno (.org)",
+    (0x1A86, 0x7523): "CH340 clone",
+    (0x0403, 0x6001): "FTDI FT232",
+}
+# Opening the port resets an Uno, the bootloader takes about 1.5 s before frames flow
+PROBE_SECONDS = 2.5
+
+
+def candidate_ports(exclude=()):
+    """USB serial ports, known board IDs first: [(device, description)]"""
+    try:
+        from serial.tools import list_ports
+    except ImportError:
+        return []
+    known, other = [], []
+    for p in list_ports.comports():
+        if p.device in exclude or p.vid is None:
+            continue
+        name = KNOWN_USB_IDS.get((p.vid, p.pid))
+        if name:
+            known.append((p.device, name))
+        else:
+            other.append((p.device, p.description or f"{p.vid:04x}:{p.pid:04x}"))
+    return known + other
+
+
+def probe(port, baud, timeout=PROBE_SECONDS):
+    """True if port sends at least one valid status frame within timeout"""
+    import serial
+    try:
+        with serial.Serial(port, baud, timeout=0.1) as ser:
+            decoder = StreamDecoder()
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                for kind, _ in decoder.feed(ser.read(ser.in_waiting or 1)):
+                    if kind == 'status':
+                        return True
+    except OSError:
+        pass
+    return False
+
+
+def discover(baud, exclude=(), extra=(), timeout=PROBE_SECONDS):
+    """First port, from extra and then the USB candidates, that speaks the status frame; None if none does"""
+    for port in list(extra) + [device for device, _ in candidate_ports(exclude)]:
+        if port not in exclude and probe(port, baud, timeout):
+            return port
+    return None
@@ -0,0 +1,102 @@
+# Vectorized audio helpers for 16-bit PCM, in place of the audioop module (gone in Python 3.13)
+import math
+import numpy as np
+
+TARGET_RATE = 16000         # What the recognizers are given
+TARGET_PEAK = 0.5           # Normalise the loudest sample to this share of full scale (-6 dBFS)...
+MAX_GAIN = 8.0              # ...but never amplify more than this, or background hiss becomes "speech"
+FRAME_SECONDS = 0.01        # Resolution of the silence trimming
+TRIM_LEVEL = 300            # Frames quieter than this are silence (same floor as the VAD)...
+TRIM_RATIO = 3.0            # ...as are frames within this factor of the recording's noise floor
+TRIM_PADDING_SECONDS = 0.15 # Silence kept around the speech when trimming
+RESAMPLE_TAPS = 63          # Anti-alias filter length when lowering the rate
+
+FULL_SCALE = 32767
+
+
+def samples(pcm):
+    """16-bit little endian bytes as an int16 array, without copying"""
+    return np.frombuffer(pcm, '<i2')
+
+def levels(chunk):
+    """(peak, rms) of a chunk of 16-bit audio, the same figures as audioop.max and audioop.rms"""
+    x = samples(chunk)
+    if not len(x):
+        return 0, 0
+    f = x.astype(np.float64)
+    return max(int(x.max()), -int(x.min())), int(math.sqrt(f.dot(f) / len(x)))
+
+def to_mono16(pcm, width, channels):
+    """Any integer PCM (8-bit unsigned, 16, 24 or 32-bit signed) as 16-bit mono bytes"""
+    if width == 1:
+        x = (np.frombuffer(pcm, np.uint8).astype(np.int16) - 128) << 8
+    elif width == 3:
+        b = np.frombuffer(pcm, np.uint8).reshape(-1, 3)
+        x = b[:, 1].astype(np.int16) | (b[:, 2].astype(np.int8).astype(np.int16) << 8)
+    else:
+        x = np.frombuffer(pcm, {2: '<i2', 4: '<i4'}[width])
+        if width == 4:
+            x = (x >> 16).astype(np.int16)
+    if channels > 1:
+        x = x.reshape(-1, channels).mean(axis=1)
+    return x.astype('<i2').tobytes()
+
+def to_pcm(x):
+    """Float samples back to 16-bit bytes, rounded and clipped to full scale"""
+    return np.clip(np.rint(x), -FULL_SCALE - 1, FULL_SCALE).astype('<i2').tobytes()
+
+
+def remove_dc(x):
+    """x without its mean, the offset cheap microphones and sound cards add"""
+    return x - x.mean() if len(x) else x
+
+def trim_silence(x, rate, padding=TRIM_PADDING_SECONDS):
+    """x cut to the span of frames louder than the noise floor, plus padding seconds.
+
+    The whole of x is kept when nothing stands out: deciding that a
+    recording holds no speech at all is the VAD's job, not this one's.
+    """
+    step = max(1, int(rate * FRAME_SECONDS))
+    n = len(x) // step
+    if n < 2:
+        return x
+    rms = np.sqrt(np.mean(np.square(x[:n * step].reshape(n, step)), axis=1))
+    loud = np.flatnonzero(rms > max(TRIM_LEVEL, np.percentile(rms, 10) * TRIM_RATIO))
+    if not len(loud):
+        return x
+    pad = int(padding * rate)
+    return x[max(0, loud[0] * step - pad):(loud[-1] + 1) * step + pad]
+
+def normalize(x):
+    """x scaled so its peak sits at TARGET_PEAK of full scale, gain capped at MAX_GAIN"""
+    peak = np.abs(x).max() if len(x) else 0
+    if not peak:
+        return x
+    return x * min(MAX_GAIN, TARGET_PEAK * FULL_SCALE / peak)
+
+def lowpass(x, cutoff):
+    """x through a windowed-sinc low-pass filter, cutoff as a fraction of the sample rate"""
+    n = np.arange(RESAMPLE_TAPS) - (RESAMPLE_TAPS - 1) / 2
+    h = np.sinc(2 * cutoff * n) * np.hamming(RESAMPLE_TAPS)
+    return np.convolve(x, h / h.sum(), 'same')
+
+def resample(x, rate, target=TARGET_RATE):
+    """x taken from rate to target: band limited first when going down, then interpolated"""
+    if rate == target or not len(x):
+        return x
+    if target < rate:
+        x = lowpass(x, 0.45 * target / rate)
+    n = int(len(x) * target / rate)
+    return np.interp(np.arange(n) * (rate / target), np.arange(len(x)), x)
+
+def preprocess(pcm, rate, target=TARGET_RATE):
+    """One pass over a whole recording before it is decoded: (16-bit bytes, rate).
+
+    DC offset removed, silence at both ends trimmed, resampled to target
+    and the level normalised, so every engine sees the same short, clean,
+    evenly loud input whatever the microphone.
+    """
+    x = samples(pcm).astype(np.float64)
+    x = trim_silence(remove_dc(x), rate)
+    x = normalize(resample(x, rate, target))
+    return to_pcm(x), target
@@ -0,0 +1,60 @@
+import time
+
+METER_HZ = 15        # Bar refreshes per second, independent of the audio chunk size
+PEAK_HOLD = 0.5      # Seconds a peak stays on the bar before it starts to fall
+DECAY_PER_SEC = 0.1  # Fraction of the level left after one second of falling
+
+class LevelMeter:
+    """Microphone level meter that keeps Tk work on the main thread and constant.
+
+    The capture thread calls publish(peak, rms), the controller's on_level,
+    for every chunk; the bar only uses the peak. That only
+    replaces a tuple in a shared slot (a single atomic store), so there is no
+    lock and nothing is queued on Tk. Each side writes only its own counter,
+    which lets publish() carry the highest peak since the last poll. The Tk
+    side polls the slot METER_HZ times a second and drives the progress bar
+    with peak-hold and decay.
+    """
+
+    def __init__(self, bar, hz=METER_HZ, hold=PEAK_HOLD, decay=DECAY_PER_SEC):
+        self.bar = bar
+        self.interval = max(1, int(1000 / hz))
+        self.hold = hold
+        self.decay = decay
+        self.level = 0.0
+        self.slot = (0, 0)     # (sequence, peak since last poll)
+        self._seq = 0          # Written by the capture thread only
+        self._ack = 0          # Written by the Tk thread only
+        self._held_until = 0.0
+        self._last_poll = time.monotonic()
+        self._shown = None
+
+    # --- Capture thread ---
+    def publish(self, peak, rms):
+        if self._ack != self._seq:
+            # The last value was not polled yet, keep its peak in the window
+            peak = max(peak, self.slot[1])
+        self._seq += 1
+        self.slot = (self._seq, peak)
+
+    # --- Tk thread ---
+    def start(self):
+        self.bar.after(self.interval, self.poll)
+
+    def poll(self):
+        now = time.monotonic()
+        seq, peak = self.slot
+        fresh = seq != self._ack
+        self._ack = seq
+        if fresh and peak >= self.level:
+            self.level = peak
+            self._held_until = now + self.hold
+        elif now > self._held_until:
+            self.level *= self.decay ** (now - self._last_poll)
+        self._last_poll = now
+
+        shown = int(self.level)
+        if shown != self._shown:
+            self._shown = shown
+            self.bar.configure(value=shown)
+        self.bar.after(self.interval, self.poll)
@@ -0,0 +1,220 @@
+import os
+import time
+import threading
+
+# Latency buckets in seconds, from serial-frame scale up to slow cloud recognition
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXPORT_SECONDS = 15.0     # Period of write_periodically()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class _State:
+    enabled = False
+
+_state = _State()
+_lock = threading.Lock()
+_metrics = []
+
+
+def enable(on=True):
+    """Turns recording on; until then every update returns right away"""
+    _state.enabled = on
+
+def enabled():
+    return _state.enabled
+
+def clock():
+    """perf_counter() while enabled, 0 otherwise: start of a duration for observe_since()"""
+    return time.perf_counter() if _state.enabled else 0.0
+
+
+def _labels_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        with _lock:
+            _metrics.append(self)
+
+    def labels(self, *values, **kw):
+        """The child for one combination of label values"""
+        if kw:
+            values = tuple(kw[n] for n in self.labelnames)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def samples(self):
+        """(suffix, label text, value) lines for the exposition format"""
+        children = [((), self)] if not self.labelnames else sorted(self._children.items())
+        for values, child in children:
+            yield from child._samples(self.labelnames, values)
+
+
+class Counter(_Metric):
+    """Monotonic count, exported as <name>_total"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.value = 0
+
+    def _child(self):
+        return _CounterValue()
+
+    def inc(self, n=1):
+        if _state.enabled:
+            with self._lock:
+                self.value += n
+
+    def _samples(self, names, values):
+        yield '_total', _labels_text(names, values), self.value
+
+
+class _CounterValue:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    inc = Counter.inc
+    _samples = Counter._samples
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        if _state.enabled:
+            i = 0
+            buckets = self.buckets
+            while i < len(buckets) and value > buckets[i]:
+                i += 1
+            with self._lock:
+                self.counts[i] += 1
+                self.sum += value
+                self.count += 1
+
+    def observe_since(self, start):
+        """Observes the time since start = clock(); nothing when disabled or start is 0"""
+        if _state.enabled and start:
+            self.observe(time.perf_counter() - start)
+
+    def _samples(self, names, values):
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += n
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            yield '_bucket', _labels_text(names + ('le',), values + (le,)), cumulative
+        yield '_sum', _labels_text(names, values), self.sum
+        yield '_count', _labels_text(names, values), self.count
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    observe = Histogram.observe
+    observe_since = Histogram.observe_since
+    _samples = Histogram._samples
+
+
+def counter(name, help, labelnames=()):
+    return Counter(name, help, labelnames)
+
+def histogram(name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+    return Histogram(name, help, labelnames, buckets)
+
+
+def render():
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        metrics = list(_metrics)
+    for m in metrics:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        for suffix, labels, value in m.samples():
+            lines.append(f"{m.name}{suffix}{labels} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port, host='127.0.0.1'):
+    """Serves /metrics from a daemon thread and turns recording on; returns the server"""
+    # http.server pulls in the email package, only pay for it when serving
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    enable()
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def write_file(path):
+    """Writes render() to path atomically, for node_exporter's textfile collector"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+def write_periodically(path, interval=EXPORT_SECONDS):
+    """Rewrites path every interval seconds from a daemon thread and turns recording on"""
+    enable()
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_file(path)
+            except OSError as e:
+                print(f"Metrics Error: {e}")
+
+    threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,300 @@
+import struct
+import threading
+import time
+from binascii import crc_hqx
+from collections import namedtuple
+
+# --- v1: ASCII, what Voice_Controlled_AC.ino speaks today ---
+# Status:   MotorState,TargetTemp,InTemp,OutTemp,Speed\n (15 bytes, built in all[15])
+# Button:   Start\n / Stop\n
+# Setpoint: two digits and a newline, the board reads exactly 3 bytes
+ASCII_FRAME_LEN = 15
+
+# --- v2: binary frames ---
+# SOF | version | type | seq | len | payload[len] | crc16 (CCITT-FALSE, big endian, over version..payload)
+# 0xA5 never appears in v1 traffic (pure ASCII), which is how the two are told apart.
+SOF = 0xA5
+VERSION = 2
+HEADER = struct.Struct('>BBBBB')
+CRC = struct.Struct('>H')
+MAX_PAYLOAD = 64
+
+MSG_STATUS = 0x01    # state(c) target(b) inside(b) outside(b) speed(B) [more fields...]
+MSG_SETPOINT = 0x02  # target(b)
+MSG_ACK = 0x03       # acked seq(B) result(B)
+MSG_BUTTON = 0x04    # 'S' start / 'T' stop
+MSG_HELLO = 0x05     # version(B) baud(I): proposes v2 at a higher baud rate
+
+STATUS = struct.Struct('>cbbbB')
+SETPOINT = struct.Struct('>b')
+ACK = struct.Struct('>BB')
+HELLO = struct.Struct('>BI')
+
+# Baud rates tried, fastest first, when the board answers HELLO
+FAST_BAUD_RATES = (115200, 57600)
+HELLO_TIMEOUT = 0.3
+BOOT_TIMEOUT = 3.0   # Opening the port resets an Uno: HELLO waits for its first frame, at most this long
+
+# seq is None for v1 frames; extra holds v2 status fields this host does not know yet
+Frame = namedtuple('Frame', ['state', 'target', 'inside', 'outside', 'speed', 'seq', 'extra'],
+                   defaults=(None, b''))
+
+# int_to_string() on the board leaves a '\0' in single digit fields
+_FIELD_JUNK = b' \x00\r'
+
+
+def parse_frame(line):
+    """Parses one v1 status line (without the newline) into a Frame, or None.
+
+    v1 has no checksum, so values that do not fit the v2 STATUS fields
+    (temperatures -128..127, speed 0..255) are taken as line noise.
+    """
+    parts = line.split(b',')
+    if len(parts) != 5:
+        return None
+    try:
+        frame = Frame(
+            parts[0].strip(_FIELD_JUNK).decode('ascii'),
+            int(parts[1].strip(_FIELD_JUNK)),
+            int(parts[2].strip(_FIELD_JUNK)),
+            int(parts[3].strip(_FIELD_JUNK)),
+            int(parts[4].strip(_FIELD_JUNK)),
+        )
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not (-128 <= frame.target <= 127 and -128 <= frame.inside <= 127 and -128 <= frame.outside <= 127
+            and 0 <= frame.speed <= 255):
+        return None
+    return frame
+
+
+def encode_ascii_setpoint(target):
+    """v1 setpoint: always two digits plus newline, e.g. b'07\\n'"""
+    return b'%02d\n' % max(0, min(99, target))
+
+
+def encode_frame(msg_type, seq, payload=b''):
+    body = bytes((VERSION, msg_type, seq & 0xFF, len(payload))) + payload
+    return bytes((SOF,)) + body + CRC.pack(crc_hqx(body, 0xFFFF))
+
+
+def encode_status(frame, seq):
+    payload = STATUS.pack(frame.state.encode('ascii'), frame.target, frame.inside, frame.outside, frame.speed)
+    return encode_frame(MSG_STATUS, seq, payload + frame.extra)
+
+
+class StreamDecoder:
+    """Splits a byte stream that may mix v1 lines and v2 frames into messages.
+
+    feed(data) returns a list of (kind, value) tuples in arrival order:
+    ('status', Frame), ('button', 'Start'|'Stop'), ('ack', (seq, result)),
+    ('setpoint', (seq, target)) and ('hello', (seq, baud)). Corrupt v2 frames
+    (bad CRC) and unparseable lines only bump the error counters; after a
+    corrupt frame decoding picks up again at the next SOF or at the v1
+    message that ends the line the damage is on.
+    """
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.crc_errors = 0
+        self.bad_lines = 0
+        self.last_version = None
+        self._garbage = False    # The current line began inside a corrupt v2 frame
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        out = []
+        pos = 0
+        n = len(buf)
+        while pos < n:
+            if buf[pos] == SOF:
+                if n - pos < HEADER.size:
+                    break
+                _, version, msg_type, seq, length = HEADER.unpack_from(buf, pos)
+                end = pos + HEADER.size + length + CRC.size
+                if version != VERSION or length > MAX_PAYLOAD:
+                    ok = False       # Not really a frame start
+                elif end > n:
+                    # A stray SOF in v1 traffic must not hold back the lines after it
+                    # until its length is made up: whole v1 messages give it away
+                    nl = buf.find(b'\n', pos + 1)
+                    if nl < 0 or self._message_at_end(bytes(buf[pos + 1:nl])) is None:
+                        break
+                    ok = False
+                else:
+                    body = bytes(buf[pos + 1:end - CRC.size])
+                    ok = CRC.unpack_from(buf, end - CRC.size)[0] == crc_hqx(body, 0xFFFF)
+                if not ok:
+                    # Resync on the next SOF or line, counting the damage once
+                    self.crc_errors += 1
+                    self._garbage = True
+                    pos += 1
+                    continue
+                self.last_version = 2
+                self._garbage = False
+                self._decode_v2(msg_type, seq, body[HEADER.size - 1:], out)
+                pos = end
+                continue
+
+            end = buf.find(b'\n', pos)
+            sof = buf.find(bytes((SOF,)), pos, end if end >= 0 else n)
+            if sof >= 0:
+                # A binary frame starts before this line ends: drop the fragment
+                if buf[pos:sof].strip() and not self._garbage:
+                    self.bad_lines += 1
+                self._garbage = False
+                pos = sof
+                continue
+            if end < 0:
+                break
+            line = bytes(buf[pos:end])
+            pos = end + 1
+            if self._garbage:
+                # The rest of a corrupt frame, possibly followed by a whole v1 message
+                self._garbage = False
+                line = self._message_at_end(line)
+                if line is None:
+                    continue
+            self._decode_v1(line, out)
+        del buf[:pos]
+        # A line that never ends is noise, not a frame in progress
+        if len(buf) > 4096:
+            del buf[:]
+            self.bad_lines += 1
+        return out
+
+    @staticmethod
+    def _message_at_end(line):
+        """The v1 status line or button press that line ends with, or None"""
+        frame = line[-(ASCII_FRAME_LEN - 1):]
+        if len(frame) == ASCII_FRAME_LEN - 1 and parse_frame(frame) is not None:
+            return frame
+        for msg in (b'Start', b'Stop'):
+            if line.rstrip(_FIELD_JUNK).endswith(msg):
+                return msg
+        return None
+
+    def _decode_v1(self, line, out):
+        frame = parse_frame(line) if len(line) == ASCII_FRAME_LEN - 1 else None
+        if frame is not None:
+            self.last_version = 1
+            out.append(('status', frame))
+            return
+        msg = line.strip()
+        if msg == b'Start' or msg == b'Stop':
+            out.append(('button', msg.decode('ascii')))
+        elif msg:
+            self.bad_lines += 1
+
+    def _decode_v2(self, msg_type, seq, payload, out):
+        try:
+            if msg_type == MSG_STATUS:
+                state, target, inside, outside, speed = STATUS.unpack_from(payload)
+                out.append(('status', Frame(state.decode('ascii'), target, inside, outside, speed,
+                                            seq, payload[STATUS.size:])))
+            elif msg_type == MSG_BUTTON:
+                out.append(('button', 'Start' if payload[:1] == b'S' else 'Stop'))
+            elif msg_type == MSG_ACK:
+                out.append(('ack', ACK.unpack_from(payload)))
+            elif msg_type == MSG_SETPOINT:
+                out.append(('setpoint', (seq, SETPOINT.unpack_from(payload)[0])))
+            elif msg_type == MSG_HELLO:
+                out.append(('hello', (seq, HELLO.unpack_from(payload)[1])))
+        except (struct.error, UnicodeDecodeError):
+            self.bad_lines += 1
+
+
+class ProtocolLink:
+    """Host side of the link: which version is spoken, sequence numbers and ACKs.
+
+    Stays on v1 ASCII unless negotiate() gets an ACK for its HELLO, so the
+    current firmware keeps working unchanged. On v2 every setpoint carries a
+    sequence number and send_setpoint() waits for the board's ACK, resending
+    on timeout. A board that was reset or replugged is back on v1 at the
+    default baud rate, so negotiate() starts over from v1 on every
+    connection.
+    """
+
+    def __init__(self):
+        self.version = 1
+        self._seq = 0
+        self._acks = {}
+        self._lock = threading.Lock()
+
+    def next_seq(self):
+        with self._lock:
+            self._seq = (self._seq + 1) & 0xFF
+            return self._seq
+
+    def reset(self):
+        """Back to v1 with fresh sequence numbers; setpoints still waiting for an ACK fail"""
+        with self._lock:
+            self.version = 1
+            self._seq = 0
+            acks, self._acks = self._acks, {}
+        for event in acks.values():
+            event.result = None
+            event.set()
+
+    def negotiate(self, ser, bauds=FAST_BAUD_RATES, timeout=HELLO_TIMEOUT, boot_timeout=BOOT_TIMEOUT):
+        """Offers v2 at each baud rate in turn on a newly opened port; returns the version in use afterwards.
+
+        v1 firmware reads every HELLO as setpoints three bytes at a time
+        (a HELLO is 12 bytes, so they stay aligned), which leaves it on a
+        garbage target: when nobody answers, the target the board reported
+        before is written back.
+        """
+        self.reset()
+        decoder = StreamDecoder()
+        target = None
+        # A HELLO sent while the bootloader runs is lost: wait until the sketch talks
+        deadline = time.monotonic() + boot_timeout
+        while target is None and time.monotonic() < deadline:
+            for kind, value in decoder.feed(ser.read(ser.in_waiting or 1)):
+                if kind == 'status':
+                    target = value.target
+        for baud in bauds:
+            seq = self.next_seq()
+            ser.write(encode_frame(MSG_HELLO, seq, HELLO.pack(VERSION, baud)))
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                for kind, value in decoder.feed(ser.read(ser.in_waiting or 1)):
+                    if kind == 'ack' and value == (seq, 0):
+                        ser.baudrate = baud
+                        self.version = 2
+                        return self.version
+        if target is not None:
+            ser.write(encode_ascii_setpoint(target))
+        return self.version
+
+    def on_ack(self, seq, result):
+        """Called by the reader for every ACK frame"""
+        event = self._acks.get(seq)
+        if event is not None:
+            event.result = result
+            event.set()
+
+    def encode_setpoint(self, target):
+        if self.version == 1:
+            return None, encode_ascii_setpoint(target)
+        seq = self.next_seq()
+        return seq, encode_frame(MSG_SETPOINT, seq, SETPOINT.pack(max(-128, min(127, target))))
+
+    def send_setpoint(self, ser, target, retries=3, timeout=0.5):
+        """Writes a setpoint; on v2 returns True once ACKed, on v1 once written"""
+        seq, data = self.encode_setpoint(target)
+        if seq is None:
+            ser.write(data)
+            return True
+        event = threading.Event()
+        self._acks[seq] = event
+        try:
+            for _ in range(retries):
+                ser.write(data)
+                if event.wait(timeout):
+                    return event.result == 0
+            return False
+        finally:
+            if self._acks.get(seq) is event:
+                del self._acks[seq]
@@ -0,0 +1,644 @@
+import json
+import time
+import queue
+import atexit
+import threading
+import multiprocessing
+from multiprocessing import connection, shared_memory
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+import metrics
+import dsp
+
+# Words a spoken thermostat command is made of. Offline engines only search this
+# vocabulary, which keeps a small model both fast and accurate for our commands.
+HVAC_VOCABULARY = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+    "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+    "seventeen", "eighteen", "nineteen", "twenty", "thirty", "forty", "fifty",
+    "sixty", "seventy", "eighty", "ninety", "hundred",
+    "set", "make", "change", "turn", "it", "the", "to", "at", "by", "for", "please",
+    "a", "an", "bit", "point", "temperature", "target", "degree", "degrees", "celsius",
+    "up", "down", "increase", "decrease", "raise", "lower", "reduce", "more", "less",
+    "heat", "cool", "warmer", "cooler", "colder", "hotter", "higher",
+    "above", "below", "over", "under", "plus", "minus",
+    "[unk]",
+]
+
+RACE_TIMEOUT = 10.0      # A race gives up waiting for a usable transcript after this long
+GOOGLE_TIMEOUT = RACE_TIMEOUT  # A Google request that takes longer fails instead of holding its thread
+STATS_WINDOW = 500       # Recent races kept per engine for RaceEngine.stats()
+POOL_WORKERS = 2         # Decoder processes PoolEngine keeps loaded
+POOL_QUEUE = 2           # Utterances waiting for a free worker; beyond this the oldest is dropped
+POOL_SLOT_BYTES = 1 << 21    # Shared memory per worker, over a minute of 16 kHz audio
+POOL_JOB_TIMEOUT = 30.0  # A worker busy this long on one utterance is taken as hung and restarted
+
+ENGINE_SECONDS = metrics.histogram('hvac_engine_seconds', "Decode time of every raced engine, winners and losers", ['engine'])
+ENGINE_RESULTS = metrics.counter('hvac_engine_results', "Raced jobs by engine and outcome (win, text, empty, error, cancelled, busy)",
+                                 ['engine', 'outcome'])
+POOL_RESTARTS = metrics.counter('hvac_pool_restarts', "Recognition worker processes started again after dying or hanging")
+POOL_DROPPED = metrics.counter('hvac_pool_dropped', "Utterances dropped from a full recognition queue for a newer one")
+POOL_WAIT_SECONDS = metrics.histogram('hvac_pool_wait_seconds', "Time an utterance waited for a free recognition worker")
+
+class RecognitionError(Exception):
+    """An engine could not produce a transcript (network, model or decoder failure)"""
+
+
+def _text(result, key):
+    """Pulls the transcript out of a Vosk JSON result, dropping out-of-grammar words"""
+    return json.loads(result).get(key, '').replace('[unk]', '').strip()
+
+
+def load_vosk_model(path):
+    """Loads a Vosk model from disk; raises RecognitionError when vosk or the model is missing"""
+    try:
+        from vosk import Model, SetLogLevel
+    except ImportError:
+        raise RecognitionError("vosk is not installed")
+    SetLogLevel(-1)
+    try:
+        return Model(path)
+    except Exception as e:
+        raise RecognitionError(f"cannot load Vosk model from '{path}': {e}")
+
+
+class RecognizerEngine:
+    """Speech to text backend.
+
+    load() does the expensive one-time setup and is run once, in the
+    background, by load_async(). recognize(audio) turns an sr.AudioData into
+    lower case text ('' when nothing was understood). Engines that can decode
+    while recording return a StreamingSession from stream().
+    """
+
+    name = None
+    offline = False
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error = None
+
+    def load(self):
+        pass
+
+    def load_async(self):
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self):
+        try:
+            self.load()
+        except Exception as e:
+            self.error = e
+            print(f"Recognizer '{self.name}' failed to load: {e}")
+        self.ready.set()
+
+    def wait_ready(self, timeout=None):
+        """True once the engine is loaded and usable"""
+        return self.ready.wait(timeout) and self.error is None
+
+    def recognize(self, audio):
+        raise NotImplementedError
+
+    def stream(self, rate, on_partial=None):
+        return None
+
+    def close(self):
+        """Frees what load() took, the engine is not used again"""
+        pass
+
+
+class GoogleEngine(RecognizerEngine):
+    """Google Web Speech API through speech_recognition (needs network)"""
+
+    name = 'google'
+
+    def load(self):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = GOOGLE_TIMEOUT
+
+    def recognize(self, audio):
+        try:
+            return self.recognizer.recognize_google(audio).lower()
+        except self.sr.UnknownValueError:
+            return ''
+        except (self.sr.RequestError, OSError) as e:  # A read that timed out is a bare TimeoutError
+            raise RecognitionError(f"google: {e}")
+
+
+class VoskEngine(RecognizerEngine):
+    """Offline Kaldi decoder, restricted to HVAC_VOCABULARY"""
+
+    name = 'vosk'
+    offline = True
+
+    def __init__(self, model_path='model', grammar=HVAC_VOCABULARY):
+        super().__init__()
+        self.model_path = model_path
+        self.grammar = grammar
+        self.model = None
+
+    def load(self):
+        self.model = load_vosk_model(self.model_path)
+
+    def recognize(self, audio):
+        from vosk import KaldiRecognizer
+        if self.grammar:
+            rec = KaldiRecognizer(self.model, audio.sample_rate, json.dumps(self.grammar))
+        else:
+            rec = KaldiRecognizer(self.model, audio.sample_rate)
+        rec.AcceptWaveform(audio.get_raw_data(convert_width=2))
+        return _text(rec.FinalResult(), 'text')
+
+    def stream(self, rate, on_partial=None):
+        return StreamingSession(self.model, rate, on_partial, self.grammar)
+
+
+ENGINES = {
+    GoogleEngine.name: GoogleEngine,
+    VoskEngine.name: VoskEngine,
+}
+
+def create_engine(name, **options):
+    """Builds the engine registered under name (see ENGINES)"""
+    try:
+        return ENGINES[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown recognizer engine '{name}', choose from: {', '.join(ENGINES)}")
+
+
+class StreamingSession:
+    """Decodes one utterance incrementally while it is still being recorded.
+
+    feed() only queues the chunk, so the capture loop never waits on the
+    decoder. A worker thread runs the chunks through a Vosk recognizer and
+    reports partial hypotheses through on_partial(text). finish() flushes
+    what is left and returns the final transcript; since decoding kept up
+    with capture, that is only the last fraction of a second of audio.
+    """
+
+    def __init__(self, model, rate, on_partial=None, grammar=None):
+        from vosk import KaldiRecognizer
+        if grammar:
+            self.rec = KaldiRecognizer(model, rate, json.dumps(grammar))
+        else:
+            self.rec = KaldiRecognizer(model, rate)
+        self.on_partial = on_partial
+        self.partial = ''
+        self.segments = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk):
+        self._queue.put(chunk)
+
+    def finish(self, timeout=5):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Decoder fell behind, settle for what it has heard so far
+            return ' '.join(self.segments + [self.partial]).strip()
+        text = _text(self.rec.FinalResult(), 'text')
+        if text:
+            self.segments.append(text)
+        return ' '.join(self.segments)
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self.rec.AcceptWaveform(chunk):
+                # Vosk closed a segment at a pause, keep it and start a new partial
+                text = _text(self.rec.Result(), 'text')
+                if text:
+                    self.segments.append(text)
+                self.partial = ''
+                continue
+            partial = _text(self.rec.PartialResult(), 'partial')
+            if partial and partial != self.partial:
+                self.partial = partial
+                if self.on_partial:
+                    self.on_partial(' '.join(self.segments + [partial]))
+
+
+class RaceEngine(RecognizerEngine):
+    """Runs several engines on the same audio at once; the first usable transcript wins.
+
+    Usable means it parses to a command with a target in range (see
+    command_parser.py). Jobs that have not started by then are cancelled;
+    ones already decoding cannot be interrupted, they finish in the
+    background and only count towards stats(). An engine still busy with
+    an earlier utterance sits the race out, so one slow backend cannot
+    pile up work. Without a usable transcript the first non-empty one is
+    returned. With a streaming engine in the lineup, stream() races the
+    end of its session against the others decoding the whole recording.
+    """
+
+    name = 'race'
+
+    def __init__(self, engines=('vosk', 'google'), options=None, parser=None, timeout=RACE_TIMEOUT):
+        super().__init__()
+        options = options or {}
+        self.engines = [create_engine(e, **options.get(e, {})) if isinstance(e, str) else e for e in engines]
+        self.offline = all(e.offline for e in self.engines)
+        if parser is None:
+            from command_parser import CommandParser
+            parser = CommandParser()
+        self.parser = parser
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(len(self.engines), thread_name_prefix='race')
+        self._lock = threading.Lock()
+        self._busy = set()
+        self._races = {e.name: deque(maxlen=STATS_WINDOW) for e in self.engines}     # True when won
+        self._seconds = {e.name: deque(maxlen=STATS_WINDOW) for e in self.engines}
+
+    def load(self):
+        for e in self.engines:
+            e.load_async()
+        # Usable once one engine is, the others join the races when they are loaded
+        while not any(e.wait_ready(0) for e in self.engines):
+            if all(e.ready.is_set() for e in self.engines):
+                raise RecognitionError('; '.join(f"{e.name}: {e.error}" for e in self.engines))
+            time.sleep(0.05)
+
+    def recognize(self, audio):
+        return self._race([(e.name, e.recognize, audio) for e in self._entrants()])
+
+    def stream(self, rate, on_partial=None):
+        entrants = self._entrants(count=False)
+        for e in entrants:
+            session = e.stream(rate, on_partial)
+            if session is not None:
+                return RaceSession(self, e, session, rate, [o for o in entrants if o is not e])
+        return None
+
+    def usable(self, text):
+        """True if text is a command the board can take"""
+        command = self.parser.parse(text)
+        if command is None:
+            return False
+        return command.kind == 'change' or self.parser.min_target <= command.value <= self.parser.max_target
+
+    def stats(self):
+        """{engine: {'races', 'wins', 'win_rate', 'p50_ms', 'p95_ms'}} over the recent races"""
+        out = {}
+        for e in self.engines:
+            with self._lock:
+                races = list(self._races[e.name])
+                seconds = sorted(self._seconds[e.name])
+            pick = lambda q: round(seconds[min(len(seconds) - 1, int(q * len(seconds)))] * 1000, 1) if seconds else None
+            out[e.name] = {'races': len(races), 'wins': sum(races),
+                           'win_rate': round(sum(races) / len(races), 3) if races else None,
+                           'p50_ms': pick(0.5), 'p95_ms': pick(0.95)}
+        return out
+
+    def close(self):
+        """Drops jobs that have not started and closes every engine"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for e in self.engines:
+            e.close()
+
+    def busy(self):
+        """Names of the engines still decoding an earlier utterance, as a snapshot"""
+        with self._lock:
+            return set(self._busy)
+
+    def _entrants(self, count=True):
+        entrants = []
+        busy = self.busy()
+        for e in self.engines:
+            if not e.wait_ready(0):
+                continue
+            if e.name in busy:
+                if count:
+                    ENGINE_RESULTS.labels(e.name, 'busy').inc()
+                continue
+            entrants.append(e)
+        return entrants
+
+    def _race(self, jobs):
+        """Runs (engine name, fn, arg) jobs at once, returns the winning text"""
+        if not jobs:
+            raise RecognitionError("no recognizer engine is available")
+        started = time.perf_counter()
+        futures = {}
+        for name, fn, arg in jobs:
+            with self._lock:
+                self._busy.add(name)
+            futures[self._pool.submit(self._job, name, fn, arg, started)] = name
+        winner = fallback = None
+        errors = []
+        try:
+            for future in as_completed(futures, self.timeout):
+                name = futures[future]
+                try:
+                    text = future.result()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+                    continue
+                if text and self.usable(text):
+                    winner = name
+                    return text
+                if text and fallback is None:
+                    fallback = text
+        except FutureTimeout:
+            print(f"Recognition race: nothing usable after {self.timeout:g} s")
+        finally:
+            for future, name in futures.items():
+                if future.cancel():
+                    ENGINE_RESULTS.labels(name, 'cancelled').inc()
+                    self._release(name)
+                with self._lock:
+                    self._races[name].append(name == winner)
+            if winner is not None:
+                ENGINE_RESULTS.labels(winner, 'win').inc()
+        if fallback is None and len(errors) == len(jobs):
+            raise RecognitionError('; '.join(errors))
+        return fallback or ''
+
+    def _job(self, name, fn, arg, started):
+        outcome = 'error'
+        try:
+            text = fn(arg)
+            outcome = 'text' if text else 'empty'
+            return text
+        finally:
+            seconds = time.perf_counter() - started
+            ENGINE_SECONDS.labels(name).observe(seconds)
+            ENGINE_RESULTS.labels(name, outcome).inc()
+            self._release(name, seconds)
+
+    def _release(self, name, seconds=None):
+        with self._lock:
+            self._busy.discard(name)
+            if seconds is not None:
+                self._seconds[name].append(seconds)
+
+
+class RaceSession:
+    """A streaming engine's session, raced at finish() against the other engines on the whole recording"""
+
+    def __init__(self, race, engine, session, rate, others):
+        self.race = race
+        self.engine = engine
+        self.session = session
+        self.rate = rate
+        self.others = others
+        self.chunks = []
+
+    def feed(self, chunk):
+        self.session.feed(chunk)
+        self.chunks.append(chunk)
+
+    def finish(self, timeout=5):
+        jobs = [(self.engine.name, self.session.finish, timeout)]
+        busy = self.race.busy()
+        others = [e for e in self.others if e.name not in busy]
+        if others and self.chunks:
+            try:
+                import speech_recognition as sr
+                audio = sr.AudioData(*dsp.preprocess(b''.join(self.chunks), self.rate), 2)
+                jobs += [(e.name, e.recognize, audio) for e in others]
+            except ImportError:
+                pass
+        return self.race._race(jobs)
+
+
+class PoolEngine(RecognizerEngine):
+    """Runs an engine in warm worker processes, so decoding never holds this process's GIL.
+
+    Every worker loads its own copy of the engine once and keeps it. An
+    utterance is copied into the shared memory block of a free worker and
+    only its length goes over the pipe; the transcript comes back on it.
+    A worker that dies or hangs fails just the utterance it had and is
+    started again. At most queue_size utterances wait for a worker: past
+    that the oldest waiting one is dropped, the newest command being the
+    one that counts. Audio is decoded after the recording, not streamed.
+
+    engine is a name registered in ENGINES or a RecognizerEngine subclass
+    the workers can import by module name (not one defined in the script
+    being run: workers start from recognition_worker, never the app's main
+    module); options are passed to it.
+    """
+
+    name = 'pool'
+
+    def __init__(self, engine='vosk', options=None, workers=POOL_WORKERS, queue_size=POOL_QUEUE,
+                 slot_bytes=POOL_SLOT_BYTES, timeout=POOL_JOB_TIMEOUT):
+        super().__init__()
+        self.engine = engine
+        self.options = options or {}
+        self.offline = (ENGINES[engine] if isinstance(engine, str) else engine).offline
+        self.workers = workers
+        self.queue_size = queue_size
+        self.slot_bytes = slot_bytes
+        self.timeout = timeout
+        self.restarts = 0
+        self.dropped = 0
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        self._loaded = []       # Load error (None when fine) of each worker's first start
+        self._slots = []        # (slot, thread serving it)
+        self._serving = 0       # Serve threads still running
+        self._closed = False
+
+    def load(self):
+        ctx = multiprocessing.get_context('spawn')    # Never fork the threads of the app
+        self._serving = self.workers
+        for i in range(self.workers):
+            slot = _Slot(i, ctx, self.slot_bytes)
+            thread = threading.Thread(target=self._serve, args=(slot,), daemon=True, name=f"pool-{i}")
+            self._slots.append((slot, thread))
+            thread.start()
+        atexit.register(self.close)
+        # Usable once one worker is, like RaceEngine
+        with self._cond:
+            self._cond.wait_for(lambda: None in self._loaded or len(self._loaded) == self.workers)
+        if None not in self._loaded:
+            raise RecognitionError(self._loaded[0])
+
+    def recognize(self, audio):
+        future = self.submit(audio)
+        try:
+            # Every utterance ahead of this one, then this one, each within the hung-worker timeout
+            return future.result(self.timeout * (self.queue_size + 2))
+        except FutureTimeout:
+            future.cancel()
+            raise RecognitionError(f"no recognition worker answered within {self.timeout * (self.queue_size + 2):g} s")
+
+    def submit(self, audio):
+        """Queues sr.AudioData for the next free worker; returns a concurrent Future of the text"""
+        if len(audio.frame_data) > self.slot_bytes:
+            raise RecognitionError(f"recording of {len(audio.frame_data)} bytes does not fit the {self.slot_bytes} byte worker slot")
+        job = (Future(), audio, time.perf_counter())
+        with self._cond:
+            if self._closed:
+                raise RecognitionError("recognition pool is closed")
+            if not self._serving:
+                raise RecognitionError("no recognition worker is running")
+            self._jobs.append(job)
+            while len(self._jobs) > self.queue_size:
+                old = self._jobs.popleft()
+                old[0].set_exception(RecognitionError("dropped for a newer utterance"))
+                self.dropped += 1
+                POOL_DROPPED.inc()
+            self._cond.notify()
+        return job[0]
+
+    def close(self):
+        """Stops the workers, then frees their shared memory"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._fail_waiting("recognition pool is closed")
+        for slot, thread in self._slots:
+            # An idle worker is stopped by its serve thread right away; a busy one is killed
+            thread.join(1)
+            if thread.is_alive():
+                slot.kill()
+                thread.join()
+        for slot, _ in self._slots:
+            slot.shm.close()
+            slot.shm.unlink()
+        self._slots = []
+        atexit.unregister(self.close)
+
+    def _fail_waiting(self, message):
+        with self._cond:
+            jobs, self._jobs = self._jobs, deque()
+        for future, _, _ in jobs:
+            future.set_exception(RecognitionError(message))
+
+    def _next(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._jobs or self._closed)
+            return None if self._closed else self._jobs.popleft()
+
+    def _serve(self, slot):
+        """Keeps one worker process running and hands it jobs, one at a time"""
+        try:
+            self._keep_serving(slot)
+        finally:
+            slot.stop()
+            with self._cond:
+                self._serving -= 1
+                orphaned = not self._serving and not self._closed
+            if orphaned:
+                # No worker left to take what is waiting: fail it now rather than never
+                self._fail_waiting("no recognition worker is running")
+
+    def _keep_serving(self, slot):
+        first = True
+        while not self._closed:
+            error = slot.start(self.engine, self.options)
+            if first:
+                first = False
+                with self._cond:
+                    self._loaded.append(error)
+                    self._cond.notify_all()
+            if error is not None:
+                if not self._closed:
+                    print(f"Recognition worker {slot.index} failed to load: {error}")
+                return
+            while True:
+                job = self._next()
+                if job is None:
+                    return
+                future, audio, queued = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                POOL_WAIT_SECONDS.observe_since(queued)
+                try:
+                    text = slot.run(audio, self.timeout)
+                except RecognitionError as e:
+                    future.set_exception(e)
+                    continue
+                except _WorkerLost as e:
+                    future.set_exception(RecognitionError(str(e)))
+                    if self._closed:
+                        return
+                    print(f"Recognition Error: {e}, starting it again")
+                    self.restarts += 1
+                    POOL_RESTARTS.inc()
+                    slot.stop()
+                    break
+                future.set_result(text)
+
+
+class _WorkerLost(Exception):
+    pass
+
+class _Slot:
+    """One worker process of a PoolEngine, its pipe and its shared memory block"""
+
+    def __init__(self, index, ctx, size):
+        self.index = index
+        self.ctx = ctx
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.process = None
+        self.conn = None
+
+    def start(self, engine, options):
+        """Starts the worker and waits for its engine to load; None, or the error it failed with"""
+        import recognition_worker
+        self.conn, child = self.ctx.Pipe()
+        self.process = self.ctx.Process(target=recognition_worker.serve, args=(engine, options, child, self.shm.name),
+                                        name=f"recognizer-{self.index}", daemon=True)
+        self.process.start()
+        child.close()
+        try:
+            return self.conn.recv()
+        except EOFError:
+            return f"worker exited with code {self.process.exitcode}"
+
+    def run(self, audio, timeout):
+        data = audio.frame_data
+        self.shm.buf[:len(data)] = data
+        try:
+            self.conn.send((type(audio), len(data), audio.sample_rate, audio.sample_width))
+        except OSError:
+            # Died while idle
+            ready = [self.process.sentinel]
+        else:
+            ready = connection.wait([self.conn, self.process.sentinel], timeout)
+        if self.conn in ready:
+            try:
+                text, error = self.conn.recv()
+            except EOFError:
+                ready = []
+            else:
+                if error is not None:
+                    raise RecognitionError(error)
+                return text
+        self.process.join(0.5 if self.process.sentinel in ready else 0)
+        if self.process.exitcode is not None:
+            raise _WorkerLost(f"recognition worker {self.index} died (exit code {self.process.exitcode})")
+        raise _WorkerLost(f"recognition worker {self.index} hung for {timeout:g} s")
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.conn.close()
+        self.process = None
+
+    def kill(self):
+        """Ends the worker at once, from any thread; its serve thread sees it die"""
+        process = self.process
+        if process is not None and process.is_alive():
+            process.kill()
+
+
+ENGINES[RaceEngine.name] = RaceEngine
+ENGINES[PoolEngine.name] = PoolEngine
\ No newline at end of file
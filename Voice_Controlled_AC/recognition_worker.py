@@ -0,0 +1,31 @@
+# Entry point of PoolEngine's worker processes. A spawned child runs its parent's main
+# module again before the worker starts, which is why voice_recognizer.py imports the
+# window only under its main guard; keep GUI imports out of here and what it imports too.
+from multiprocessing import shared_memory
+from recognition import create_engine
+
+
+def serve(engine, options, conn, shm_name):
+    """Worker process of a PoolEngine: loads the engine once, then decodes what appears in shared memory"""
+    shm = shared_memory.SharedMemory(shm_name)
+    try:
+        engine = create_engine(engine, **options) if isinstance(engine, str) else engine(**options)
+        engine.load()
+    except Exception as e:
+        conn.send(str(e) or type(e).__name__)
+        shm.close()
+        return
+    conn.send(None)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        cls, size, rate, width = job
+        try:
+            conn.send((engine.recognize(cls(bytes(shm.buf[:size]), rate, width)), None))
+        except Exception as e:
+            conn.send(('', str(e) or type(e).__name__))
+    shm.close()
@@ -0,0 +1,65 @@
+import metrics
+from protocol import StreamDecoder
+
+FRAMES_RECEIVED = metrics.counter('hvac_frames_received', "Status frames decoded from the serial port")
+FRAMES_DROPPED = metrics.counter('hvac_frames_dropped', "Serial input that could not be decoded", ['reason'])
+_PARSE_ERRORS = FRAMES_DROPPED.labels('parse')
+_CRC_ERRORS = FRAMES_DROPPED.labels('crc')
+
+class SerialReader:
+    """Blocking serial reader that splits everything available into frames.
+
+    on_frames(frames) receives every status frame parsed from one read, in order.
+    on_button(msg) receives the "Start"/"Stop" button messages.
+    on_ack(seq, result) receives v2 ACKs, when given.
+    Both the v1 ASCII lines and v2 binary frames are understood (see protocol.py).
+    """
+
+    def __init__(self, ser, on_frames, on_button, on_ack=None):
+        self.ser = ser
+        self.on_frames = on_frames
+        self.on_button = on_button
+        self.on_ack = on_ack
+        self.running = False
+        self.decoder = StreamDecoder()
+        self._bad_lines = 0
+        self._crc_errors = 0
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        self.running = True
+        while self.running:
+            # Blocks in the driver until at least one byte arrives or the port timeout expires
+            data = self.ser.read(self.ser.in_waiting or 1)
+            if data:
+                self.feed(data)
+
+    def feed(self, data):
+        """Decodes raw bytes and dispatches every complete message"""
+        frames = []
+        for kind, value in self.decoder.feed(data):
+            if kind == 'status':
+                frames.append(value)
+                continue
+            if frames:
+                self._flush(frames)
+                frames = []
+            if kind == 'button':
+                self.on_button(value)
+            elif kind == 'ack' and self.on_ack is not None:
+                self.on_ack(*value)
+        if frames:
+            self._flush(frames)
+        decoder = self.decoder
+        if decoder.bad_lines != self._bad_lines:
+            _PARSE_ERRORS.inc(decoder.bad_lines - self._bad_lines)
+            self._bad_lines = decoder.bad_lines
+        if decoder.crc_errors != self._crc_errors:
+            _CRC_ERRORS.inc(decoder.crc_errors - self._crc_errors)
+            self._crc_errors = decoder.crc_errors
+
+    def _flush(self, frames):
+        FRAMES_RECEIVED.inc(len(frames))
+        self.on_frames(frames)
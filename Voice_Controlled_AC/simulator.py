@@ -0,0 +1,347 @@
+import os
+import sys
+import time
+import tty
+import queue
+import selectors
+import threading
+import argparse
+from protocol import (SOF, ACK, MSG_ACK, MSG_BUTTON, Frame, StreamDecoder, encode_frame,
+                      encode_status)
+
+# --- Firmware constants (Voice_Controlled_AC.ino) ---
+DEADBAND = 2            # The motor only runs when |in - target| > 2
+MIN_SPEED = 165         # map(difference, 0, 20, 165, 255)
+MAX_SPEED = 255
+LOOP_SECONDS = 0.1      # _delay_ms(100): simulated time advanced by every loop
+SETPOINT_BYTES = 3      # Uart_ReadString(receivedTarget, 3)
+BOOT_SECONDS = 1.6      # Silence after a reset while the bootloader waits for an upload
+MAX_BAUD = 115200       # Fastest rate a v2 board accepts in a HELLO
+
+# --- Thermal model, in degrees per simulated second ---
+LEAK_RATE = 0.002       # Inside drifts towards outside through the walls
+HEAT_LOAD = 0.02        # People, sun and appliances warm the room
+FAN_RATE = 0.02         # Full speed fan pulls inside towards outside at this fraction of the gap
+HOOD_RATE = 0.05        # Full speed hood exhausts hot air at this many degrees per second
+
+SIM_HZ = 10             # Frames per second per unit, the board sends 10
+START_INSIDE = 30.0
+START_OUTSIDE = 22.0
+
+
+def int_to_string(n):
+    """myString.ino int_to_string() into a char[3]: single digits leave a '\\0' in the second byte"""
+    s = str(n).encode('ascii')
+    return (s + b'\x00\x00')[:2]
+
+
+class VirtualBoard:
+    """The control loop of Voice_Controlled_AC.ino, in Python.
+
+    step() runs one pass of the firmware's while(1) loop and returns exactly
+    what the board writes to the UART: an optional "Start\\n"/"Stop\\n" and
+    the 15-byte status frame, NUL quirk included. receive() feeds bytes the
+    host sent; like Uart_ReadString(receivedTarget, 3) they are consumed
+    three at a time and the frame echoes the raw two bytes received.
+
+    protocol=2 plays firmware that also speaks the binary v2 protocol: it
+    boots on v1, ACKs a HELLO for any baud rate up to max_baud, and from
+    then on sends v2 frames and ACKs every setpoint.
+    """
+
+    def __init__(self, inside=START_INSIDE, outside=START_OUTSIDE, target=b'25', protocol=1, max_baud=MAX_BAUD):
+        self.inside = float(inside)
+        self.outside = float(outside)
+        self.received_target = target
+        self.target = simple_atoi(target)
+        self.state = 0
+        self.motor = 'S'
+        self.speed = 0
+        self.frames = 0
+        self._rx = bytearray()
+        self._presses = 0
+        self.protocol = protocol     # Highest version the firmware speaks
+        self.max_baud = max_baud
+        self.restart_link()
+
+    def restart_link(self):
+        """Back on v1 at the default baud rate, as after a power cycle"""
+        self.version = 1
+        self.baud = None
+        self._decoder = StreamDecoder()
+        self._seq = 0
+
+    def _frame(self, msg_type, payload):
+        self._seq = (self._seq + 1) & 0xFF
+        return encode_frame(msg_type, self._seq, payload)
+
+    def receive(self, data):
+        self._rx += data
+
+    def press(self):
+        """Queues a press of the board's button"""
+        self._presses += 1
+
+    def step(self, dt=LOOP_SECONDS):
+        out = b''
+        # 1. Setpoint from the UART
+        if self.protocol >= 2 and (self._decoder.buf or self._rx[:1] == bytes((SOF,))):
+            data = bytes(self._rx)
+            self._rx.clear()
+            out += self._receive_v2(data)
+        elif len(self._rx) >= SETPOINT_BYTES:
+            raw = bytes(self._rx[:SETPOINT_BYTES])
+            del self._rx[:SETPOINT_BYTES]
+            self.received_target = raw[:2]
+            self.target = simple_atoi(raw)
+        # 2. Button
+        if self._presses:
+            self._presses -= 1
+            if self.version == 2:
+                out += self._frame(MSG_BUTTON, b'S' if self.state == 0 else b'T')
+            else:
+                out += b"Start\n" if self.state == 0 else b"Stop\n"
+            self.state ^= 1
+        # 3. Sensors, truncated like the ADC maths
+        in_temp = int(self.inside)
+        out_temp = int(self.outside)
+        # Control
+        difference = abs(in_temp - self.target)
+        speed = min(fw_map(difference, 0, 20, MIN_SPEED, MAX_SPEED), MAX_SPEED)
+        if difference > DEADBAND:
+            if in_temp > self.target:
+                self.motor = 'F' if out_temp < in_temp else 'B'
+            elif out_temp > in_temp:
+                self.motor = 'F'
+            else:
+                self.motor = 'S'
+        else:
+            self.motor = 'S'
+        self.speed = speed
+        self._physics(dt)
+        self.frames += 1
+        if self.version == 2:
+            target = max(-128, min(127, self.target))
+            self._seq = (self._seq + 1) & 0xFF
+            return out + encode_status(Frame(self.motor, target, in_temp, out_temp, speed), self._seq)
+        # The speed field is sent even when the motor is stopped
+        frame = (self.motor.encode('ascii') + b',' + self.received_target + b',' + int_to_string(in_temp)
+                 + b',' + int_to_string(out_temp) + b',' + b'%03d' % speed + b'\n')
+        return out + frame
+
+    def _receive_v2(self, data):
+        """HELLOs and v2 setpoints; returns the ACKs to send"""
+        out = b''
+        for kind, value in self._decoder.feed(data):
+            if kind == 'hello':
+                seq, baud = value
+                ok = baud <= self.max_baud
+                out += self._frame(MSG_ACK, ACK.pack(seq, 0 if ok else 1))
+                if ok:
+                    self.version = 2
+                    self.baud = baud
+            elif kind == 'setpoint':
+                seq, target = value
+                self.target = target
+                self.received_target = int_to_string(target)
+                out += self._frame(MSG_ACK, ACK.pack(seq, 0))
+        return out
+
+    def _physics(self, dt):
+        duty = self.speed / MAX_SPEED
+        rate = LEAK_RATE * (self.outside - self.inside) + HEAT_LOAD
+        if self.motor == 'F':
+            rate += FAN_RATE * duty * (self.outside - self.inside)
+        elif self.motor == 'B':
+            rate -= HOOD_RATE * duty
+        self.inside = max(0.0, min(99.0, self.inside + rate * dt))
+
+
+def simple_atoi(raw):
+    """myString.ino simple_atoi(): every digit counts, everything else is skipped"""
+    res = 0
+    for c in raw:
+        if 48 <= c <= 57:
+            res = (res * 10 + c - 48) & 0xFFFF
+    return res
+
+def fw_map(x, in_min, in_max, out_min, out_max):
+    """Arduino map() with C integer division"""
+    n = (x - in_min) * (out_max - out_min)
+    return int(n / (in_max - in_min)) + out_min
+
+
+class PtyBoard:
+    """A VirtualBoard behind a pseudo-terminal; open .port like the real COM port"""
+
+    def __init__(self, board=None):
+        self.board = board or VirtualBoard()
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)       # No echo or newline translation, like a real UART
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.dropped = 0             # Bytes thrown away because the host was not reading
+        self.booting_until = 0.0     # perf_counter() until which a reset board stays silent
+
+    def read(self):
+        try:
+            data = os.read(self.master, 4096)
+        except (BlockingIOError, OSError):
+            return
+        self.board.receive(data)
+
+    def step(self, dt=LOOP_SECONDS):
+        if self.booting_until and time.perf_counter() < self.booting_until:
+            return
+        data = self.board.step(dt)
+        try:
+            n = os.write(self.master, data)
+        except (BlockingIOError, OSError):
+            n = 0
+        self.dropped += len(data) - n
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class Simulator:
+    """Runs any number of PtyBoards from one thread at hz frames per second each.
+
+    Simulated time always advances LOOP_SECONDS per frame, so a rate above
+    the board's 10 Hz also fast-forwards the thermal model.
+    """
+
+    def __init__(self, units=1, hz=SIM_HZ, **board_options):
+        self.hz = hz
+        self.boards = [PtyBoard(VirtualBoard(**board_options)) for _ in range(units)]
+        self.running = False
+        self.ticks = 0
+        self._unplugged = {}          # Index -> VirtualBoard whose cable is out
+        self._ops = queue.SimpleQueue()
+        self._sel = None
+
+    @property
+    def ports(self):
+        return [b.port if b else None for b in self.boards]
+
+    # --- Faults, callable from any thread ---
+    def unplug(self, i):
+        """Pulls unit i's USB cable: its port disappears and host reads fail"""
+        self._call(self._unplug, i)
+
+    def plug(self, i):
+        """Plugs unit i back in, as a new port like a re-enumerated USB device; returns the port"""
+        return self._call(self._plug, i)
+
+    def reboot(self, i, boot_seconds=BOOT_SECONDS):
+        """Resets unit i: silent while it boots, then running again with the default target"""
+        self._call(self._reboot, i, boot_seconds)
+
+    def _call(self, fn, *args):
+        if not self.running:
+            return fn(*args)
+        # Run by the loop thread, which owns the selector
+        done = threading.Event()
+        result = []
+        self._ops.put((fn, args, result, done))
+        while not done.wait(0.5):
+            if not self.running:     # The loop ended before getting to it
+                self._run_ops()
+        return result[0]
+
+    def _run_ops(self):
+        while not self._ops.empty():
+            fn, args, result, done = self._ops.get()
+            result.append(fn(*args))
+            done.set()
+
+    def _unplug(self, i):
+        b = self.boards[i]
+        if b is None:
+            return
+        if self._sel is not None:
+            self._sel.unregister(b.master)
+        b.close()
+        self._unplugged[i] = b.board
+        self.boards[i] = None
+
+    def _plug(self, i):
+        if self.boards[i] is None:
+            board = self._unplugged.pop(i)
+            board.restart_link()       # It lost power with the cable
+            b = self.boards[i] = PtyBoard(board)
+            b.booting_until = time.perf_counter() + BOOT_SECONDS
+            if self._sel is not None:
+                self._sel.register(b.master, selectors.EVENT_READ, b)
+        return self.boards[i].port
+
+    def _reboot(self, i, boot_seconds):
+        b = self.boards[i]
+        if b is not None:
+            b.board = VirtualBoard(b.board.inside, b.board.outside, protocol=b.board.protocol,
+                                   max_baud=b.board.max_baud)
+            b.booting_until = time.perf_counter() + boot_seconds
+
+    def run(self, seconds=None):
+        sel = self._sel = selectors.DefaultSelector()
+        for b in self.boards:
+            if b is not None:
+                sel.register(b.master, selectors.EVENT_READ, b)
+        period = 1.0 / self.hz
+        start = next_tick = time.perf_counter()
+        self.running = True
+        try:
+            while self.running and (seconds is None or next_tick - start < seconds):
+                timeout = next_tick - time.perf_counter()
+                for key, _ in sel.select(max(0.0, timeout)):
+                    key.data.read()
+                self._run_ops()
+                if time.perf_counter() < next_tick:
+                    continue
+                for b in self.boards:
+                    if b is not None:
+                        b.step()
+                self.ticks += 1
+                next_tick += period
+                # Running behind: skip ahead instead of bursting to catch up
+                now = time.perf_counter()
+                if now - next_tick > period:
+                    next_tick = now
+        finally:
+            self.running = False
+            self._run_ops()
+            self._sel = None
+            sel.close()
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        for b in self.boards:
+            if b is not None:
+                b.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Simulated Voice_Controlled_AC boards on pseudo-terminals")
+    ap.add_argument('--units', type=int, default=1)
+    ap.add_argument('--hz', type=float, default=SIM_HZ, help="frames per second per unit")
+    ap.add_argument('--inside', type=float, default=START_INSIDE)
+    ap.add_argument('--outside', type=float, default=START_OUTSIDE)
+    ap.add_argument('--protocol', type=int, choices=(1, 2), default=1, help="2 for firmware that also speaks v2")
+    ap.add_argument('--seconds', type=float, default=None, help="stop after this long (default: run until Ctrl+C)")
+    args = ap.parse_args()
+
+    sim = Simulator(args.units, args.hz, inside=args.inside, outside=args.outside, protocol=args.protocol)
+    for port in sim.ports:
+        print(port)
+    sys.stdout.flush()
+    try:
+        sim.run(args.seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dropped = sum(b.dropped for b in sim.boards if b)
+        print(f"{sim.ticks} ticks, {sim.ticks * len(sim.boards)} frames, {dropped} bytes dropped")
+        sim.close()
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import builtins
+import threading
+
+# Startup profiling: run with --profile-startup (or HVAC_PROFILE_STARTUP=1) to get a
+# timeline of slow imports and initialisation steps once everything is up
+PROFILE_FLAG = '--profile-startup'
+PROFILE_ENV = 'HVAC_PROFILE_STARTUP'
+MIN_IMPORT_MS = 2.0   # Faster imports are left out of the timeline
+MAX_DEPTH = 2         # Nested imports shown below the ones our modules asked for
+
+enabled = PROFILE_FLAG in sys.argv or bool(os.environ.get(PROFILE_ENV))
+_t0 = time.perf_counter()
+_marks = []           # (time, label)
+_imports = []         # (start, seconds, module, depth, thread)
+_local = threading.local()
+_original_import = builtins.__import__
+_reported = False
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _local.depth = depth
+        if depth < MAX_DEPTH:
+            _imports.append((start, time.perf_counter() - start, name, depth, threading.current_thread().name))
+
+if enabled:
+    builtins.__import__ = _timed_import
+
+
+def mark(label):
+    """Notes that a startup step finished now"""
+    if enabled:
+        _marks.append((time.perf_counter(), label))
+
+def report():
+    """Prints the timeline once (profiling mode only) and stops timing imports"""
+    global _reported
+    if not enabled or _reported:
+        return
+    _reported = True
+    builtins.__import__ = _original_import
+    rows = list(_marks)
+    for start, seconds, name, depth, thread in _imports:
+        if seconds * 1000 >= MIN_IMPORT_MS:
+            where = '' if thread == 'MainThread' else f"  [{thread}]"
+            rows.append((start, f"{'  ' * depth}import {name}  ({seconds * 1000:.1f} ms){where}"))
+    print("--- Startup timeline (ms since voice_recognizer.py started) ---")
+    for t, text in sorted(rows):
+        print(f"{(t - _t0) * 1000:9.1f}  {text}")
@@ -0,0 +1,286 @@
+import os
+import queue
+import struct
+import threading
+from array import array
+
+# Motor states as stored on disk and in the ring
+STATE_CODES = {'S': 0, 'F': 1, 'B': 2}
+STATE_NAMES = {v: k for k, v in STATE_CODES.items()}
+FIELDS = ('state', 'target', 'inside', 'outside', 'speed')
+
+RING_CAPACITY = 36000         # One hour at 10 Hz in memory
+MAX_FILE_BYTES = 16 * 2**20   # Rotate the log at this size
+KEEP_FILES = 8                # Rotated logs kept next to the live one
+FLUSH_RECORDS = 256           # Write to disk every this many samples...
+FLUSH_SECONDS = 5.0           # ...or this often, whichever comes first
+ROLLUP_SECONDS = 60           # Width of the min/max summaries used for long ranges
+
+# Log files start with a magic line, then fixed size little endian records
+MAGIC = b'HVACTLM1'
+ROLLUP_MAGIC = b'HVACRLP1'
+RECORD = struct.Struct('<dBbbbB')            # ts, state, target, inside, outside, speed
+ROLLUP = struct.Struct('<dI' + 'bb' * 3 + 'BB')  # start ts, samples, min/max target, inside, outside, speed
+
+
+class TelemetryRing:
+    """Fixed size in-memory history, one preallocated array per field"""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.ts = array('d', bytes(8 * capacity))
+        self.state = array('B', bytes(capacity))
+        self.target = array('b', bytes(capacity))
+        self.inside = array('b', bytes(capacity))
+        self.outside = array('b', bytes(capacity))
+        self.speed = array('B', bytes(capacity))
+        self.count = 0   # Samples ever appended, the write index is count % capacity
+
+    def append(self, ts, frame):
+        i = self.count % self.capacity
+        self.ts[i] = ts
+        self.state[i] = STATE_CODES.get(frame.state, 0)
+        self.target[i] = frame.target
+        self.inside[i] = frame.inside
+        self.outside[i] = frame.outside
+        self.speed[i] = frame.speed
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _indices(self):
+        """Ring indices from oldest to newest"""
+        n = len(self)
+        start = self.count - n
+        return (i % self.capacity for i in range(start, self.count))
+
+    def samples(self, t0=None, t1=None):
+        """(ts, state, target, inside, outside, speed) tuples in time order, optionally within [t0, t1)"""
+        for i in self._indices():
+            ts = self.ts[i]
+            if (t0 is None or ts >= t0) and (t1 is None or ts < t1):
+                yield (ts, STATE_NAMES[self.state[i]], self.target[i], self.inside[i],
+                       self.outside[i], self.speed[i])
+
+    def downsample(self, t0, t1, buckets, field='inside'):
+        """Min/max of a numeric field per bucket; see downsample()"""
+        column = _column(field)
+        return downsample(((s[0], s[column], s[column]) for s in self.samples(t0, t1)), t0, t1, buckets)
+
+    def oldest(self):
+        """Timestamp of the oldest sample still in the ring, None when empty"""
+        if not self.count:
+            return None
+        return self.ts[(self.count - len(self)) % self.capacity]
+
+
+def _column(field):
+    """Position of a numeric field in a sample tuple"""
+    if field not in FIELDS[1:]:
+        raise ValueError(f"Cannot downsample '{field}', choose from: {', '.join(FIELDS[1:])}")
+    return FIELDS.index(field) + 1
+
+def downsample(points, t0, t1, buckets):
+    """[(bucket start, min, max)] over (ts, low, high) points, empty buckets left out"""
+    width = (t1 - t0) / buckets
+    lo = [None] * buckets
+    hi = [None] * buckets
+    for ts, low, high in points:
+        b = int((ts - t0) / width)
+        if 0 <= b < buckets:
+            if lo[b] is None or low < lo[b]:
+                lo[b] = low
+            if hi[b] is None or high > hi[b]:
+                hi[b] = high
+    return [(t0 + b * width, lo[b], hi[b]) for b in range(buckets) if lo[b] is not None]
+
+
+class TelemetryLog:
+    """Append-only on-disk log with size based rotation.
+
+    Samples are packed into a preallocated buffer and handed over in blocks
+    to a writer thread, so the ingest path (the event loop serving every
+    unit) does no per-sample allocation and no file I/O. Next to every log
+    file a rollup file keeps min/max per ROLLUP_SECONDS, which is what long
+    range queries read instead of the raw samples.
+    """
+
+    def __init__(self, path, max_bytes=MAX_FILE_BYTES, keep=KEEP_FILES):
+        self.path = path
+        self.rollup_path = path + '.rollup'
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self._buf = bytearray(RECORD.size * FLUSH_RECORDS)
+        self._pending = 0
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._window = None     # Rollup window being filled: [start, n, min/max...]
+        self._rollups = bytearray()
+        self._writes = queue.Queue()
+        self._writer = None
+
+    def append(self, ts, frame):
+        state = STATE_CODES.get(frame.state, 0)
+        with self._lock:
+            RECORD.pack_into(self._buf, self._pending * RECORD.size,
+                             ts, state, frame.target, frame.inside, frame.outside, frame.speed)
+            self._pending += 1
+            self._roll(ts, frame)
+            if self._pending == FLUSH_RECORDS or ts - self._last_flush >= FLUSH_SECONDS:
+                self._flush(ts)
+
+    def _roll(self, ts, frame):
+        w = self._window
+        start = ts - ts % ROLLUP_SECONDS
+        if w is not None and w[0] != start:
+            self._rollups += ROLLUP.pack(*w)
+            w = None
+        if w is None:
+            self._window = [start, 1, frame.target, frame.target, frame.inside, frame.inside,
+                            frame.outside, frame.outside, frame.speed, frame.speed]
+            return
+        w[1] += 1
+        # Unrolled on purpose, this runs for every sample
+        v = frame.target
+        if v < w[2]: w[2] = v
+        if v > w[3]: w[3] = v
+        v = frame.inside
+        if v < w[4]: w[4] = v
+        if v > w[5]: w[5] = v
+        v = frame.outside
+        if v < w[6]: w[6] = v
+        if v > w[7]: w[7] = v
+        v = frame.speed
+        if v < w[8]: w[8] = v
+        if v > w[9]: w[9] = v
+
+    def flush(self):
+        """Hands buffered samples to the writer and waits until they are on disk"""
+        with self._lock:
+            self._flush(self._last_flush)
+        self._writes.join()
+
+    def close(self):
+        """Writes everything out, the rollup window still being filled included, and stops the writer"""
+        with self._lock:
+            if self._window is not None:
+                self._rollups += ROLLUP.pack(*self._window)
+                self._window = None
+            self._flush(self._last_flush)
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._writes.put(None)
+            writer.join()
+
+    def _flush(self, ts):
+        self._last_flush = ts
+        if not self._pending and not self._rollups:
+            return
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+        self._writes.put((bytes(self._buf[:self._pending * RECORD.size]), bytes(self._rollups)))
+        self._pending = 0
+        del self._rollups[:]
+
+    def _write_loop(self):
+        while True:
+            block = self._writes.get()
+            try:
+                if block is None:
+                    return
+                self._write(*block)
+            except OSError as e:
+                print(f"Telemetry Error: {e}")
+            finally:
+                self._writes.task_done()
+
+    def _write(self, records, rollups):
+        """Runs on the writer thread: appends one block, rotating first when it would not fit"""
+        if records:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(records) > self.max_bytes:
+                self._rotate()
+            _append(self.path, MAGIC, records)
+        if rollups:
+            _append(self.rollup_path, ROLLUP_MAGIC, rollups)
+
+    def _rotate(self):
+        for base in (self.path, self.rollup_path):
+            for i in range(self.keep, 0, -1):
+                src = base if i == 1 else f"{base}.{i - 1}"
+                if os.path.exists(src):
+                    os.replace(src, f"{base}.{i}")
+
+    def files(self):
+        """(log, rollup) paths from oldest to newest"""
+        out = []
+        for i in range(self.keep, -1, -1):
+            suffix = f".{i}" if i else ''
+            if os.path.exists(self.path + suffix):
+                out.append((self.path + suffix, self.rollup_path + suffix))
+        return out
+
+    def samples(self, t0=None, t1=None):
+        """Every stored (ts, state, target, inside, outside, speed) within [t0, t1)"""
+        self.flush()
+        for log, _ in self.files():
+            for ts, state, target, inside, outside, speed in _read(log, MAGIC, RECORD):
+                if (t0 is None or ts >= t0) and (t1 is None or ts < t1):
+                    yield (ts, STATE_NAMES.get(state, '?'), target, inside, outside, speed)
+
+    def downsample(self, t0, t1, buckets, field='inside'):
+        """Min/max of field per bucket, from the rollups when buckets are wider than ROLLUP_SECONDS"""
+        column = _column(field)
+        if (t1 - t0) / buckets < ROLLUP_SECONDS:
+            return downsample(((s[0], s[column], s[column]) for s in self.samples(t0, t1)), t0, t1, buckets)
+        self.flush()
+        k = 2 * column - 2
+        points = (
+            (r[0], r[k], r[k + 1])
+            for _, rollup in self.files()
+            for r in _read(rollup, ROLLUP_MAGIC, ROLLUP)
+            if t0 <= r[0] < t1
+        )
+        return downsample(points, t0, t1, buckets)
+
+
+def _append(path, magic, data):
+    with open(path, 'ab') as f:
+        if f.tell() == 0:
+            f.write(magic)
+        f.write(data)
+
+def _read(path, magic, record):
+    if not os.path.exists(path):
+        return iter(())
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(magic)] != magic:
+        return iter(())
+    body = memoryview(data)[len(magic):]
+    return record.iter_unpack(body[:len(body) - len(body) % record.size])
+
+
+class TelemetryStore:
+    """In-memory ring for recent history plus an optional rotating log on disk"""
+
+    def __init__(self, path=None, capacity=RING_CAPACITY, max_bytes=MAX_FILE_BYTES, keep=KEEP_FILES):
+        self.ring = TelemetryRing(capacity)
+        self.log = TelemetryLog(path, max_bytes, keep) if path else None
+
+    def append(self, ts, frame):
+        self.ring.append(ts, frame)
+        if self.log is not None:
+            self.log.append(ts, frame)
+
+    def downsample(self, t0, t1, buckets, field='inside'):
+        """Min/max buckets of field over [t0, t1), from memory when the ring still covers t0"""
+        oldest = self.ring.oldest()
+        if self.log is None or (oldest is not None and oldest <= t0):
+            return self.ring.downsample(t0, t1, buckets, field)
+        return self.log.downsample(t0, t1, buckets, field)
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
@@ -0,0 +1,81 @@
+# Energy based voice activity detection on the per-chunk RMS of 16-bit audio
+
+CALIBRATION_SECONDS = 0.25  # Opening audio used to measure the noise floor
+SPEECH_RATIO = 3.0          # Speech starts this many times above the noise floor
+RELEASE_RATIO = 0.6         # ...and ends below this fraction of the start threshold
+MIN_LEVEL = 300             # Never treat anything quieter than this as speech
+MIN_SPEECH_SECONDS = 0.15   # Shorter bursts (clicks, bumps) are ignored
+HANGOVER_SECONDS = 0.8      # Silence after speech that ends the utterance
+NO_SPEECH_SECONDS = 6.0     # Give up if nobody speaks at all
+PADDING_SECONDS = 0.2       # Silence kept around the speech when trimming
+
+class EnergyVAD:
+    """Finds where speech starts and ends in a recording, one chunk at a time.
+
+    feed(rms) returns True once the utterance is over: speech was followed
+    by HANGOVER_SECONDS of silence, or no speech came for NO_SPEECH_SECONDS.
+    The thresholds follow a noise floor measured over the first chunks and
+    slowly tracked through later non-speech chunks.
+    """
+
+    def __init__(self, chunk_seconds):
+        self.chunk_seconds = chunk_seconds
+        self.calibration_chunks = max(1, round(CALIBRATION_SECONDS / chunk_seconds))
+        self.min_speech_chunks = max(1, round(MIN_SPEECH_SECONDS / chunk_seconds))
+        self.hangover_chunks = max(1, round(HANGOVER_SECONDS / chunk_seconds))
+        self.no_speech_chunks = max(1, round(NO_SPEECH_SECONDS / chunk_seconds))
+        self.padding_chunks = round(PADDING_SECONDS / chunk_seconds)
+        self.noise_floor = 0.0
+        self.count = 0
+        self.in_speech = False
+        self.speech_start = None  # First chunk of the first utterance
+        self.speech_end = None    # Chunk after the last speech chunk
+        self.done = False
+        self._run = 0             # Consecutive chunks above (or below) threshold
+
+    @property
+    def threshold(self):
+        return max(MIN_LEVEL, self.noise_floor * SPEECH_RATIO)
+
+    def feed(self, rms):
+        i = self.count
+        self.count += 1
+        if self.done:
+            return True
+
+        if i < self.calibration_chunks:
+            # Running mean of the opening chunks, speech is still detected meanwhile
+            self.noise_floor += (rms - self.noise_floor) / (i + 1)
+
+        if not self.in_speech:
+            if rms > self.threshold:
+                self._run += 1
+                if self._run >= self.min_speech_chunks:
+                    self.in_speech = True
+                    if self.speech_start is None:
+                        self.speech_start = i + 1 - self._run
+                    self._run = 0
+            else:
+                self._run = 0
+                if i >= self.calibration_chunks:
+                    self.noise_floor += (rms - self.noise_floor) * 0.05
+                if self.speech_start is None and i + 1 >= self.no_speech_chunks:
+                    self.done = True
+        else:
+            if rms < self.threshold * RELEASE_RATIO:
+                self._run += 1
+                if self._run >= self.hangover_chunks:
+                    self.speech_end = i + 1 - self._run
+                    self.done = True
+            else:
+                self._run = 0
+                self.speech_end = None
+        return self.done
+
+    def trim(self, frames):
+        """frames cut down to the detected speech plus PADDING_SECONDS, [] if there was none"""
+        if self.speech_start is None:
+            return []
+        start = max(0, self.speech_start - self.padding_chunks)
+        end = len(frames) if self.speech_end is None else self.speech_end + self.padding_chunks
+        return frames[start:end]
@@ -0,0 +1,188 @@
+# Hands-free trigger: a small keyword spotter listening to the microphone between recordings
+import wave
+import argparse
+import numpy as np
+import dsp
+import metrics
+
+FRAME_SECONDS = 0.025       # Analysis window...
+HOP_SECONDS = 0.010         # ...every 10 ms
+MEL_BANDS = 24
+CEPSTRA = 12                # MFCCs kept; c0 (loudness) is dropped so the level does not matter
+LOW_HZ = 100
+HIGH_HZ = 4000              # Speech formants, no need for more
+SPECTRAL_FLOOR = 0.01       # Bands 20 dB under a frame's loudest are floored there, where noise would decide them
+GATE_LEVEL = 300            # Chunks quieter than this are never analysed (same floor as the VAD)...
+GATE_RATIO = 2.5            # ...nor those this close to the tracked noise floor
+GATE_HANGOVER_SECONDS = 0.3 # Keep analysing through short pauses inside the wake word
+THRESHOLD = 10.0            # Mean MFCC distance per frame to a template below which the word was said
+REFRACTORY_SECONDS = 2.0    # No second trigger this soon after one
+ENROLL_PADDING_SECONDS = 0.03   # Silence left around the word in a template
+
+WAKE_TRIGGERS = metrics.counter('hvac_wake_triggers', "Times the wake word was heard")
+
+
+class Features:
+    """MFCCs of a stream of 16-bit audio, one row per HOP_SECONDS, computed a chunk at a time"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.frame = int(rate * FRAME_SECONDS)
+        self.hop = int(rate * HOP_SECONDS)
+        self.nfft = 1 << (self.frame - 1).bit_length()
+        self.window = np.hamming(self.frame)
+        self.mel = mel_filters(rate, self.nfft)
+        k = np.arange(MEL_BANDS)
+        self.dct = np.cos(np.pi / MEL_BANDS * (k + 0.5)[None, :] * np.arange(1, CEPSTRA + 1)[:, None]).T
+        self.reset()
+
+    def reset(self):
+        self.buffer = np.zeros(0)
+
+    def push(self, x):
+        """(n, CEPSTRA) features of the frames completed by the float samples x"""
+        buf = np.concatenate((self.buffer, x))
+        n = max(0, (len(buf) - self.frame) // self.hop + 1)
+        self.buffer = buf[n * self.hop:]
+        if not n:
+            return np.zeros((0, CEPSTRA))
+        frames = np.lib.stride_tricks.sliding_window_view(buf, self.frame)[::self.hop][:n]
+        mel = (np.abs(np.fft.rfft(frames * self.window, self.nfft)) ** 2) @ self.mel
+        return np.log(mel + mel.max(axis=1, keepdims=True) * SPECTRAL_FLOOR + 1.0) @ self.dct
+
+def mel_filters(rate, nfft):
+    """(nfft // 2 + 1, MEL_BANDS) triangular mel filterbank between LOW_HZ and HIGH_HZ"""
+    mel = lambda hz: 2595 * np.log10(1 + hz / 700)
+    edges = 700 * (10 ** (np.linspace(mel(LOW_HZ), mel(min(HIGH_HZ, rate / 2)), MEL_BANDS + 2) / 2595) - 1)
+    freqs = np.fft.rfftfreq(nfft, 1 / rate)
+    lo, mid, hi = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    return np.maximum(0, np.minimum((freqs - lo) / (mid - lo), (hi - freqs) / (hi - mid))).T
+
+
+class WakeWordSpotter:
+    """Says when the wake word was just heard, fed the microphone a chunk at a time.
+
+    Each template is a recording of the wake word as features. A chunk only
+    costs a level measurement until it is louder than the tracked noise
+    floor; then its frames are matched against every template at once by
+    subsequence DTW, updated one frame at a time: the word can start
+    anywhere and be said a little faster or slower than when enrolled.
+    feed() returns True when the mean distance along the best match ending
+    at the current frame falls below the threshold.
+    """
+
+    def __init__(self, templates, rate=dsp.TARGET_RATE, threshold=THRESHOLD):
+        self.features = Features(rate)
+        self.threshold = threshold
+        self.templates = np.concatenate(templates)
+        starts = np.cumsum([0] + [len(t) for t in templates[:-1]])
+        self.ends = starts + [len(t) - 1 for t in templates]
+        # Cells that may not take the diagonal (first of a template) or the skip (first two)
+        self.no_step = np.zeros(len(self.templates), bool)
+        self.no_step[starts] = True
+        self.no_skip = self.no_step.copy()
+        self.no_skip[starts + 1] = True
+        self.noise_floor = None
+        self.chunks = 0           # Chunks fed...
+        self.analysed = 0         # ...and how many of them got past the gate
+        self.seconds = 0.0        # Audio fed so far
+        self.score = np.inf       # Best distance at the last analysed frame
+        self._previous = b''
+        self._open = 0
+        self._quiet_until = 0.0
+        self.reset()
+
+    @classmethod
+    def load(cls, path, rate=None, **options):
+        """A spotter for the templates saved by save(), at the capture rate (default: the enrollment rate)"""
+        with np.load(path) as data:
+            templates = [data[f"t{i}"] for i in range(len(data.files) - 1)]
+            return cls(templates, rate or int(data['rate']), **options)
+
+    def reset(self):
+        """Forget any partial match, as after a recording or a long silence"""
+        self.features.reset()
+        self.cost = np.full(len(self.templates), np.inf)
+        self.length = np.ones(len(self.templates))
+        self._open = 0
+
+    def feed(self, chunk):
+        """Takes the next chunk of 16-bit audio; True if it completed the wake word"""
+        duration = len(chunk) / 2 / self.features.rate
+        self.chunks += 1
+        self.seconds += duration
+        rms = dsp.levels(chunk)[1]
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        # Quick to follow the room down, slow to follow it up so speech hardly moves it
+        self.noise_floor += (rms - self.noise_floor) * (0.1 if rms < self.noise_floor else 0.01)
+        if rms > max(GATE_LEVEL, self.noise_floor * GATE_RATIO):
+            if not self._open:
+                # The word's onset is often in the chunk before the one that opened the gate
+                self._analyse(self._previous)
+            self._open = max(1, round(GATE_HANGOVER_SECONDS / duration))
+        elif self._open:
+            self._open -= 1
+            if not self._open:
+                self.reset()
+        self._previous = chunk
+        if not self._open:
+            return False
+        self.analysed += 1
+        return self._analyse(chunk)
+
+    def _analyse(self, chunk):
+        heard = False
+        for f in self.features.push(dsp.samples(chunk).astype(np.float64)):
+            d = np.sqrt(((self.templates - f) ** 2).sum(axis=1))
+            # Reach each template frame by staying, stepping one or skipping one
+            stay = self.cost
+            step = np.where(self.no_step, np.inf, np.roll(self.cost, 1))
+            skip = np.where(self.no_skip, np.inf, np.roll(self.cost, 2))
+            best = np.argmin(np.stack((stay, step, skip)), axis=0)
+            prev = np.choose(best, (stay, step, skip))
+            length = np.choose(best, (self.length, np.roll(self.length, 1), np.roll(self.length, 2))) + 1
+            # Any frame may be where the word starts
+            self.cost = np.where(self.no_step, d, prev + d)
+            self.length = np.where(self.no_step, 1, length)
+            self.score = (self.cost[self.ends] / self.length[self.ends]).min()
+            if self.score < self.threshold and self.seconds >= self._quiet_until:
+                WAKE_TRIGGERS.inc()
+                self._quiet_until = self.seconds + REFRACTORY_SECONDS
+                heard = True
+        if heard:
+            self.reset()
+        return heard
+
+
+def enroll(recordings, rate):
+    """Templates from recordings of the wake word (16-bit bytes), silence at the ends trimmed off"""
+    templates = []
+    for pcm in recordings:
+        x = dsp.trim_silence(dsp.remove_dc(dsp.samples(pcm).astype(np.float64)), rate, ENROLL_PADDING_SECONDS)
+        templates.append(Features(rate).push(x))
+    return templates
+
+def save(path, templates, rate):
+    np.savez(path, rate=rate, **{f"t{i}": t for i, t in enumerate(templates)})
+
+def read_wav(path, rate=dsp.TARGET_RATE):
+    """A wav file as 16-bit mono bytes at rate"""
+    with wave.open(path, 'rb') as w:
+        pcm = dsp.to_mono16(w.readframes(w.getnframes()), w.getsampwidth(), w.getnchannels())
+        source = w.getframerate()
+    if source != rate:
+        pcm = dsp.to_pcm(dsp.resample(dsp.samples(pcm).astype(np.float64), source, rate))
+    return pcm
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Make wake word templates from a few recordings of it")
+    ap.add_argument('output', help="templates file to write (.npz), for HVACController(wake=...)")
+    ap.add_argument('wavs', nargs='+', help="recordings of the wake word, 3 to 5 said a little differently")
+    ap.add_argument('--rate', type=int, default=dsp.TARGET_RATE, help="capture rate the spotter will run at")
+    args = ap.parse_args()
+
+    templates = enroll([read_wav(p, args.rate) for p in args.wavs], args.rate)
+    save(args.output, templates, args.rate)
+    print(f"{len(templates)} templates, {', '.join(f'{len(t) * HOP_SECONDS:.2f} s' for t in templates)}")
@@ -0,0 +1,136 @@
+import math
+import tkinter as tk
+
+# Fan animation frame rate; rotation speed does not depend on it
+FAN_FPS = 20
+
+BLADE_COLORS = {'F': "#2ecc71", 'B': "#e74c3c", 'S': "#95a5a6"}
+
+class WeatherCanvas(tk.Canvas):
+    def __init__(self, master, width=100, height=100, **kwargs):
+        super().__init__(master, width=width, height=height, highlightthickness=0, **kwargs)
+        self.width = width
+        self.height = height
+        self.cx = width // 2
+        self.cy = height // 2
+        self.kind = None
+
+    def draw_weather(self, temp):
+        kind = 'sun' if temp >= 30 else 'snow' if temp <= 15 else 'cloud'
+        if kind == self.kind:
+            return
+        self.kind = kind
+        self.delete("all")
+        if kind == 'sun':
+            self._draw_sun()
+        elif kind == 'snow':
+            self._draw_snow()
+        else:
+            self._draw_cloud()
+
+    def _draw_sun(self):
+        self.create_oval(self.cx-20, self.cy-20, self.cx+20, self.cy+20, fill="#f1c40f", outline="#f39c12", width=2)
+        for i in range(0, 360, 45):
+            rad = math.radians(i)
+            x1 = self.cx + math.cos(rad) * 25
+            y1 = self.cy + math.sin(rad) * 25
+            x2 = self.cx + math.cos(rad) * 35
+            y2 = self.cy + math.sin(rad) * 35
+            self.create_line(x1, y1, x2, y2, fill="#f39c12", width=3)
+
+    def _draw_snow(self):
+        self.create_text(self.cx, self.cy, text="❄", font=("Arial", 60), fill="white")
+
+    def _draw_cloud(self):
+        self.create_oval(self.cx-30, self.cy-10, self.cx+10, self.cy+20, fill="#ecf0f1", outline="")
+        self.create_oval(self.cx-10, self.cy-20, self.cx+30, self.cy+15, fill="#ecf0f1", outline="")
+
+class FanWidget(tk.Canvas):
+    """Three bladed fan drawn once and then only moved with coords().
+
+    Blade vertices for every whole degree are computed up front, so a frame
+    is three coords() calls and no trig. The timer stops while the fan is
+    stopped or the window is not viewable and starts again on set_state()
+    or when the window is mapped.
+    """
+
+    def __init__(self, master, width=180, height=180, fps=FAN_FPS, **kwargs):
+        super().__init__(master, width=width, height=height, highlightthickness=0, **kwargs)
+        self.cx = width // 2
+        self.cy = height // 2
+        self.angle = 0.0
+        self.direction = 'S'
+        self.speed = 0
+        self.blade_color = BLADE_COLORS['S']
+        self.frames_drawn = 0
+        self._job = None
+        self.set_fps(fps)
+        self.table = self._build_blade_table()
+        self.draw_static_frame()
+        self.blades = [self.create_polygon(*coords, fill=self.blade_color, tags="blade", outline="black")
+                       for coords in self.table[0]]
+        self.winfo_toplevel().bind("<Map>", lambda e: self.resume(), add="+")
+
+    def _build_blade_table(self):
+        table = []
+        for deg in range(360):
+            blades = []
+            for i in range(3):
+                blade_angle = math.radians(deg + (i * 120))
+                x_tip = self.cx + math.cos(blade_angle) * 70
+                y_tip = self.cy + math.sin(blade_angle) * 70
+
+                x_l = self.cx + math.cos(blade_angle - 0.3) * 20
+                y_l = self.cy + math.sin(blade_angle - 0.3) * 20
+
+                x_r = self.cx + math.cos(blade_angle + 0.3) * 20
+                y_r = self.cy + math.sin(blade_angle + 0.3) * 20
+
+                blades.append((self.cx, self.cy, x_l, y_l, x_tip, y_tip, x_r, y_r))
+            table.append(blades)
+        return table
+
+    def draw_static_frame(self):
+        self.create_oval(self.cx-80, self.cy-80, self.cx+80, self.cy+80, outline="#555", width=8)
+        self.create_oval(self.cx-5, self.cy-5, self.cx+5, self.cy+5, fill="#333")
+
+    def set_fps(self, fps):
+        self.interval = max(1, int(1000 / fps))
+        # The original animation stepped every 50 ms, keep the same degrees per second
+        self.step_scale = self.interval / 50.0
+
+    def set_state(self, direction, speed):
+        self.direction = direction
+        self.speed = speed
+        color = BLADE_COLORS.get(direction, BLADE_COLORS['S'])
+        if color != self.blade_color:
+            self.blade_color = color
+            self.itemconfigure("blade", fill=color)
+        self.resume()
+
+    def resume(self):
+        if self._job is None and self.direction in ('F', 'B'):
+            self._job = self.after(self.interval, self.animate)
+
+    def suspend(self):
+        if self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
+
+    def animate(self):
+        self._job = None
+        if self.direction == 'F':
+            step = (self.speed / 255.0) * 30 + 2
+        elif self.direction == 'B':
+            step = -((self.speed / 255.0) * 30 + 2)
+        else:
+            return
+        if not self.winfo_viewable():
+            return
+
+        self.angle = (self.angle + step * self.step_scale) % 360
+        for item, coords in zip(self.blades, self.table[int(self.angle) % 360]):
+            self.coords(item, *coords)
+        self.frames_drawn += 1
+
+        self._job = self.after(self.interval, self.animate)
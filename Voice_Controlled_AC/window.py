@@ -0,0 +1,178 @@
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+import tkinter as tk
+from dashboard import DashboardView, get_temp_color, UI_DELAY
+from widgets import WeatherCanvas, FanWidget
+from meter import LevelMeter, METER_HZ
+import metrics
+import startup
+
+class SmartHVACApp(ttk.Window):
+    def __init__(self, create_core):
+        super().__init__(themename="superhero")
+        self.title("Smart HVAC Controller")
+        self.geometry("1000x600")
+        startup.mark("window created")
+        
+        self.target_temp = 25
+        self.inside_temp = 25
+        self.outside_temp = 35 
+        
+        self.create_core = create_core    # create_core(on_level) -> HVACController, not started yet
+        self.core = None
+        self.readiness = {'serial': "connecting", 'voice': "loading", 'mic': "opening"}
+
+        self.setup_ui()
+        self.view = DashboardView(self, self.update_data)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        startup.mark("ui built")
+        # Everything slow starts once the window is on screen
+        self.after_idle(self.start_core)
+
+    def start_core(self):
+        startup.mark("window shown")
+        # Serial, audio and recognition run in the controller's own loop; the window only listens
+        self.core = self.create_core(self.meter.publish)
+        self.core.subscribe(self.on_event)
+        self.core.start()
+        startup.mark("controller started")
+
+    def on_close(self):
+        if self.core is not None:
+            self.core.stop()
+        self.destroy()
+
+    def setup_ui(self):
+        self.container = tk.Frame(self)
+        self.container.pack(fill=BOTH, expand=YES)
+        
+        self.left_pane = tk.Frame(self.container, bg="#3498db", width=400)
+        self.left_pane.pack(side=LEFT, fill=BOTH, expand=YES)
+        self.left_pane.pack_propagate(False)
+
+        self.center_pane = tk.Frame(self.container, bg="#2c3e50", width=200)
+        self.center_pane.pack(side=LEFT, fill=Y)
+        self.center_pane.pack_propagate(False)
+
+        self.right_pane = tk.Frame(self.container, bg="#e74c3c", width=400)
+        self.right_pane.pack(side=LEFT, fill=BOTH, expand=YES)
+        self.right_pane.pack_propagate(False)
+
+        # --- LEFT PANE (OUTSIDE) ---
+        tk.Label(self.left_pane, text="OUTSIDE", font=("Helvetica", 18, "bold"), bg=self.left_pane["bg"], fg="white").pack(pady=20)
+        self.weather_icon_out = WeatherCanvas(self.left_pane, width=100, height=100, bg=self.left_pane["bg"])
+        self.weather_icon_out.pack(pady=10)
+        self.lbl_out_temp = tk.Label(self.left_pane, text="--°C", font=("Helvetica", 60, "bold"), bg=self.left_pane["bg"], fg="white")
+        self.lbl_out_temp.pack(pady=20)
+        self.lbl_out_status = tk.Label(self.left_pane, text="Status", font=("Helvetica", 14), bg=self.left_pane["bg"], fg="#ecf0f1")
+        self.lbl_out_status.pack()
+
+        # --- CENTER PANE (FAN & CONTROLS) ---
+        tk.Label(self.center_pane, text="AIRFLOW", font=("Helvetica", 12, "bold"), bg="#2c3e50", fg="#bdc3c7").pack(pady=20)
+        self.fan = FanWidget(self.center_pane, bg="#2c3e50")
+        self.fan.pack(pady=10)
+        
+        self.lbl_fan_status = tk.Label(self.center_pane, text="IDLE", font=("Courier", 10, "bold"), bg="#2c3e50", fg="#f39c12")
+        self.lbl_fan_status.pack(pady=5)
+
+        self.mic_bar = ttk.Progressbar(self.center_pane, length=150, maximum=32768, bootstyle="info")
+        self.mic_bar.pack(pady=30)
+        self.meter = LevelMeter(self.mic_bar, hz=METER_HZ)
+        self.meter.start()
+        
+        self.btn_record = ttk.Button(self.center_pane, text="WAITING", bootstyle="secondary", state="disabled", width=15)
+        self.btn_record.pack(pady=10)
+
+        self.lbl_transcript = tk.Label(self.center_pane, text="", font=("Helvetica", 10), bg="#2c3e50", fg="#ecf0f1", wraplength=180)
+        self.lbl_transcript.pack(pady=5)
+
+        self.lbl_ready = tk.Label(self.center_pane, text="", font=("Helvetica", 9), bg="#2c3e50", fg="#95a5a6", justify=LEFT)
+        self.lbl_ready.pack(side=BOTTOM, pady=10)
+        self.show_readiness()
+
+        # --- RIGHT PANE (INSIDE) ---
+        tk.Label(self.right_pane, text="INSIDE", font=("Helvetica", 18, "bold"), bg=self.right_pane["bg"], fg="white").pack(pady=20)
+        self.lbl_target = tk.Label(self.right_pane, text="Target: 25°C", font=("Helvetica", 16), bg=self.right_pane["bg"], fg="#ecf0f1")
+        self.lbl_target.pack(pady=5)
+        
+        self.lbl_in_temp = tk.Label(self.right_pane, text="--°C", font=("Helvetica", 60, "bold"), bg=self.right_pane["bg"], fg="white")
+        self.lbl_in_temp.pack(pady=20)
+        
+        self.thermometer_bar = ttk.Progressbar(self.right_pane, orient=VERTICAL, length=200, maximum=50, bootstyle="light")
+        self.thermometer_bar.pack(pady=10)
+
+    def on_event(self, kind, value):
+        # Runs on the controller's loop thread
+        if kind == 'frames':
+            # Only the newest frame of a batch is worth drawing
+            self.view.submit(value[1][-1])
+        else:
+            self.after(0, self.show_event, kind, value, metrics.clock())
+
+    def show_event(self, kind, value, queued=0.0):
+        UI_DELAY.labels('event').observe_since(queued)
+        if kind == 'recording':
+            if value:
+                self.lbl_transcript.configure(text="")
+                self.btn_record.configure(bootstyle="danger", text="LISTENING...", state="normal")
+            else:
+                self.btn_record.configure(bootstyle="secondary", text="PROCESSING...", state="disabled")
+        elif kind == 'partial':
+            self.lbl_transcript.configure(text=value)
+        elif kind == 'transcript':
+            self.lbl_transcript.configure(text=value or "(nothing recognized)")
+        elif kind == 'error':
+            self.lbl_transcript.configure(text=value)
+        elif kind == 'idle':
+            if not self.core.is_recording:
+                self.btn_record.configure(text="WAITING")
+        elif kind in ('ready', 'connected', 'disconnected'):
+            name, error = value
+            if kind == 'ready':
+                key = 'voice' if name == 'engine' else 'mic'
+                self.readiness[key] = "ready" if error is None else "unavailable"
+            else:
+                self.readiness['serial'] = "connected" if kind == 'connected' else "reconnecting"
+            startup.mark(f"{kind} {name}")
+            self.show_readiness()
+        elif kind == 'target':
+            self.target_temp = value[1]
+            self.view.configure(self.lbl_target, text=f"Target: {self.target_temp}°C")
+
+    def show_readiness(self):
+        self.lbl_ready.configure(text='\n'.join(f"{k.title()}: {v}" for k, v in self.readiness.items()))
+        if not {"connecting", "loading", "opening"} & set(self.readiness.values()):
+            startup.report()
+
+    def update_data(self, frame):
+        m_state = frame.state
+        speed = frame.speed
+
+        self.target_temp = frame.target
+        self.inside_temp = frame.inside
+        self.outside_temp = frame.outside
+
+        # Update Left (Outside)
+        view = self.view
+        color_out = get_temp_color(self.outside_temp)
+        view.configure(self.left_pane, bg=color_out)
+        view.configure(self.lbl_out_temp, text=f"{self.outside_temp}°C", bg=color_out)
+        view.configure(self.lbl_out_status, bg=color_out, text="Hot Environment" if self.outside_temp > 25 else "Cold Environment")
+        view.configure(self.weather_icon_out, bg=color_out)
+        self.weather_icon_out.draw_weather(self.outside_temp)
+        
+        # Update Right (Inside)
+        color_in = get_temp_color(self.inside_temp)
+        view.configure(self.right_pane, bg=color_in)
+        view.configure(self.lbl_in_temp, text=f"{self.inside_temp}°C", bg=color_in)
+        view.configure(self.lbl_target, text=f"Target: {self.target_temp}°C", bg=color_in)
+        view.configure(self.thermometer_bar, value=self.inside_temp)
+
+        # Update Fan
+        self.fan.set_state(m_state, speed)
+        if m_state == 'F':
+            view.configure(self.lbl_fan_status, text=f"Fan\nIN <- OUT\nSpeed: {speed}")
+        elif m_state == 'B':
+            view.configure(self.lbl_fan_status, text=f"Hood\nIN -> OUT\nSpeed: {speed}")
+        else:
+            view.configure(self.lbl_fan_status, text="Stopped")